@@ -0,0 +1,5 @@
+"""
+Generador de datos sintéticos y escenarios de rendimiento de la capa de datos.
+
+Uso: python -m benchmarks --rows 100000 --output resultados.json
+"""
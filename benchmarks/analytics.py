@@ -0,0 +1,155 @@
+"""
+Agregados de producción: ProductionAnalytics (NumPy) frente a un bucle en Python.
+
+Calcula kilos por OF (cantidad, suma, media y percentiles 50 y 90) de dos
+formas y comprueba que den lo mismo:
+
+- desde SQLite: kilos_por_of sobre bobina (lectura a arrays + group_stats)
+  frente a cargar las filas con get_all_bobinas y sumarlas en un bucle,
+  como se hacía antes del módulo; también se informa el mismo bucle
+  sobre un cursor de tuplas, sin pasar por get_all_bobinas;
+- en memoria: group_stats frente al mismo bucle sobre las columnas ya
+  cargadas, para separar el cálculo de la lectura.
+
+Uso: python -m benchmarks.analytics --rows 1000000
+"""
+import argparse
+import contextlib
+import json
+import math
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.generator import populate
+from models.analytics import ProductionAnalytics, group_stats
+
+PERCENTILES = (50, 90)
+
+
+def loop_stats(pairs, percentiles=PERCENTILES):
+    """
+    Estadísticas por grupo recorriendo las filas en Python.
+
+    Args:
+        pairs (iterable): Tuplas (clave, valor)
+        percentiles (iterable): Percentiles a calcular (0-100)
+
+    Returns:
+        list: Un diccionario por grupo, ordenado por la clave
+    """
+    groups = {}
+    for key, value in pairs:
+        groups.setdefault(key, []).append(value)
+
+    result = []
+    for key in sorted(groups):
+        values = sorted(groups[key])
+        total = sum(values)
+        row = {"of": key, "count": len(values), "sum": total, "mean": total / len(values)}
+        for p in percentiles:
+            position = (len(values) - 1) * p / 100
+            lower, upper = math.floor(position), math.ceil(position)
+            fraction = position - lower
+            row[f"p{p:g}"] = values[lower] * (1 - fraction) + values[upper] * fraction
+        result.append(row)
+    return result
+
+
+def loop_from_rows(db_manager):
+    """Kilos por OF sumando a mano las filas de get_all_bobinas."""
+    return loop_stats((row["of"], row["peso"]) for row in db_manager.get_all_bobinas())
+
+
+def loop_from_cursor(db_manager):
+    """Kilos por OF recorriendo un cursor de tuplas fila a fila."""
+    with db_manager.pool.reader() as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        try:
+            return loop_stats(cursor.execute("SELECT of, peso FROM bobina"))
+        finally:
+            cursor.close()
+
+
+def same_result(first, second):
+    """Compara dos resultados por grupo con tolerancia de coma flotante."""
+    if len(first) != len(second):
+        return False
+    for a, b in zip(first, second):
+        if a["of"] != b["of"] or a["count"] != b["count"]:
+            return False
+        for name in ["sum", "mean"] + [f"p{p:g}" for p in PERCENTILES]:
+            if not math.isclose(a[name], b[name], rel_tol=1e-9, abs_tol=1e-6):
+                return False
+    return True
+
+
+def timed(function):
+    """Ejecuta una función y devuelve su resultado y los segundos que tardó."""
+    start = time.perf_counter()
+    result = function()
+    return result, round(time.perf_counter() - start, 3)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de los agregados de producción")
+    parser.add_argument("--rows", type=int, default=1000000, help="Filas de la base generada")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    work_dir = tempfile.mkdtemp(prefix="bobinas_bench_")
+    results = []
+    try:
+        with contextlib.redirect_stdout(sys.stderr):
+            db_manager = populate(os.path.join(work_dir, "produccion.db"), args.rows, args.seed)
+        analytics = ProductionAnalytics(db_manager)
+
+        # Desde SQLite: lectura y cálculo
+        (keys, values), load_s = timed(lambda: analytics.load_columns(["of"], ("bobina",)))
+        vectorized, compute_s = timed(
+            lambda: group_stats(keys, values["peso"], ["of"], PERCENTILES)
+        )
+        looped, loop_s = timed(lambda: loop_from_rows(db_manager))
+        cursor_looped, cursor_loop_s = timed(lambda: loop_from_cursor(db_manager))
+        results.append({
+            "scenario": "desde_sqlite", "groups": len(vectorized),
+            "numpy_s": round(load_s + compute_s, 3), "numpy_load_s": load_s,
+            "numpy_compute_s": compute_s, "loop_s": loop_s, "loop_cursor_s": cursor_loop_s,
+            "same_result": same_result(vectorized, looped)
+            and same_result(vectorized, cursor_looped),
+        })
+        print(results[-1], file=sys.stderr)
+
+        # En memoria: solo el cálculo, con las columnas ya cargadas
+        of_list, peso_list = keys[0].tolist(), values["peso"].tolist()
+        vectorized, numpy_s = timed(
+            lambda: group_stats([np.array(of_list, dtype=object)], np.array(peso_list),
+                                ["of"], PERCENTILES)
+        )
+        looped, loop_s = timed(lambda: loop_stats(zip(of_list, peso_list)))
+        results.append({
+            "scenario": "en_memoria", "groups": len(vectorized),
+            "numpy_s": numpy_s, "loop_s": loop_s,
+            "same_result": same_result(vectorized, looped),
+        })
+        print(results[-1], file=sys.stderr)
+        db_manager.close()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        "meta": {"rows": args.rows, "python": sys.version.split()[0],
+                 "sqlite": sqlite3.sqlite_version, "numpy": np.__version__},
+        "results": results,
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Latencia por llamada de DatabaseManager: una conexión por llamada frente al pool.
+
+Antes del pool cada método abría y cerraba su propia conexión a la base
+(sqlite3.connect por llamada, caché de páginas vacía). Las funciones
+per_call_* repiten ese código y se comparan con los métodos actuales,
+que toman una conexión persistente de ConnectionPool (WAL). Ambas
+versiones se ejecutan sobre la misma base generada; la caché de
+resultados del gestor está desactivada.
+
+Uso: python -m benchmarks.connections --rows 2000 --repeat 200
+"""
+import argparse
+import contextlib
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+
+from benchmarks.generator import generate_bobinas, populate
+from benchmarks.run import time_call
+from models.database_manager import INSERT_COLUMNS
+
+
+def per_call_filter(db_path, column, value):
+    """filter_bobinas con una conexión por llamada, como antes del pool."""
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    cursor.execute(
+        f"SELECT * FROM bobina WHERE LOWER({column}) LIKE ? ORDER BY id DESC", [f"%{value}%"]
+    )
+    result = [dict(row) for row in cursor.fetchall()]
+    conn.close()
+    return result
+
+
+def per_call_by_ids(db_path, ids):
+    """get_bobinas_by_ids con una conexión por llamada, como antes del pool."""
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    placeholders = ', '.join(['?' for _ in ids])
+    cursor.execute(f"SELECT * FROM bobina WHERE id IN ({placeholders})", ids)
+    result = [dict(row) for row in cursor.fetchall()]
+    conn.close()
+    return result
+
+
+def per_call_add(db_path, bobina_data):
+    """add_bobina con una conexión por llamada, como antes del pool."""
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    columns = ', '.join(bobina_data.keys())
+    placeholders = ', '.join(['?' for _ in bobina_data])
+    cursor.execute(
+        f"INSERT INTO bobina ({columns}) VALUES ({placeholders})", list(bobina_data.values())
+    )
+    conn.commit()
+    conn.close()
+    return 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Latencia por llamada con y sin pool de conexiones")
+    parser.add_argument("--rows", type=int, default=2000, help="Filas de la base generada")
+    parser.add_argument("--repeat", type=int, default=200, help="Llamadas por escenario")
+    parser.add_argument("--ids", type=int, default=50, help="IDs por llamada a get_bobinas_by_ids")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    work_dir = tempfile.mkdtemp(prefix="bobinas_bench_")
+    db_path = os.path.join(work_dir, "produccion.db")
+    try:
+        # Los mensajes del gestor van a stderr para no mezclarse con el JSON
+        with contextlib.redirect_stdout(sys.stderr):
+            db_manager = populate(db_path, args.rows, args.seed)
+        with db_manager.pool.reader() as conn:
+            middle = conn.execute(
+                "SELECT of FROM bobina ORDER BY id LIMIT 1 OFFSET ?", [args.rows // 2]
+            ).fetchone()["of"]
+        ids = list(range(1, args.rows + 1, max(1, args.rows // args.ids)))[:args.ids]
+        # Filas nuevas distintas para cada alta
+        records = [
+            dict(zip(INSERT_COLUMNS, row))
+            for row in generate_bobinas(2 * args.repeat, args.seed + 1)
+        ]
+
+        scenarios = [
+            ("filter_bobinas", "por_llamada", lambda run: per_call_filter(db_path, "of", middle)),
+            ("filter_bobinas", "pool", lambda run: db_manager.filter_bobinas({"of": middle})),
+            ("get_bobinas_by_ids", "por_llamada", lambda run: per_call_by_ids(db_path, ids)),
+            ("get_bobinas_by_ids", "pool", lambda run: db_manager.get_bobinas_by_ids(ids)),
+            ("add_bobina", "por_llamada", lambda run: per_call_add(db_path, records[run])),
+            ("add_bobina", "pool",
+             lambda run: int(db_manager.add_bobina(records[args.repeat + run]))),
+        ]
+        results = []
+        for call, connection, function in scenarios:
+            result = {"call": call, "connection": connection}
+            result.update(time_call(function, args.repeat))
+            del result["runs_ms"]
+            results.append(result)
+            print(result, file=sys.stderr)
+        db_manager.close()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        "meta": {"rows": args.rows, "repeat": args.repeat, "python": sys.version.split()[0],
+                 "sqlite": sqlite3.sqlite_version},
+        "results": results,
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Generador determinista de bobinas con una distribución parecida a la real.
+
+Simula varias líneas que producen en paralelo: cada línea fabrica órdenes
+(OF) consecutivas de una misma calidad, gramaje y ancho, con tres turnos
+diarios atendidos por cuatro equipos (A-D) en rotación. Con la misma
+semilla se obtienen siempre las mismas filas.
+"""
+import heapq
+import random
+from datetime import datetime, timedelta
+
+from models.database_manager import DatabaseManager, INSERT_COLUMNS
+
+# Calidades (codcal, desccal), su peso relativo y los gramajes que se fabrican
+CALIDADES = [
+    ("01", "ONDA LINER", 10, [110, 120, 127]),
+    ("02", "COVERING", 45, [130, 140, 150, 170]),
+    ("03", "L.BLANCO", 25, [125, 140, 160]),
+    ("04", "CART.GRIS", 12, [180, 200, 230]),
+    ("06", "LINER PER", 8, [150, 175]),
+]
+ANCHOS = [100, 110, 125, 140, 150, 160, 180, 200]
+ANCHO_WEIGHTS = [5, 8, 20, 15, 20, 12, 12, 8]
+DIAMETROS = [100, 110, 120, 140]
+
+# Columnas que se generan (created_at se informa para que sea reproducible)
+GENERATED_COLUMNS = INSERT_COLUMNS + ["created_at"]
+
+
+def _turno(moment):
+    """Equipo de turno: tres turnos de 8 h (desde las 6:00) y cuatro equipos en rotación."""
+    shift = ((moment.hour - 6) % 24) // 8
+    day = (moment - timedelta(hours=6)).toordinal()
+    return "ABCD"[(day * 3 + shift) % 4]
+
+
+def generate_bobinas(count, seed=42, lines=4, start=datetime(2025, 1, 1, 6, 0),
+                     minutes_per_roll=5.0):
+    """
+    Genera filas de bobina ordenadas por fecha.
+
+    Args:
+        count (int): Número de filas a generar
+        seed (int): Semilla del generador
+        lines (int): Líneas de producción simultáneas
+        start (datetime): Momento de la primera bobina
+        minutes_per_roll (float): Minutos promedio entre bobinas de una línea
+
+    Yields:
+        tuple: Valores en el orden de GENERATED_COLUMNS
+    """
+    rng = random.Random(seed)
+    calidad_weights = [calidad[2] for calidad in CALIDADES]
+    next_of = 85500
+
+    def new_run(line):
+        nonlocal next_of
+        codcal, desccal, _, gramajes = rng.choices(CALIDADES, calidad_weights)[0]
+        next_of += 1
+        return {
+            "of": str(next_of),
+            "codcal": codcal,
+            "desccal": desccal,
+            "gramaje": float(rng.choice(gramajes)),
+            "ancho": float(rng.choices(ANCHOS, ANCHO_WEIGHTS)[0]),
+            "diametro": float(rng.choice(DIAMETROS)),
+            "remaining": rng.randint(40, 400),
+            "position": 0,
+        }
+
+    runs = {line: new_run(line) for line in range(lines)}
+    counters = {line: 0 for line in range(lines)}
+    # Próxima bobina de cada línea, en orden cronológico
+    pending = [(start + timedelta(minutes=rng.uniform(0, minutes_per_roll)), line) for line in range(lines)]
+    heapq.heapify(pending)
+
+    for _ in range(count):
+        moment, line = heapq.heappop(pending)
+        run = runs[line]
+        counters[line] += 1
+        run["position"] += 1
+
+        peso = run["ancho"] * run["diametro"] * run["gramaje"] / 6500 * rng.uniform(0.95, 1.05)
+        created_at = moment + timedelta(seconds=rng.randint(5, 90))
+        yield (
+            _turno(moment),
+            run["ancho"],
+            run["diametro"],
+            run["gramaje"],
+            round(peso, 1),
+            f"{line + 1}{counters[line]:07d}",
+            str((run["position"] - 1) % 4 + 1),
+            run["of"],
+            moment.strftime("%Y-%m-%d %H:%M"),
+            run["codcal"],
+            run["desccal"],
+            created_at.strftime("%Y-%m-%d %H:%M:%S"),
+        )
+
+        run["remaining"] -= 1
+        if run["remaining"] == 0:
+            runs[line] = new_run(line)
+        interval = rng.expovariate(1 / minutes_per_roll)
+        heapq.heappush(pending, (moment + timedelta(minutes=max(interval, 0.5)), line))
+
+
+def populate(db_path, count, seed=42, batch_size=50000, **kwargs):
+    """
+    Crea (o completa) una base de datos con filas generadas.
+
+    Args:
+        db_path (str): Ruta de la base de datos
+        count (int): Número de filas a insertar
+        seed (int): Semilla del generador
+        batch_size (int): Filas por transacción
+
+    Returns:
+        DatabaseManager: Gestor abierto sobre la base de datos poblada
+    """
+    db_manager = DatabaseManager(db_path, cache_size=0)
+    columns = ", ".join(GENERATED_COLUMNS)
+    placeholders = ", ".join("?" for _ in GENERATED_COLUMNS)
+    query = f"INSERT INTO bobina ({columns}) VALUES ({placeholders})"
+
+    batch = []
+    # El índice FTS5 se reconstruye una vez al final, no fila a fila
+    with db_manager.deferred_fts():
+        for row in generate_bobinas(count, seed, **kwargs):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                with db_manager.pool.writer() as conn:
+                    conn.executemany(query, batch)
+                batch.clear()
+        if batch:
+            with db_manager.pool.writer() as conn:
+                conn.executemany(query, batch)
+    with db_manager.pool.writer() as conn:
+        conn.execute("ANALYZE")
+    return db_manager
@@ -0,0 +1,125 @@
+"""
+Paso al histórico: move_to_historic frente al bucle fila a fila anterior.
+
+Antes, move_to_historic leía las filas con un IN (?, ?, ...), convertía
+cada una a diccionario y ejecutaba un INSERT INTO bobina_h por fila antes
+del DELETE. per_row_move repite ese código; como una única lista IN falla
+al superar el límite de variables de SQLite, los IDs se reparten en
+tramos de ese tamaño para poder medir selecciones grandes. El método
+actual copia las filas con INSERT ... SELECT sobre los IDs de una tabla
+temporal.
+
+Cada medición parte de una copia de la misma base generada.
+
+Uso: python -m benchmarks.move_historic --rows 120000 --ids 1000 30000 100000
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+from benchmarks.generator import populate
+from models.database_manager import DatabaseManager, INSERT_COLUMNS
+
+
+def per_row_move(db_path, ids):
+    """move_to_historic como antes: un INSERT por fila en bobina_h."""
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    limit = conn.getlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER)
+    chunks = [ids[start:start + limit] for start in range(0, len(ids), limit)]
+    columns = ", ".join(["id"] + INSERT_COLUMNS + ["created_at"])
+
+    rows = []
+    for chunk in chunks:
+        placeholders = ', '.join(['?' for _ in chunk])
+        cursor.execute(f"SELECT {columns} FROM bobina WHERE id IN ({placeholders})", chunk)
+        rows.extend(cursor.fetchall())
+
+    for row in rows:
+        row_dict = dict(row)
+        row_dict.pop('id')
+        insert_columns = ', '.join(row_dict.keys())
+        value_placeholders = ', '.join(['?' for _ in row_dict])
+        cursor.execute(
+            f"INSERT INTO bobina_h ({insert_columns}) VALUES ({value_placeholders})",
+            list(row_dict.values())
+        )
+
+    for chunk in chunks:
+        placeholders = ', '.join(['?' for _ in chunk])
+        cursor.execute(f"DELETE FROM bobina WHERE id IN ({placeholders})", chunk)
+    conn.commit()
+    conn.close()
+    return True
+
+
+def measure(method, base_path, ids):
+    """Mueve los IDs sobre una copia de la base y cuenta las filas restantes."""
+    work_dir = tempfile.mkdtemp(prefix="bobinas_bench_")
+    db_manager = None
+    try:
+        db_path = os.path.join(work_dir, "produccion.db")
+        shutil.copy(base_path, db_path)
+        if method == "insert_select":
+            # El gestor se abre antes de medir: solo cuenta move_to_historic
+            with contextlib.redirect_stdout(sys.stderr):
+                db_manager = DatabaseManager(db_path, cache_size=0)
+            move = db_manager.move_to_historic
+        else:
+            move = lambda selected: per_row_move(db_path, selected)
+        start = time.perf_counter()
+        ok = move(ids)
+        elapsed = time.perf_counter() - start
+        if db_manager is not None:
+            db_manager.close()
+        conn = sqlite3.connect(db_path)
+        remaining = conn.execute("SELECT COUNT(*) FROM bobina").fetchone()[0]
+        conn.close()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return {"ok": ok, "ms": round(elapsed * 1000, 1), "remaining": remaining}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark del paso al histórico")
+    parser.add_argument("--rows", type=int, default=120000, help="Filas de la base generada")
+    parser.add_argument("--ids", type=int, nargs="+", default=[1000, 30000, 100000],
+                        help="IDs movidos en cada escenario")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    work_dir = tempfile.mkdtemp(prefix="bobinas_bench_")
+    base_path = os.path.join(work_dir, "base.db")
+    rng = random.Random(args.seed)
+    results = []
+    try:
+        with contextlib.redirect_stdout(sys.stderr):
+            populate(base_path, args.rows, args.seed).close()
+        for count in args.ids:
+            ids = sorted(rng.sample(range(1, args.rows + 1), min(count, args.rows)))
+            for method in ("fila_a_fila", "insert_select"):
+                result = {"ids": len(ids), "method": method}
+                result.update(measure(method, base_path, ids))
+                results.append(result)
+                print(result, file=sys.stderr)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        "meta": {"rows": args.rows, "python": sys.version.split()[0],
+                 "sqlite": sqlite3.sqlite_version},
+        "results": results,
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Memoria de los resultados de lectura: lista de diccionarios frente a BobinaResultSet.
+
+Antes, los métodos de lectura devolvían [dict(row) for row in rows]. La
+versión anterior se repite en dict_rows y se compara con
+get_all_bobinas, que devuelve un BobinaResultSet por columnas. La memoria
+se mide con tracemalloc: lo que sigue vivo tras la carga (el resultado) y
+el pico durante la lectura.
+
+Uso: python -m benchmarks.result_memory --rows 500000
+"""
+import argparse
+import contextlib
+import gc
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.generator import populate
+from models.database_manager import SELECT_COLUMNS
+
+
+def dict_rows(db_manager):
+    """get_all_bobinas como antes: un diccionario por fila."""
+    with db_manager.pool.reader() as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = sqlite3.Row
+        cursor.execute(f"SELECT {SELECT_COLUMNS} FROM bobina ORDER BY id DESC")
+        rows = cursor.fetchall()
+        result = [dict(row) for row in rows]
+        cursor.close()
+    return result
+
+
+def measure(load, db_manager):
+    """Carga el resultado con tracemalloc activo y mide su memoria."""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = load(db_manager)
+    elapsed = time.perf_counter() - start
+    live, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rows = len(result)
+    del result
+    return {
+        "rows": rows,
+        "live_mb": round(live / 1e6, 1),
+        "bytes_per_row": round(live / rows) if rows else None,
+        "peak_mb": round(peak / 1e6, 1),
+        "seconds": round(elapsed, 2),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Memoria de los resultados de lectura")
+    parser.add_argument("--rows", type=int, default=500000, help="Filas de la base generada")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    work_dir = tempfile.mkdtemp(prefix="bobinas_bench_")
+    results = []
+    try:
+        with contextlib.redirect_stdout(sys.stderr):
+            db_manager = populate(os.path.join(work_dir, "produccion.db"), args.rows, args.seed)
+        for name, load in (("lista_de_dict", dict_rows),
+                           ("BobinaResultSet", lambda manager: manager.get_all_bobinas())):
+            result = {"result": name}
+            result.update(measure(load, db_manager))
+            results.append(result)
+            print(result, file=sys.stderr)
+        db_manager.close()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        "meta": {"rows": args.rows, "python": sys.version.split()[0],
+                 "sqlite": sqlite3.sqlite_version},
+        "results": results,
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
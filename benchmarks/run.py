@@ -0,0 +1,231 @@
+"""
+Escenarios de rendimiento de DatabaseManager.
+
+Cada escenario se ejecuta `repeat` veces sobre una base generada con
+benchmarks.generator y se informa el tiempo de cada ejecución en JSON,
+junto con el tamaño de la base, la semilla y las versiones de Python y
+SQLite, para poder comparar resultados entre cambios.
+
+Uso:
+    python -m benchmarks --rows 100000 --repeat 5 --output resultados.json
+"""
+import argparse
+import contextlib
+import csv
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from benchmarks.generator import populate
+from models.database_manager import BOBINA_COLUMNS, DatabaseManager
+
+
+def time_call(function, repeat):
+    """
+    Mide el tiempo de varias ejecuciones de una función.
+
+    Args:
+        function (callable): Función sin argumentos; recibe el número de ejecución
+        repeat (int): Número de ejecuciones
+
+    Returns:
+        dict: Tiempos en milisegundos y filas devueltas por la última ejecución
+    """
+    runs = []
+    rows = None
+    for run in range(repeat):
+        start = time.perf_counter()
+        result = function(run)
+        runs.append((time.perf_counter() - start) * 1000)
+        rows = result if isinstance(result, int) else len(result)
+    return {
+        "runs_ms": [round(value, 3) for value in runs],
+        "min_ms": round(min(runs), 3),
+        "median_ms": round(statistics.median(runs), 3),
+        "max_ms": round(max(runs), 3),
+        "rows": rows,
+    }
+
+
+def filter_shapes(db_manager):
+    """
+    Arma un filtro de cada tipo con valores que existen en la base.
+
+    Returns:
+        dict: Filtros por nombre de escenario
+    """
+    with db_manager.pool.reader() as conn:
+        count = conn.execute("SELECT COUNT(*) FROM bobina").fetchone()[0]
+        middle = conn.execute(
+            "SELECT id, of, fecha, ancho FROM bobina ORDER BY id LIMIT 1 OFFSET ?",
+            [count // 2]
+        ).fetchone()
+    return {
+        "of": {"of": middle["of"]},
+        "of_corta": {"of": middle["of"][:2]},
+        "fecha_dia": {"fecha": middle["fecha"][:10]},
+        "turno": {"turno": "A"},
+        "codcal": {"codcal": "02"},
+        "desccal": {"desccal": "LINER"},
+        "ancho": {"ancho": str(middle["ancho"])},
+        "id": {"id": str(middle["id"])},
+        "of_y_turno": {"of": middle["of"], "turno": "B"},
+        "peso_rango": {"peso_min": "300", "peso_max": "320"},
+        "fecha_rango": {"fecha_desde": middle["fecha"][:10], "fecha_hasta": middle["fecha"][:10]},
+        "sin_resultados": {"of": "99999999"},
+    }
+
+
+def export_csv(rows, path):
+    """Escribe filas a CSV igual que la exportación de la pantalla principal."""
+    count = 0
+    with open(path, "w", newline="") as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(BOBINA_COLUMNS)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def run_scenarios(db_manager, repeat=5, sample=1000, seed=42, work_dir=None):
+    """
+    Ejecuta todos los escenarios.
+
+    Los escenarios que modifican la base (eliminación y paso al histórico)
+    se ejecutan al final y cada repetición usa IDs distintos.
+
+    Args:
+        db_manager (DatabaseManager): Gestor sobre la base generada
+        repeat (int): Ejecuciones por escenario
+        sample (int): IDs usados por los escenarios de selección
+        seed (int): Semilla para elegir los IDs
+        work_dir (str): Directorio para los CSV exportados
+
+    Returns:
+        list: Un diccionario por escenario con sus tiempos
+    """
+    rng = random.Random(seed)
+    work_dir = work_dir or tempfile.gettempdir()
+    with db_manager.pool.reader() as conn:
+        all_ids = [row[0] for row in conn.execute("SELECT id FROM bobina")]
+    # IDs distintos para cada repetición de cada escenario de selección
+    pool = rng.sample(all_ids, min(len(all_ids), sample * (2 * repeat + 1)))
+    batches = [pool[i:i + sample] for i in range(0, len(pool), sample)]
+
+    results = []
+
+    def record(name, function, **params):
+        result = {"scenario": name, "params": params}
+        result.update(time_call(function, repeat))
+        results.append(result)
+        print(f"{name:<28} {result['median_ms']:>10.1f} ms  ({result['rows']} filas)")
+
+    record("get_all_bobinas", lambda run: db_manager.get_all_bobinas())
+    for name, filters in filter_shapes(db_manager).items():
+        record(f"filter_bobinas.{name}", lambda run, f=filters: db_manager.filter_bobinas(f),
+               filters=filters)
+    record("get_bobinas_page", lambda run: db_manager.get_bobinas_page(limit=200), limit=200)
+    for sort in ([("peso", True)], [("fecha", False)], [("codcal", True), ("peso", False)]):
+        # Nombre corto: columnas separadas por comas, "-" delante si es descendente
+        name = ",".join(("" if ascending else "-") + column for column, ascending in sort)
+        first_page = db_manager.get_bobinas_page(limit=200, sort=sort)
+        after = first_page[-1] if first_page else None
+        record(f"page_orden.{name}",
+               lambda run, sort=sort, after=after: db_manager.get_bobinas_page(
+                   limit=200, sort=sort, after=after),
+               limit=200, sort=sort)
+    record("get_bobinas_by_ids", lambda run: db_manager.get_bobinas_by_ids(batches[0]),
+           ids=len(batches[0]))
+
+    csv_path = os.path.join(work_dir, "benchmark_export.csv")
+    record("export_csv.seleccion",
+           lambda run: export_csv(db_manager.iter_bobinas(ids=batches[0]), csv_path),
+           ids=len(batches[0]))
+    record("export_csv.todo", lambda run: export_csv(db_manager.iter_bobinas(), csv_path))
+    os.remove(csv_path)
+
+    delete_batches = batches[1:1 + repeat]
+    move_batches = batches[1 + repeat:1 + 2 * repeat]
+    if len(move_batches) == repeat:
+        record("delete_bobinas",
+               lambda run: len(delete_batches[run]) if db_manager.delete_bobinas(delete_batches[run]) else 0,
+               ids=sample)
+        record("move_to_historic",
+               lambda run: len(move_batches[run]) if db_manager.move_to_historic(move_batches[run]) else 0,
+               ids=sample)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de la capa de datos de bobinas")
+    parser.add_argument("--rows", type=int, default=100000, help="Filas a generar (10k a 10M)")
+    parser.add_argument("--seed", type=int, default=42, help="Semilla del generador")
+    parser.add_argument("--repeat", type=int, default=5, help="Ejecuciones por escenario")
+    parser.add_argument("--sample", type=int, default=1000, help="IDs por escenario de selección")
+    parser.add_argument("--db", help="Base a usar; si no existe se genera (por defecto, temporal)")
+    parser.add_argument("--output", help="Archivo JSON de resultados (por defecto, salida estándar)")
+    args = parser.parse_args(argv)
+
+    work_dir = None
+    if args.db:
+        db_path = args.db
+    else:
+        work_dir = tempfile.mkdtemp(prefix="bobinas_bench_")
+        db_path = os.path.join(work_dir, "produccion.db")
+
+    try:
+        # Los mensajes del gestor van a stderr para no mezclarse con el JSON
+        with contextlib.redirect_stdout(sys.stderr):
+            start = time.perf_counter()
+            if os.path.exists(db_path):
+                db_manager = DatabaseManager(db_path, cache_size=0)
+                generate_s = None
+            else:
+                db_manager = populate(db_path, args.rows, args.seed)
+                generate_s = round(time.perf_counter() - start, 3)
+            with db_manager.pool.reader() as conn:
+                rows = conn.execute("SELECT COUNT(*) FROM bobina").fetchone()[0]
+            print(f"Base: {db_path} ({rows} filas)")
+
+            results = run_scenarios(
+                db_manager, args.repeat, args.sample, args.seed,
+                os.path.dirname(os.path.abspath(db_path))
+            )
+            db_manager.close()
+
+        report = {
+            "meta": {
+                "rows": rows,
+                "seed": args.seed,
+                "repeat": args.repeat,
+                "generate_s": generate_s,
+                "db_size_bytes": os.path.getsize(db_path),
+                "timestamp": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "sqlite": sqlite3.sqlite_version,
+                "platform": platform.platform(),
+            },
+            "results": results,
+        }
+        output = json.dumps(report, indent=2, ensure_ascii=False)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as handle:
+                handle.write(output + "\n")
+        else:
+            print(output)
+    finally:
+        if work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+Coste de dibujar la tabla de MainScreen: DataTable completa frente a VirtualGrid.
+
+Cuenta los controles de cada versión y mide el tiempo de la primera
+actualización de la página (construir los controles y serializar los
+comandos que Flet enviaría al cliente), con una conexión simulada que
+solo registra los comandos.
+
+También mide una actualización de la tabla ya dibujada en la que cambia
+una fracción de las filas (--change): reconstruirla completa frente a
+conciliarla por ID (VirtualGrid.reconcile).
+
+Uso: python -m benchmarks.ui_grid --rows 2000 20000 --change-rows 5000 --change 0.01
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+
+import flet as ft
+from flet_core.connection import Connection
+from flet_core.protocol import CommandEncoder
+
+from benchmarks.generator import generate_bobinas
+from models.result_set import BobinaResultSet
+from views.main_screen import GRID_COLUMNS
+from views.virtual_grid import VirtualGrid
+
+
+class RecordingConnection(Connection):
+    """Conexión simulada: asigna IDs a los controles y suma el tamaño de los comandos."""
+
+    def __init__(self):
+        super().__init__()
+        self.next_id = 1
+        self.bytes_sent = 0
+
+    def send_commands(self, session_id, commands):
+        self.bytes_sent += len(json.dumps(commands, cls=CommandEncoder))
+        results = []
+        for command in commands:
+            if command.name == "add":
+                ids = [f"_{self.next_id + i}" for i in range(len(command.commands))]
+                self.next_id += len(ids)
+                results.append(" ".join(ids))
+        return type("Response", (), {"results": results, "error": ""})()
+
+
+def datatable(rows):
+    """Tabla como la construía MainScreen antes de la virtualización."""
+    table = ft.DataTable(columns=[ft.DataColumn(ft.Text(title)) for _, title, _ in GRID_COLUMNS])
+    for row in rows:
+        checkbox = ft.Checkbox(value=False, data=row["id"])
+        cells = [ft.DataCell(ft.Row([checkbox, ft.Text(row.text("id"))]))]
+        cells += [ft.DataCell(ft.Text(row.text(column))) for column, _, _ in GRID_COLUMNS[1:]]
+        table.rows.append(ft.DataRow(data=row["id"], cells=cells))
+    return table
+
+
+def virtual_grid(rows):
+    """Tabla virtualizada con las mismas filas."""
+    grid = VirtualGrid(GRID_COLUMNS)
+    grid.set_rows(rows)
+    return grid
+
+
+def count_controls(control):
+    return 1 + sum(count_controls(child) for child in control._get_children())
+
+
+def measure(build, rows):
+    """Construye la tabla, la agrega a una página simulada y mide la actualización."""
+    connection = RecordingConnection()
+    page = ft.Page(connection, "benchmark", asyncio.new_event_loop())
+    start = time.perf_counter()
+    control = build(rows)
+    page.add(control)
+    elapsed = time.perf_counter() - start
+    return {
+        "controls": count_controls(control),
+        "first_paint_ms": round(elapsed * 1000, 1),
+        "payload_bytes": connection.bytes_sent,
+    }
+
+
+def datatable_rebuild(table, rows):
+    """Actualización de la DataTable como la hacía MainScreen: vaciar y reconstruir."""
+    new_table = datatable(rows)
+    table.rows.clear()
+    table.rows.extend(new_table.rows)
+
+
+def grid_rebuild(grid, rows):
+    """Actualización de VirtualGrid sin conciliar: vaciar y volver a agregar."""
+    grid.set_rows([])
+    grid.append_rows(rows)
+
+
+def grid_reconcile(grid, rows):
+    """Actualización de VirtualGrid conciliando por ID."""
+    grid.reconcile(rows)
+
+
+def changed_rows(rows, fraction, seed, span=None):
+    """
+    Copia de las filas con una fracción quitada y otra tanta insertada en
+    posiciones al azar, entre las primeras `span` filas (todas si es None).
+    """
+    rng = random.Random(seed)
+    span = min(span or len(rows), len(rows))
+    count = max(1, int(len(rows) * fraction))
+    removed = set(rng.sample(range(span), count // 2))
+    result = [row for index, row in enumerate(rows) if index not in removed]
+    next_id = len(rows) + 1
+    for new_row in generate_bobinas(count - count // 2, seed + 1):
+        position = rng.randrange(span - len(removed) + 1)
+        result.insert(position, BobinaResultSet([(next_id,) + new_row])[0])
+        next_id += 1
+    return result
+
+
+def measure_change(build, update, rows, new_rows):
+    """Dibuja la tabla y mide la actualización que la lleva a new_rows."""
+    connection = RecordingConnection()
+    page = ft.Page(connection, "benchmark", asyncio.new_event_loop())
+    control = build(rows)
+    page.add(control)
+    connection.bytes_sent = 0
+    start = time.perf_counter()
+    update(control, new_rows)
+    control.update()
+    elapsed = time.perf_counter() - start
+    return {"update_ms": round(elapsed * 1000, 1), "payload_bytes": connection.bytes_sent}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de la tabla de MainScreen")
+    parser.add_argument("--rows", type=int, nargs="+", default=[2000, 20000])
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--change-rows", type=int, default=5000)
+    parser.add_argument("--change", type=float, default=0.01,
+                        help="Fracción de filas que cambian en la actualización")
+    args = parser.parse_args(argv)
+
+    results = []
+    for count in args.rows:
+        rows = BobinaResultSet(
+            (index + 1,) + row
+            for index, row in enumerate(generate_bobinas(count, args.seed))
+        )
+        for name, build in (("datatable", datatable), ("virtual_grid", virtual_grid)):
+            result = {"rows": count, "table": name}
+            result.update(measure(build, list(rows)))
+            results.append(result)
+            print(result, file=sys.stderr)
+
+    rows = list(BobinaResultSet(
+        (index + 1,) + row
+        for index, row in enumerate(generate_bobinas(args.change_rows, args.seed))
+    ))
+    # Cambios repartidos por toda la tabla o concentrados en la primera página
+    for spread, span in (("tabla", None), ("primera_pagina", 200)):
+        new_rows = changed_rows(rows, args.change, args.seed, span)
+        for name, build, update in (
+            ("datatable.rebuild", datatable, datatable_rebuild),
+            ("virtual_grid.rebuild", virtual_grid, grid_rebuild),
+            ("virtual_grid.reconcile", virtual_grid, grid_reconcile),
+        ):
+            result = {"rows": args.change_rows, "change": args.change, "spread": spread,
+                      "update": name}
+            result.update(measure_change(build, update, rows, new_rows))
+            results.append(result)
+            print(result, file=sys.stderr)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+"""
+Agregados de producción sobre las tablas bobina y bobina_h.
+
+Las columnas se leen en bloque a arrays de NumPy y los agrupamientos se
+resuelven de forma vectorizada (np.unique + np.bincount), sin recorrer las
+filas en Python.
+"""
+import itertools
+
+import numpy as np
+
+from models.cold_storage import ColdFile, list_cold_files
+
+# Columnas numéricas disponibles para agregar
+VALUE_COLUMNS = ["ancho", "diametro", "gramaje", "peso"]
+
+# Expresión SQL de cada criterio de agrupamiento
+GROUP_EXPRESSIONS = {
+    "turno": "turno",
+    "of": "of",
+    "codcal": "codcal",
+    "desccal": "desccal",
+    "fecha": "substr(fecha, 1, 10)",  # Día, sin la hora
+    "ancho": "ancho",
+    "diametro": "diametro",
+    "gramaje": "gramaje",
+}
+
+# Tablas que se consultan por defecto: producción actual e histórica
+# (bobina_h incluye los archivos históricos mensuales)
+DEFAULT_TABLES = ("bobina", "bobina_h")
+
+
+class ProductionAnalytics:
+    """Calcula totales y estadísticas de producción agrupadas."""
+
+    def __init__(self, db_manager, batch_size=50000):
+        """
+        Inicializa el módulo de análisis.
+
+        Args:
+            db_manager (DatabaseManager): Gestor de base de datos a consultar
+            batch_size (int): Número de filas leídas por lote
+        """
+        self.db_manager = db_manager
+        self.batch_size = batch_size
+
+    def load_columns(self, group_by=(), tables=DEFAULT_TABLES):
+        """
+        Lee en bloque las columnas de agrupamiento y las columnas numéricas.
+
+        Args:
+            group_by (iterable): Criterios de GROUP_EXPRESSIONS a leer
+            tables (iterable): Tablas a consultar; "bobina_h" abarca también
+                las particiones mensuales del archivo histórico
+
+        Returns:
+            tuple: Lista con un array por criterio de agrupamiento y diccionario
+            con un array float64 por cada columna de VALUE_COLUMNS
+        """
+        group_by = list(group_by)
+        for name in group_by:
+            if name not in GROUP_EXPRESSIONS:
+                raise ValueError(f"Criterio de agrupamiento no válido: {name}")
+
+        selected = [GROUP_EXPRESSIONS[name] for name in group_by] + VALUE_COLUMNS
+        select_list = ", ".join(selected)
+
+        # Un lote de valores por columna seleccionada
+        chunks = [[] for _ in selected]
+        total = 0
+        with self.db_manager.pool.reader() as conn:
+            for table in tables:
+                if table != "bobina_h":
+                    total += self._read_chunks(conn, f"SELECT {select_list} FROM {table}", [], chunks)
+                    continue
+                # Histórico: bobina_h y las particiones mensuales adjuntas
+                for sources, conditions, values in self.db_manager.historic_chunks(conn):
+                    where = " WHERE " + " AND ".join(conditions) if conditions else ""
+                    query = " UNION ALL ".join(
+                        f"SELECT {select_list} FROM {source}{where}" for source in sources
+                    )
+                    total += self._read_chunks(conn, query, values * len(sources), chunks)
+                total += self._read_cold_files(group_by, chunks)
+
+        keys = []
+        for name, column_chunks in zip(group_by, chunks):
+            flat = itertools.chain.from_iterable(column_chunks)
+            if GROUP_EXPRESSIONS[name] in VALUE_COLUMNS:
+                keys.append(np.fromiter(flat, dtype=np.float64, count=total))
+            else:
+                # Claves de texto: los nulos se agrupan como ""
+                keys.append(np.array(["" if v is None else v for v in flat], dtype=object))
+
+        values = {}
+        for name, column_chunks in zip(VALUE_COLUMNS, chunks[len(group_by):]):
+            flat = itertools.chain.from_iterable(column_chunks)
+            values[name] = np.fromiter(flat, dtype=np.float64, count=total)
+        return keys, values
+
+    def _read_chunks(self, conn, query, values, chunks):
+        """
+        Ejecuta una consulta y agrega sus columnas, por lotes, a `chunks`.
+
+        Returns:
+            int: Número de filas leídas
+        """
+        total = 0
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        try:
+            cursor.execute(query, values)
+            while True:
+                rows = cursor.fetchmany(self.batch_size)
+                if not rows:
+                    break
+                total += len(rows)
+                for position, column_values in enumerate(zip(*rows)):
+                    chunks[position].append(column_values)
+        finally:
+            cursor.close()
+        return total
+
+    def _read_cold_files(self, group_by, chunks):
+        """
+        Agrega a `chunks` las columnas de los archivos fríos del histórico.
+
+        Returns:
+            int: Número de filas leídas
+        """
+        total = 0
+        columns = list(group_by) + VALUE_COLUMNS
+        for desde, hasta, path in list_cold_files(self.db_manager.archive_dir):
+            cold_file = ColdFile(path)
+            data = cold_file.read_columns(set(columns))
+            for position, column in enumerate(columns):
+                values = data[column]
+                if position < len(group_by) and column == "fecha":
+                    values = [fecha[:10] for fecha in values]  # Día, sin la hora
+                chunks[position].append(values)
+            total += len(cold_file)
+        return total
+
+    def aggregate(self, group_by, value="peso", percentiles=(50, 90), tables=DEFAULT_TABLES):
+        """
+        Agrupa la producción y calcula cantidad, suma, media y percentiles.
+
+        Args:
+            group_by (iterable): Criterios de agrupamiento (claves de GROUP_EXPRESSIONS)
+            value (str): Columna numérica a agregar
+            percentiles (iterable): Percentiles a calcular (0-100)
+            tables (iterable): Tablas a consultar
+
+        Returns:
+            list: Un diccionario por grupo con las claves del grupo, "count",
+            "sum", "mean" y "p<N>" por cada percentil, ordenado por las claves
+        """
+        if value not in VALUE_COLUMNS:
+            raise ValueError(f"Columna numérica no válida: {value}")
+        group_by = list(group_by)
+        keys, values = self.load_columns(group_by, tables)
+        return group_stats(
+            keys, values[value], group_names=group_by, percentiles=percentiles
+        )
+
+    def kilos_por_of(self, **kwargs):
+        """Kilos producidos por orden de fabricación."""
+        return self.aggregate(["of"], "peso", **kwargs)
+
+    def kilos_por_turno(self, **kwargs):
+        """Kilos producidos por turno."""
+        return self.aggregate(["turno"], "peso", **kwargs)
+
+    def kilos_por_fecha(self, **kwargs):
+        """Kilos producidos por día."""
+        return self.aggregate(["fecha"], "peso", **kwargs)
+
+    def kilos_por_gramaje_ancho(self, **kwargs):
+        """Kilos producidos por combinación de gramaje y ancho."""
+        return self.aggregate(["gramaje", "ancho"], "peso", **kwargs)
+
+
+def group_stats(keys, values, group_names=None, percentiles=(50, 90)):
+    """
+    Calcula estadísticas agrupadas de forma vectorizada.
+
+    Args:
+        keys (list): Arrays de NumPy con las claves de agrupamiento (misma longitud)
+        values (numpy.ndarray): Valores a agregar
+        group_names (list): Nombres de las claves en el resultado
+        percentiles (iterable): Percentiles a calcular (0-100)
+
+    Returns:
+        list: Un diccionario por grupo, ordenado por las claves
+    """
+    group_names = group_names or [f"key{i}" for i in range(len(keys))]
+    values = np.asarray(values, dtype=np.float64)
+    if values.size == 0:
+        return []
+
+    # Codificar cada clave como entero y combinarlas en un único código por fila
+    uniques = []
+    codes = np.zeros(values.size, dtype=np.int64)
+    for key in keys:
+        unique, inverse = _factorize(key)
+        uniques.append(unique)
+        codes = codes * len(unique) + inverse
+    if len(keys) == 1:
+        # Con una sola clave los códigos ya son consecutivos
+        group_codes, group_ids = np.arange(len(uniques[0])), codes
+    else:
+        group_codes, group_ids = np.unique(codes, return_inverse=True)
+        group_ids = group_ids.reshape(-1)
+    n_groups = len(group_codes)
+
+    counts = np.bincount(group_ids, minlength=n_groups)
+    sums = np.bincount(group_ids, weights=values, minlength=n_groups)
+    means = sums / counts
+
+    # Percentiles: ordenar por (grupo, valor) e interpolar dentro de cada grupo.
+    # El orden se arma con una única clave entera grupo * n + rango del valor,
+    # bastante más rápida de ordenar que np.lexsort sobre dos columnas
+    n = values.size
+    rank = np.empty(n, dtype=np.int64)
+    rank[np.argsort(values, kind="stable")] = np.arange(n)
+    order = np.argsort(group_ids.astype(np.int64) * n + rank)
+    sorted_values = values[order]
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    percentile_values = {}
+    for p in percentiles:
+        position = starts + (counts - 1) * (p / 100.0)
+        lower = np.floor(position).astype(np.int64)
+        upper = np.ceil(position).astype(np.int64)
+        fraction = position - lower
+        percentile_values[p] = (
+            sorted_values[lower] * (1 - fraction) + sorted_values[upper] * fraction
+        )
+
+    # Recuperar las claves originales de cada grupo a partir del código combinado
+    key_indices = []
+    remaining = group_codes.copy()
+    for unique in reversed(uniques):
+        key_indices.append(remaining % len(unique))
+        remaining //= len(unique)
+    key_indices.reverse()
+
+    result = []
+    for g in range(n_groups):
+        row = {
+            name: _to_python(unique[indices[g]])
+            for name, unique, indices in zip(group_names, uniques, key_indices)
+        }
+        row["count"] = int(counts[g])
+        row["sum"] = float(sums[g])
+        row["mean"] = float(means[g])
+        for p in percentiles:
+            row[f"p{p:g}"] = float(percentile_values[p][g])
+        result.append(row)
+    return result
+
+
+def _factorize(key):
+    """
+    Codifica una clave como enteros.
+
+    Returns:
+        tuple: Valores únicos ordenados y el código (índice en los únicos) de cada fila
+    """
+    key = np.asarray(key)
+    if key.dtype.kind not in "USO":
+        unique, inverse = np.unique(key, return_inverse=True)
+        return unique, inverse.reshape(-1)
+
+    # Textos: un diccionario es mucho más rápido que ordenar todas las cadenas
+    index = {}
+    codes = np.fromiter(
+        (index.setdefault(value, len(index)) for value in key.tolist()),
+        dtype=np.int64, count=len(key)
+    )
+    labels = np.array(list(index), dtype=object)
+    order = np.argsort(labels.astype(str), kind="stable")
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order))
+    return labels[order], rank[codes]
+
+
+def _to_python(value):
+    """Convierte un escalar de NumPy a su tipo nativo de Python."""
+    return value.item() if hasattr(value, "item") else value
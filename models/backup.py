@@ -0,0 +1,194 @@
+"""
+Copias de seguridad en línea de produccion.db y del archivo histórico.
+
+Cada copia es un directorio produccion_AAAAMMDD_HHMMSS con:
+
+- produccion.db, copiada con la API de backup de SQLite (Connection.backup)
+  por tramos de páginas con una pausa entre tramos;
+- las particiones mensuales del histórico (historico_AAAA_MM.db), copiadas
+  de la misma forma;
+- los archivos fríos (historico_frio_*.bcol), copiados tal cual: se
+  escriben completos y se renombran, nunca se modifican.
+
+La conexión de origen de cada base mantiene abierta una transacción de
+lectura durante su copia: en modo WAL eso fija una instantánea coherente sin
+bloquear al escritor, y evita que los commits de la aplicación o del
+servicio de ingesta reinicien la copia.
+
+Los registros solo pasan de produccion.db a las particiones
+(move_to_historic) y de las particiones a los archivos fríos
+(freeze_historic). Por eso los archivos se copian en ese mismo orden, y las
+particiones se listan después de fijar la instantánea de produccion.db: un
+registro que se mueve durante la copia puede quedar en dos archivos (con el
+mismo ID), pero nunca en ninguno.
+
+La copia se escribe primero en un directorio .part y se renombra al
+terminar; se conservan las `keep` copias más recientes.
+"""
+import os
+import re
+import shutil
+import sqlite3
+from datetime import datetime
+
+from models.cold_storage import list_cold_files
+from models.historic_archive import list_partitions
+
+BACKUP_DIRNAME = "produccion_{timestamp}"
+_BACKUP_PATTERN = re.compile(r"^produccion_\d{8}_\d{6}(\.db)?$")
+
+
+def list_backups(backup_dir):
+    """
+    Lista las copias de seguridad existentes.
+
+    Incluye las copias de un único archivo (produccion_AAAAMMDD_HHMMSS.db)
+    que se hacían antes de copiar también el histórico.
+
+    Args:
+        backup_dir (str): Directorio de las copias
+
+    Returns:
+        list: Rutas de las copias, de la más reciente a la más antigua
+    """
+    if not os.path.isdir(backup_dir):
+        return []
+    names = sorted(
+        (name for name in os.listdir(backup_dir) if _BACKUP_PATTERN.match(name)),
+        reverse=True,
+    )
+    return [os.path.join(backup_dir, name) for name in names]
+
+
+def _page_count(path, busy_timeout):
+    """Número de páginas de una base de datos (0 si ya no existe)."""
+    try:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, timeout=busy_timeout)
+    except sqlite3.OperationalError:
+        return 0
+    try:
+        return conn.execute("PRAGMA page_count").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def _backup_file(source_path, target_path, pages, sleep, report, busy_timeout):
+    """
+    Copia una base de datos SQLite sobre una instantánea de lectura.
+
+    Returns:
+        bool: False si la base ya no existe (por ejemplo, una partición
+        que freeze_historic borró al quedar vacía)
+    """
+    try:
+        # mode=rw: no crear una base vacía si el archivo desapareció
+        source = sqlite3.connect(
+            f"file:{source_path}?mode=rw", uri=True, timeout=busy_timeout, isolation_level=None
+        )
+    except sqlite3.OperationalError:
+        return False
+    try:
+        # Fijar la instantánea: la copia ve la base tal como está ahora
+        source.execute("BEGIN")
+        source.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+        target = sqlite3.connect(target_path, isolation_level=None)
+        try:
+            source.backup(target, pages=pages, progress=report, sleep=sleep)
+            # La copia es un único archivo, sin -wal ni -shm
+            target.execute("PRAGMA journal_mode=DELETE")
+        finally:
+            target.close()
+        source.execute("COMMIT")
+    finally:
+        source.close()
+    return True
+
+
+def backup_database(db_path, backup_dir, pages=256, sleep=0.05, keep=7, progress=None,
+                    busy_timeout=5.0, archive_dir=None):
+    """
+    Copia la base de datos y el archivo histórico sin detener las escrituras.
+
+    Args:
+        db_path (str): Base de datos de origen
+        backup_dir (str): Directorio de las copias (se crea si no existe)
+        pages (int): Páginas copiadas en cada tramo
+        sleep (float): Segundos de pausa entre tramos
+        keep (int): Copias que se conservan (0 conserva todas)
+        progress (callable): Función que recibe (páginas copiadas, páginas totales)
+            de todas las bases tras cada tramo; se llama desde el hilo que
+            hace la copia
+        busy_timeout (float): Segundos de espera ante un bloqueo
+        archive_dir (str): Directorio de las particiones y archivos fríos
+            (por defecto, el de la base de datos)
+
+    Returns:
+        str: Ruta del directorio de la copia creada
+    """
+    if archive_dir is None:
+        archive_dir = os.path.dirname(os.path.abspath(db_path))
+    os.makedirs(backup_dir, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    path = os.path.join(backup_dir, BACKUP_DIRNAME.format(timestamp=timestamp))
+    temp_path = path + ".part"
+
+    # Total estimado para el progreso; las particiones se vuelven a listar
+    # después de copiar produccion.db
+    databases = [db_path] + [partition for _, partition in list_partitions(archive_dir)]
+    totals = {source: _page_count(source, busy_timeout) for source in databases}
+    copied_before = 0
+
+    def copy(source):
+        nonlocal copied_before
+
+        def report(status, remaining, total):
+            # El total puede crecer mientras se copia: se usa el real
+            totals[source] = total
+            if progress is not None:
+                progress(copied_before + total - remaining, sum(totals.values()))
+
+        target = os.path.join(temp_path, os.path.basename(source))
+        _backup_file(source, target, pages, sleep, report, busy_timeout)
+        copied_before += totals[source]
+
+    # Restos de una copia interrumpida
+    shutil.rmtree(temp_path, ignore_errors=True)
+    try:
+        os.makedirs(temp_path)
+        copy(db_path)
+
+        # Las particiones se listan con la instantánea de produccion.db ya
+        # fijada: una partición creada por move_to_historic antes de fijarla
+        # tiene filas que la instantánea ya no ve en bobina
+        partitions = [partition for _, partition in list_partitions(archive_dir)]
+        for source in partitions:
+            if source not in totals:
+                totals[source] = _page_count(source, busy_timeout)
+        for source in set(databases[1:]) - set(partitions):
+            # Borrada por freeze_historic: sus filas van a un archivo frío
+            del totals[source]
+        for source in partitions:
+            copy(source)
+
+        # Los archivos fríos al final: reciben filas de las particiones
+        for _, _, cold_file in list_cold_files(archive_dir):
+            try:
+                shutil.copy2(cold_file, os.path.join(temp_path, os.path.basename(cold_file)))
+            except FileNotFoundError:
+                pass
+
+        # Otra copia del mismo segundo: la reemplaza esta, más reciente
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        os.replace(temp_path, path)
+    except BaseException:
+        shutil.rmtree(temp_path, ignore_errors=True)
+        raise
+
+    if keep:
+        for old_path in list_backups(backup_dir)[keep:]:
+            if os.path.isdir(old_path):
+                shutil.rmtree(old_path)
+            else:
+                os.remove(old_path)
+    return path
@@ -0,0 +1,402 @@
+"""
+Almacenamiento en frío del histórico en formato columnar comprimido.
+
+Un archivo frío (historico_frio_<desde>_<hasta>.bcol) guarda las bobinas de
+un rango de fechas ordenadas por fecha y divididas en bloques. Dentro de
+cada bloque cada columna se comprime por separado (lzma o zlib):
+
+- turno, of, codcal y desccal se codifican con un diccionario común a todo
+  el archivo y se guardan como arrays de códigos enteros;
+- id y las columnas numéricas se guardan como arrays de tipo fijo;
+- el resto de los textos se guarda como una lista JSON.
+
+Al final del archivo hay un pie en JSON con los diccionarios y, por cada
+bloque, la posición de cada columna y los valores mínimo y máximo, que
+permiten descartar bloques enteros sin descomprimirlos.
+
+Estructura: MAGIC | bloques | pie JSON | longitud del pie (8 bytes)
+"""
+import datetime
+import json
+import lzma
+import os
+import re
+import struct
+import sys
+import zlib
+from array import array
+from itertools import islice
+
+from models.range_filters import (
+    DATE_RANGE_COLUMNS, epoch_of, range_bound, split_range_key,
+)
+from models.result_set import ARRAY_COLUMNS, RESULT_COLUMNS
+
+MAGIC = b"BOBCOL1\n"
+COLD_FILENAME = "historico_frio_{desde}_{hasta}.bcol"
+_FILENAME_PATTERN = re.compile(
+    r"^historico_frio_(\d{4}-\d{2}-\d{2})_(\d{4}-\d{2}-\d{2})\.bcol$"
+)
+
+# Filas por bloque: unidad mínima de lectura y de descarte por mínimo/máximo
+BLOCK_ROWS = 65536
+
+# Columnas de texto con pocos valores distintos: se guardan como códigos
+DICTIONARY_COLUMNS = ["turno", "of", "codcal", "desccal"]
+
+CODECS = {
+    "lzma": (lzma.compress, lzma.decompress),
+    "zlib": (lambda data: zlib.compress(data, 9), zlib.decompress),
+}
+
+
+def cold_path(directory, fecha_desde, fecha_hasta):
+    """Devuelve la ruta del archivo frío de un rango de días (AAAA-MM-DD)."""
+    return os.path.join(directory, COLD_FILENAME.format(desde=fecha_desde, hasta=fecha_hasta))
+
+
+def list_cold_files(directory, fecha_desde=None, fecha_hasta=None):
+    """
+    Lista los archivos fríos cuyo rango se superpone con el indicado.
+
+    Args:
+        directory (str): Directorio de los archivos históricos
+        fecha_desde (str): Primer día del rango (AAAA-MM-DD), opcional
+        fecha_hasta (str): Último día del rango (AAAA-MM-DD), opcional
+
+    Returns:
+        list: Tuplas (desde, hasta, ruta), de la más reciente a la más antigua
+    """
+    files = []
+    for name in os.listdir(directory):
+        match = _FILENAME_PATTERN.match(name)
+        if not match:
+            continue
+        desde, hasta = match.groups()
+        if (fecha_desde and hasta < fecha_desde[:10]) or (fecha_hasta and desde > fecha_hasta[:10]):
+            continue
+        files.append((desde, hasta, os.path.join(directory, name)))
+    files.sort(reverse=True)
+    return files
+
+
+def write_cold_file(path, rows, codec="lzma", block_rows=BLOCK_ROWS):
+    """
+    Escribe un archivo frío.
+
+    El archivo se escribe con otro nombre y se renombra al terminar, de modo
+    que nunca queda un archivo a medio escribir con el nombre definitivo.
+
+    Args:
+        path (str): Ruta del archivo a crear
+        rows (iterable): Tuplas en el orden de RESULT_COLUMNS, ordenadas por
+            (fecha, id); se consumen de a un bloque, sin cargarlas todas
+        codec (str): Compresor de cada columna ("lzma" o "zlib")
+        block_rows (int): Número de filas por bloque
+
+    Returns:
+        int: Número de filas escritas
+    """
+    if codec not in CODECS:
+        raise ValueError(f"Compresor no válido: {codec}")
+    compress = CODECS[codec][0]
+
+    dictionaries = {column: {} for column in DICTIONARY_COLUMNS}
+    blocks = []
+    total = 0
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as output:
+        output.write(MAGIC)
+        rows = iter(rows)
+        while True:
+            block = list(islice(rows, block_rows))
+            if not block:
+                break
+            block_info = {"rows": len(block), "columns": {}, "min": {}, "max": {}, "codes": {}}
+            for column, values in zip(RESULT_COLUMNS, zip(*block)):
+                if column in DICTIONARY_COLUMNS:
+                    index = dictionaries[column]
+                    codes = [index.setdefault(value, len(index)) for value in values]
+                    block_info["codes"][column] = sorted(set(codes))
+                    data = array("I", codes).tobytes()
+                elif column in ARRAY_COLUMNS:
+                    data = array(ARRAY_COLUMNS[column], values).tobytes()
+                else:
+                    data = json.dumps(values, ensure_ascii=False).encode("utf-8")
+
+                present = [value for value in values if value is not None]
+                if present and column not in DICTIONARY_COLUMNS:
+                    block_info["min"][column] = min(present)
+                    block_info["max"][column] = max(present)
+
+                compressed = compress(data)
+                block_info["columns"][column] = [output.tell(), len(compressed)]
+                output.write(compressed)
+            blocks.append(block_info)
+            total += len(block)
+
+        footer = {
+            "version": 1,
+            "codec": codec,
+            "byteorder": sys.byteorder,
+            "columns": RESULT_COLUMNS,
+            "rows": total,
+            "dictionaries": {column: list(index) for column, index in dictionaries.items()},
+            "blocks": blocks,
+        }
+        data = json.dumps(footer, ensure_ascii=False).encode("utf-8")
+        output.write(data)
+        output.write(struct.pack("<Q", len(data)))
+        output.flush()
+        os.fsync(output.fileno())
+    os.replace(temp_path, path)
+    return total
+
+
+def _like_matcher(value):
+    """
+    Devuelve una función que replica `LIKE '%value%'` de SQLite.
+
+    Como LIKE y LOWER de SQLite, solo ignora mayúsculas en letras ASCII:
+    'Ñ' no coincide con 'ñ'.
+    """
+    pattern = "".join(
+        ".*" if char == "%" else "." if char == "_" else re.escape(char)
+        for char in str(value)
+    )
+    regex = re.compile(pattern, re.IGNORECASE | re.ASCII | re.DOTALL)
+    return lambda text: text is not None and regex.search(str(text)) is not None
+
+
+def _range_predicate(column, suffix, value):
+    """
+    Traduce un filtro por rango (ver models.range_filters) a un predicado.
+
+    Las fechas se comparan por su epoch, igual que en SQL. Para descartar
+    bloques se usa el mínimo y el máximo de texto de la columna, con el
+    límite redondeado al día para que el descarte sea siempre seguro.
+
+    Returns:
+        tuple: (columna, prueba por valor, prueba por bloque), o None si el
+        valor no es válido
+    """
+    bound = range_bound(column, suffix, value)
+    if bound is None:
+        return None
+    operator, limit = bound
+
+    if column not in DATE_RANGE_COLUMNS:
+        if operator == ">=":
+            return (
+                column,
+                lambda v: v is not None and v >= limit,
+                lambda b: column in b["max"] and b["max"][column] >= limit,
+            )
+        return (
+            column,
+            lambda v: v is not None and v <= limit,
+            lambda b: column in b["min"] and b["min"][column] <= limit,
+        )
+
+    def in_range(text):
+        epoch = epoch_of(text)
+        if epoch is None:
+            return False
+        return epoch >= limit if operator == ">=" else epoch < limit
+
+    if operator == ">=":
+        day = datetime.datetime.fromtimestamp(limit, datetime.timezone.utc).date().isoformat()
+        return (
+            column,
+            in_range,
+            lambda b: column in b["max"] and b["max"][column] >= day,
+        )
+    last_day = datetime.datetime.fromtimestamp(limit - 1, datetime.timezone.utc).date()
+    next_day = (last_day + datetime.timedelta(days=1)).isoformat()
+    return (
+        column,
+        in_range,
+        lambda b: column in b["min"] and b["min"][column] < next_day,
+    )
+
+
+class ColdFile:
+    """Lector de un archivo frío con descarte de bloques por predicados."""
+
+    def __init__(self, path):
+        """
+        Abre un archivo frío y lee su pie.
+
+        Args:
+            path (str): Ruta del archivo
+        """
+        self.path = path
+        with open(path, "rb") as source:
+            if source.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} no es un archivo frío válido")
+            source.seek(-8, os.SEEK_END)
+            (length,) = struct.unpack("<Q", source.read(8))
+            source.seek(-8 - length, os.SEEK_END)
+            self.footer = json.loads(source.read(length).decode("utf-8"))
+        self._decompress = CODECS[self.footer["codec"]][1]
+        self._swap = self.footer["byteorder"] != sys.byteorder
+
+    def __len__(self):
+        return self.footer["rows"]
+
+    def _read_column(self, source, block, column):
+        """Descomprime una columna de un bloque."""
+        offset, length = block["columns"][column]
+        source.seek(offset)
+        data = self._decompress(source.read(length))
+        if column in DICTIONARY_COLUMNS:
+            codes = array("I")
+            codes.frombytes(data)
+            if self._swap:
+                codes.byteswap()
+            return codes
+        if column in ARRAY_COLUMNS:
+            values = array(ARRAY_COLUMNS[column])
+            values.frombytes(data)
+            if self._swap:
+                values.byteswap()
+            return values
+        return json.loads(data.decode("utf-8"))
+
+    def _decode(self, column, values):
+        """Convierte los códigos de una columna de diccionario en sus valores."""
+        if column not in DICTIONARY_COLUMNS:
+            return values
+        dictionary = self.footer["dictionaries"][column]
+        return [dictionary[code] for code in values]
+
+    def read_columns(self, columns):
+        """
+        Lee columnas completas, sin filtrar.
+
+        Args:
+            columns (iterable): Nombres de columnas de RESULT_COLUMNS
+
+        Returns:
+            dict: Lista (o array) de valores por columna
+        """
+        result = {column: [] for column in columns}
+        with open(self.path, "rb") as source:
+            for block in self.footer["blocks"]:
+                for column in columns:
+                    result[column].extend(
+                        self._decode(column, self._read_column(source, block, column))
+                    )
+        return result
+
+    def _predicates(self, filters, lower, upper):
+        """
+        Traduce los filtros a predicados sobre las columnas del archivo.
+
+        Returns:
+            list: Tuplas (columna, prueba por valor, prueba por bloque), o
+            None si ninguna fila del archivo puede cumplir los filtros
+        """
+        predicates = []
+        for key, value in (filters or {}).items():
+            range_key = split_range_key(key)
+            if range_key is not None:
+                predicate = _range_predicate(*range_key, value)
+                if predicate is not None:
+                    predicates.append(predicate)
+                continue
+            column = key
+            if column in ["ancho", "diametro", "gramaje", "peso", "id"]:
+                try:
+                    number = int(value) if column == "id" else float(value)
+                except ValueError:
+                    continue
+                predicates.append((
+                    column,
+                    lambda v, number=number: v == number,
+                    lambda b, c=column, number=number: (
+                        c in b["min"] and b["min"][c] <= number <= b["max"][c]
+                    ),
+                ))
+            elif column in DICTIONARY_COLUMNS:
+                # Resolver el LIKE una sola vez sobre el diccionario
+                matches = _like_matcher(value)
+                codes = {
+                    code for code, text in enumerate(self.footer["dictionaries"][column])
+                    if matches(text)
+                }
+                if not codes:
+                    return None
+                predicates.append((
+                    column,
+                    lambda v, codes=codes: v in codes,
+                    lambda b, c=column, codes=codes: not codes.isdisjoint(b["codes"][c]),
+                ))
+            elif column in RESULT_COLUMNS:
+                predicates.append((column, _like_matcher(value), lambda b: True))
+
+        if lower:
+            predicates.append((
+                "fecha",
+                lambda v: v >= lower,
+                lambda b: "max" in b and b["max"].get("fecha", "") >= lower,
+            ))
+        if upper:
+            predicates.append((
+                "fecha",
+                lambda v: v < upper,
+                lambda b: "min" in b and b["min"].get("fecha", upper) < upper,
+            ))
+        return predicates
+
+    def scan(self, filters=None, lower=None, upper=None):
+        """
+        Recorre las filas que cumplen los filtros.
+
+        Los bloques cuyo mínimo y máximo (o cuyos códigos de diccionario)
+        descartan los predicados no se leen. En el resto se descomprimen
+        primero las columnas filtradas y solo si alguna fila coincide se
+        descomprimen las demás.
+
+        Args:
+            filters (dict): Criterios de filtrado (mismo formato que filter_bobinas)
+            lower (str): Límite inferior inclusivo de fecha, opcional
+            upper (str): Límite superior exclusivo de fecha, opcional
+
+        Yields:
+            tuple: Valores de cada bobina en el orden de RESULT_COLUMNS,
+            ordenadas por (fecha, id)
+        """
+        predicates = self._predicates(filters, lower, upper)
+        if predicates is None:
+            return
+
+        with open(self.path, "rb") as source:
+            for block in self.footer["blocks"]:
+                if not all(block_test(block) for _, _, block_test in predicates):
+                    continue
+
+                columns = {}
+                selected = range(block["rows"])
+                for column, test, _ in predicates:
+                    if column not in columns:
+                        columns[column] = self._read_column(source, block, column)
+                    values = columns[column]
+                    selected = [i for i in selected if test(values[i])]
+                    if not selected:
+                        break
+                if not selected:
+                    continue
+
+                for column in RESULT_COLUMNS:
+                    if column not in columns:
+                        columns[column] = self._read_column(source, block, column)
+                decoded = []
+                for column in RESULT_COLUMNS:
+                    values = columns[column]
+                    if column in DICTIONARY_COLUMNS:
+                        dictionary = self.footer["dictionaries"][column]
+                        decoded.append([dictionary[values[i]] for i in selected])
+                    else:
+                        decoded.append([values[i] for i in selected])
+                yield from zip(*decoded)
@@ -0,0 +1,249 @@
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# PRAGMAs aplicados a cada conexión del pool
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-16000",       # 16 MB de caché de páginas por conexión
+    "PRAGMA mmap_size=134217728",     # 128 MB de lectura mapeada en memoria
+    "PRAGMA temp_store=MEMORY",
+)
+
+
+class ConnectionPool:
+    """
+    Pool de conexiones SQLite: un único escritor de larga vida y un conjunto
+    acotado de lectores reutilizables.
+
+    En modo WAL los lectores no bloquean al escritor ni viceversa, por lo que
+    los hilos de la interfaz pueden consultar mientras se guarda un registro.
+    """
+
+    def __init__(self, db_path, max_readers=4, busy_timeout=5.0):
+        """
+        Inicializa el pool.
+
+        Args:
+            db_path (str): Ruta del archivo de base de datos
+            max_readers (int): Número máximo de conexiones de lectura abiertas
+            busy_timeout (float): Segundos de espera ante un bloqueo
+        """
+        self.db_path = db_path
+        self.max_readers = max_readers
+        self.busy_timeout = busy_timeout
+
+        self._writer = None
+        self._writer_lock = threading.RLock()
+        self._readers = queue.LifoQueue()
+        self._readers_created = 0
+        self._readers_lock = threading.Lock()
+        self._local = threading.local()
+        # Lector prestado a cada hilo (identificador del hilo -> conexión)
+        self._borrowed = {}
+        self._borrowed_lock = threading.Lock()
+        self._monitor = None
+        self._monitor_lock = threading.Lock()
+        self._closed = False
+        self._connections = []
+        self._trace_callback = None
+
+    def _connect(self):
+        """Abre una conexión nueva con los PRAGMAs del pool."""
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout,
+            check_same_thread=False,
+            isolation_level=None,  # Transacciones explícitas
+        )
+        conn.row_factory = sqlite3.Row
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        conn.set_trace_callback(self._trace_callback)
+        self._connections.append(conn)
+        return conn
+
+    def set_trace_callback(self, callback):
+        """
+        Instala un callback de trazado en todas las conexiones del pool.
+
+        Args:
+            callback (callable): Función que recibe el texto de cada sentencia
+                ejecutada, o None para quitar el callback
+        """
+        self._trace_callback = callback
+        for conn in list(self._connections):
+            conn.set_trace_callback(callback)
+
+    @contextmanager
+    def writer(self, attach=None):
+        """
+        Entrega la conexión de escritura dentro de una transacción.
+
+        Confirma al salir del bloque o revierte si se produce una excepción.
+        Las llamadas anidadas desde el mismo hilo reutilizan la transacción.
+
+        Args:
+            attach (dict): Bases de datos a adjuntar durante el bloque
+                (alias -> ruta); no se admite en llamadas anidadas
+        """
+        with self._writer_lock:
+            if self._closed:
+                raise sqlite3.ProgrammingError("El pool de conexiones está cerrado")
+            if self._writer is None:
+                self._writer = self._connect()
+            conn = self._writer
+
+            # Transacción anidada: la confirma el bloque exterior
+            if conn.in_transaction:
+                if attach:
+                    raise sqlite3.ProgrammingError(
+                        "No se puede adjuntar una base de datos dentro de una transacción"
+                    )
+                yield conn
+                return
+
+            # ATTACH debe ejecutarse fuera de la transacción
+            with self.attached(conn, attach or {}):
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    yield conn
+                except BaseException:
+                    conn.rollback()
+                    raise
+                else:
+                    conn.commit()
+
+    @contextmanager
+    def attached(self, conn, databases):
+        """
+        Adjunta bases de datos a una conexión durante el bloque.
+
+        Args:
+            conn (sqlite3.Connection): Conexión del pool, sin transacción abierta
+            databases (dict): Alias -> ruta de cada base de datos a adjuntar
+        """
+        attached = []
+        try:
+            for alias, path in databases.items():
+                conn.execute(f"ATTACH DATABASE ? AS {alias}", (path,))
+                attached.append(alias)
+            yield conn
+        finally:
+            # Cerrar una transacción de lectura pendiente para poder separarlas
+            if attached and conn.in_transaction:
+                conn.rollback()
+            for alias in reversed(attached):
+                conn.execute(f"DETACH DATABASE {alias}")
+
+    @contextmanager
+    def reader(self):
+        """
+        Entrega una conexión de solo lectura del pool.
+
+        Si el hilo ya tiene una conexión prestada se reutiliza, de modo que
+        las lecturas anidadas no consumen más conexiones del límite.
+        """
+        conn = getattr(self._local, "reader", None)
+        if conn is not None:
+            yield conn
+            return
+
+        conn = self._acquire_reader()
+        self._local.reader = conn
+        thread_id = threading.get_ident()
+        with self._borrowed_lock:
+            self._borrowed[thread_id] = conn
+        try:
+            yield conn
+        finally:
+            with self._borrowed_lock:
+                del self._borrowed[thread_id]
+            self._local.reader = None
+            self._release_reader(conn)
+
+    def interrupt_reader(self, thread_id):
+        """
+        Aborta la consulta que está ejecutando el lector prestado a un hilo.
+
+        La consulta en curso termina con sqlite3.OperationalError
+        ("interrupted"). Si el hilo no tiene un lector prestado no hace nada:
+        una conexión ya devuelta al pool nunca se interrumpe.
+
+        Args:
+            thread_id (int): Identificador del hilo (threading.get_ident())
+
+        Returns:
+            bool: True si se interrumpió una conexión
+        """
+        with self._borrowed_lock:
+            conn = self._borrowed.get(thread_id)
+            if conn is None:
+                return False
+            conn.interrupt()
+            return True
+
+    def _acquire_reader(self):
+        """Obtiene un lector libre, creando uno nuevo si no se alcanzó el límite."""
+        if self._closed:
+            raise sqlite3.ProgrammingError("El pool de conexiones está cerrado")
+        try:
+            return self._readers.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._readers_lock:
+            if self._readers_created < self.max_readers:
+                self._readers_created += 1
+                try:
+                    return self._connect()
+                except Exception:
+                    self._readers_created -= 1
+                    raise
+
+        # Límite alcanzado: esperar a que otro hilo devuelva su conexión
+        return self._readers.get()
+
+    def _release_reader(self, conn):
+        """Devuelve un lector al pool, o lo cierra si el pool ya se cerró."""
+        if self._closed:
+            conn.close()
+            return
+        # Descartar cualquier transacción de lectura que haya quedado abierta
+        if conn.in_transaction:
+            conn.rollback()
+        self._readers.put(conn)
+
+    def data_version(self):
+        """
+        Devuelve el valor de `PRAGMA data_version` de una conexión de control.
+
+        La conexión de control nunca escribe, por lo que el valor cambia con
+        cada commit de cualquier otra conexión, de este u otro proceso.
+        """
+        with self._monitor_lock:
+            if self._closed:
+                raise sqlite3.ProgrammingError("El pool de conexiones está cerrado")
+            if self._monitor is None:
+                self._monitor = self._connect()
+            return self._monitor.execute("PRAGMA data_version").fetchone()[0]
+
+    def close(self):
+        """Cierra todas las conexiones del pool."""
+        self._closed = True
+        self._connections = []
+        with self._writer_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+        with self._monitor_lock:
+            if self._monitor is not None:
+                self._monitor.close()
+                self._monitor = None
+        while True:
+            try:
+                self._readers.get_nowait().close()
+            except queue.Empty:
+                break
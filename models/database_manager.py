@@ -1,12 +1,234 @@
+import heapq
 import os
+import re
 import sqlite3
 import sys
+from array import array
+from contextlib import contextmanager, nullcontext
+from itertools import chain
+
+from models.backup import backup_database
+from models.cold_storage import ColdFile, cold_path, list_cold_files, write_cold_file
+from models.connection_pool import ConnectionPool
+from models.historic_archive import (
+    PARTITION_MONTH_EXPRESSION, PARTITION_SCHEMA, date_bounds, list_partitions, partition_path,
+)
+from models.migrations import (
+    EPOCH_EXPRESSION, FTS_COLUMNS, FTS_DEFERRED_TABLE, ROLLUP_KEYS, ROLLUP_UPSERT,
+    apply_migrations,
+    rollup_add_statement, rollup_aggregate_query, rollup_rebuild_statements,
+)
+from models.query_cache import QueryCache
+from models.query_tracer import QueryTracer
+from models.range_filters import DATE_RANGE_COLUMNS, range_bound, split_range_key
+from models.result_set import BobinaResultSet
+from models.selection import Selection
+
+# Columnas que se informan al insertar una bobina (created_at lo asigna SQLite)
+INSERT_COLUMNS = [
+    "turno", "ancho", "diametro", "gramaje", "peso", "bobina_num",
+    "sec", "of", "fecha", "codcal", "desccal",
+]
+NUMERIC_COLUMNS = ["ancho", "diametro", "gramaje", "peso"]
+# Todas las columnas de bobina, en el orden de la tabla
+BOBINA_COLUMNS = ["id"] + INSERT_COLUMNS + ["created_at"]
+# Columnas que admiten nulos (afectan al orden y a la paginación)
+NULLABLE_COLUMNS = ["sec", "codcal", "desccal", "created_at"]
+# Lista de columnas para las consultas de lectura (mismo orden que BobinaResultSet)
+SELECT_COLUMNS = ', '.join(f"bobina.{column}" for column in BOBINA_COLUMNS)
+# Métodos medidos cuando el trazado está activo
+TRACED_METHODS = [
+    "get_all_bobinas", "filter_bobinas", "get_bobinas_page", "get_change_seq",
+    "get_changes_since", "get_production_summary", "rebuild_rollup", "add_bobina",
+    "add_bobinas_bulk", "delete_bobinas", "get_bobinas_by_ids", "iter_bobinas",
+    "move_to_historic", "iter_historic", "get_historic", "freeze_historic", "backup",
+    "count_selection", "get_last_bobina_id",
+]
+# Variable de entorno que activa el trazado con el umbral indicado (en ms)
+TRACE_ENV_VAR = "GESTPROD_SLOW_QUERY_MS"
+# Códigos con pocos valores distintos e índice propio (calidad): una subcadena
+# corta, que el índice trigram no resuelve, se busca entre los valores
+# distintos del índice en lugar de en cada fila (ver _distinct_values_query)
+CODE_COLUMNS = ["codcal"]
+# Búsqueda de un día (o un momento) en una fecha: en una fecha AAAA-MM-DD
+# solo puede coincidir al principio, así que se acota con el índice de la
+# columna. Un año o un mes cubren demasiadas filas: ordenarlas cuesta más que
+# recorrer la tabla hasta completar la página
+DATE_PREFIX_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2}[\d :]*$")
+
+
+def _distinct_values_query(table, column):
+    """
+    Subconsulta con los valores distintos de `column` que cumplen `LOWER(valor) LIKE ?`.
+
+    Salta de un valor al siguiente por el índice de la columna (una búsqueda
+    por valor distinto), así que no depende del número de filas. Como decide
+    con el mismo LIKE, `columna IN (subconsulta)` no cambia el resultado.
+    """
+    return (
+        f"WITH RECURSIVE valores(valor) AS ("
+        f"SELECT MIN({column}) FROM {table} "
+        f"UNION ALL SELECT (SELECT MIN({column}) FROM {table} WHERE {column} > valor) "
+        f"FROM valores WHERE valor IS NOT NULL) "
+        f"SELECT valor FROM valores WHERE LOWER(valor) LIKE ?"
+    )
+
+
+def validate_bobina(bobina_data):
+    """
+    Valida un registro de bobina con los mismos criterios que el formulario de alta.
+    
+    Args:
+        bobina_data (dict): Diccionario con los datos de la bobina
+        
+    Returns:
+        tuple: Valores en el orden de INSERT_COLUMNS, con los numéricos convertidos a float
+        
+    Raises:
+        ValueError: Si falta un campo obligatorio, sobra un campo o un valor numérico no es válido
+    """
+    unknown = set(bobina_data) - set(INSERT_COLUMNS)
+    if unknown:
+        raise ValueError(f"Campos desconocidos: {', '.join(sorted(unknown))}")
+    
+    values = []
+    for column in INSERT_COLUMNS:
+        value = bobina_data.get(column)
+        if value is None or value == "":
+            raise ValueError(f"El campo {column} es obligatorio")
+        if column in NUMERIC_COLUMNS:
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"El campo {column} debe ser un número válido")
+        values.append(value)
+    return tuple(values)
+
+def normalize_sort(sort):
+    """
+    Valida un orden por columnas y lo completa con el ID.
+    
+    El ID desempata y hace que el orden sea total; como es único, las
+    columnas que vengan después de él no cambian el orden y se descartan.
+    
+    Args:
+        sort (list): Pares (columna, ascendente) de BOBINA_COLUMNS
+        
+    Returns:
+        list: Pares (columna, ascendente) terminados en el ID
+    """
+    sort = [(column, bool(ascending)) for column, ascending in sort]
+    for column, _ in sort:
+        if column not in BOBINA_COLUMNS:
+            raise ValueError(f"Columna de ordenamiento no válida: {column}")
+    columns = [column for column, _ in sort]
+    if "id" in columns:
+        return sort[:columns.index("id") + 1]
+    return sort + [("id", sort[0][1])]
+
+def _keyset_condition(sort, after_values):
+    """
+    Condición que selecciona las filas posteriores a una fila en un orden dado.
+    
+    Si todas las columnas se ordenan en el mismo sentido y no puede haber
+    nulos pendientes se usa una comparación de filas, (a, b, id) < (?, ?, ?), que SQLite resuelve
+    como un rango sobre el índice. En otro caso se expande en
+    a < ? OR (a = ? AND (b > ? OR ...)), teniendo en cuenta que SQLite
+    ordena los nulos antes que cualquier valor.
+    
+    Args:
+        sort (list): Pares (columna, ascendente), el último es el ID
+        after_values (tuple): Valores de esas columnas en la última fila vista
+        
+    Returns:
+        tuple: Condición SQL y lista de valores a enlazar
+    """
+    directions = {ascending for _, ascending in sort}
+    # En orden descendente los nulos van al final: la comparación de filas los perdería
+    nullable = any(column in NULLABLE_COLUMNS for column, _ in sort)
+    if (len(directions) == 1 and None not in after_values
+            and (sort[0][1] or not nullable)):
+        columns = ", ".join(f"bobina.{column}" for column, _ in sort)
+        placeholders = ", ".join("?" for _ in sort)
+        operator = ">" if sort[0][1] else "<"
+        return f"({columns}) {operator} ({placeholders})", list(after_values)
+    
+    alternatives = []
+    values = []
+    for position, (column, ascending) in enumerate(sort):
+        parts = []
+        part_values = []
+        # Iguales en las columnas anteriores...
+        for previous_position, (previous, _) in enumerate(sort[:position]):
+            previous_value = after_values[previous_position]
+            if previous_value is None:
+                parts.append(f"bobina.{previous} IS NULL")
+            else:
+                parts.append(f"bobina.{previous} = ?")
+                part_values.append(previous_value)
+        # ...y posterior en esta
+        value = after_values[position]
+        if ascending:
+            if value is None:
+                parts.append(f"bobina.{column} IS NOT NULL")
+            else:
+                parts.append(f"bobina.{column} > ?")
+                part_values.append(value)
+        else:
+            if value is None:
+                continue  # Nada va después de un nulo en orden descendente
+            parts.append(f"(bobina.{column} < ? OR bobina.{column} IS NULL)")
+            part_values.append(value)
+        alternatives.append("(" + " AND ".join(parts) + ")")
+        values += part_values
+    if not alternatives:
+        return "0", []
+    return "(" + " OR ".join(alternatives) + ")", values
+
 
 class DatabaseManager:
     """Clase para gestionar la conexión y operaciones con la base de datos."""
     
-    def __init__(self):
-        """Inicializa el gestor de base de datos."""
+    def __init__(self, db_path=None, max_readers=4, cache_size=32, archive_dir=None):
+        """
+        Inicializa el gestor de base de datos.
+        
+        Args:
+            db_path (str): Ruta opcional del archivo de base de datos
+            max_readers (int): Número máximo de conexiones de lectura en el pool
+            cache_size (int): Número de resultados de consultas en caché (0 la desactiva)
+            archive_dir (str): Directorio de los archivos históricos mensuales
+                (por defecto, el de la base de datos)
+        """
+        if db_path:
+            self.db_path = db_path
+        else:
+            self.db_path = self._default_db_path()
+        print(f"Database path: {self.db_path}")
+        
+        self.archive_dir = archive_dir or os.path.dirname(os.path.abspath(self.db_path))
+        
+        # Pool de conexiones persistentes (un escritor, varios lectores)
+        self.pool = ConnectionPool(self.db_path, max_readers=max_readers)
+        
+        # Caché de resultados, invalidada por escrituras propias o de otros procesos
+        self.cache = QueryCache(maxsize=cache_size)
+        self._write_generation = 0
+        
+        # Trazado de consultas: desactivado salvo que lo pida el entorno
+        self.tracer = None
+        
+        # Create database if it doesn't exist
+        self._create_database_if_not_exists()
+        
+        if os.environ.get(TRACE_ENV_VAR):
+            try:
+                self.enable_tracing(float(os.environ[TRACE_ENV_VAR]))
+            except ValueError:
+                print(f"Valor no válido en {TRACE_ENV_VAR}: {os.environ[TRACE_ENV_VAR]}")
+    
+    def _default_db_path(self):
+        """Devuelve la ruta por defecto de produccion.db, creando el directorio data."""
         # Determine if we're running as a script or frozen executable
         if getattr(sys, 'frozen', False):
             # If the application is run as a bundle (pyinstaller)
@@ -20,39 +242,176 @@ class DatabaseManager:
         if not os.path.exists(data_dir):
             os.makedirs(data_dir)
         
-        # Set database path
-        self.db_path = os.path.join(data_dir, 'produccion.db')
-        print(f"Database path: {self.db_path}")
+        return os.path.join(data_dir, 'produccion.db')
+    
+    def close(self):
+        """Cierra las conexiones del pool."""
+        self.disable_tracing()
+        self.pool.close()
+    
+    def enable_tracing(self, slow_threshold_ms=200.0, log_path=None, max_bytes=1024 * 1024,
+                       backup_count=3):
+        """
+        Activa la medición de los métodos de TRACED_METHODS y el registro de consultas lentas.
         
-        # Create database if it doesn't exist
-        self._create_database_if_not_exists()
+        Args:
+            slow_threshold_ms (float): Duración (ms) a partir de la cual se registra una llamada
+            log_path (str): Archivo del registro (por defecto, slow_queries.log
+                junto a la base de datos)
+            max_bytes (int): Tamaño a partir del cual se rota el registro
+            backup_count (int): Archivos rotados que se conservan
+            
+        Returns:
+            QueryTracer: Trazador activo
+        """
+        self.disable_tracing()
+        if log_path is None:
+            log_path = os.path.join(
+                os.path.dirname(os.path.abspath(self.db_path)), "slow_queries.log"
+            )
+        self.tracer = QueryTracer(slow_threshold_ms, log_path, max_bytes, backup_count)
+        self.tracer.instrument(self, TRACED_METHODS)
+        self.pool.set_trace_callback(self.tracer.trace_statement)
+        return self.tracer
     
-    def _create_database_if_not_exists(self):
-        """Initialize the database with required tables if they don't exist."""
-        conn = sqlite3.connect(self.db_path)
+    def disable_tracing(self):
+        """Desactiva el trazado y restaura los métodos originales."""
+        if self.tracer is None:
+            return
+        self.pool.set_trace_callback(None)
+        self.tracer.restore(self)
+        self.tracer.close()
+        self.tracer = None
+    
+    def trace_stats(self):
+        """
+        Devuelve las estadísticas del trazado por método.
+        
+        Returns:
+            dict: Llamadas, errores, filas y percentiles de duración por método
+            (vacío si el trazado no está activo)
+        """
+        if self.tracer is None:
+            return {}
+        return self.tracer.stats()
+    
+    def cache_stats(self):
+        """
+        Devuelve los contadores de la caché de consultas.
+        
+        Returns:
+            dict: Tamaño, aciertos, fallos, desalojos e invalidaciones
+        """
+        return self.cache.stats()
+    
+    def _bump_generation(self):
+        """Marca que los datos cambiaron, invalidando la caché de consultas."""
+        self._write_generation += 1
+    
+    def _cache_token(self):
+        """Versión actual de los datos: escrituras propias y commits de otros procesos."""
+        return (self._write_generation, self.pool.data_version())
+    
+    def _normalize_filters(self, filters):
+        """Convierte los filtros en una clave de caché independiente del orden."""
+        return tuple(sorted((str(column), str(value)) for column, value in (filters or {}).items()))
+    
+    def _query_result(self, conn, query, values):
+        """
+        Ejecuta una consulta que devuelve SELECT_COLUMNS y arma un BobinaResultSet.
+        
+        Args:
+            conn (sqlite3.Connection): Conexión de lectura
+            query (str): Consulta SQL
+            values (list): Valores a enlazar
+            
+        Returns:
+            BobinaResultSet: Filas leídas
+        """
         cursor = conn.cursor()
+        cursor.row_factory = None  # Tuplas simples, sin sqlite3.Row
+        try:
+            cursor.execute(query, values)
+            return BobinaResultSet.from_cursor(cursor)
+        finally:
+            cursor.close()
+    
+    def _cached_rows(self, key, query, values):
+        """
+        Ejecuta una consulta de lectura usando la caché de resultados.
         
-        # Create bobina table if it doesn't exist
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS bobina (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            turno TEXT NOT NULL,
-            ancho REAL NOT NULL,
-            diametro REAL NOT NULL,
-            gramaje REAL NOT NULL,
-            peso REAL NOT NULL,
-            bobina_num TEXT NOT NULL,
-            sec TEXT,
-            of TEXT NOT NULL,
-            fecha TEXT NOT NULL,
-            codcal TEXT,
-            desccal TEXT,
-            created_at TEXT DEFAULT CURRENT_TIMESTAMP
-        )
-        ''')
+        Args:
+            key (tuple): Clave normalizada de la consulta
+            query (str): Consulta SQL
+            values (list): Valores a enlazar
+            
+        Returns:
+            BobinaResultSet: Filas leídas (de solo lectura, se comparte con la caché)
+        """
+        # El token se lee antes de consultar: si hay una escritura en medio,
+        # el resultado queda asociado a una versión ya vencida
+        token = self._cache_token()
+        hit, rows = self.cache.get(key, token)
+        if not hit:
+            with self.pool.reader() as conn:
+                rows = self._query_result(conn, query, values)
+            self.cache.put(key, token, rows)
+        return rows
+    
+    def _create_database_if_not_exists(self):
+        """Crea o actualiza el esquema aplicando las migraciones pendientes."""
+        # Si el esquema ya está al día no se ejecuta ningún DDL
+        apply_migrations(self.pool)
         
-        conn.commit()
-        conn.close()
+        # Tablas FTS5 disponibles (pueden faltar si SQLite no soporta trigram)
+        with self.pool.reader() as conn:
+            self.fts_tables = {
+                row["name"] for row in conn.execute(
+                    "SELECT name FROM sqlite_master WHERE name IN ('bobina_fts', 'bobina_h_fts')"
+                )
+            }
+            interrupted = [
+                row["name"] for row in conn.execute(f"SELECT name FROM {FTS_DEFERRED_TABLE}")
+            ]
+        # Índices de una carga masiva que no llegó a terminar
+        self._fts_deferred = set()
+        for fts_table in interrupted:
+            self._rebuild_fts(fts_table)
+    
+    def _rebuild_fts(self, fts_table):
+        """Reconstruye un índice FTS5 y vuelve a activar sus triggers."""
+        with self.pool.writer() as conn:
+            if fts_table in self.fts_tables:
+                conn.execute(f"INSERT INTO {fts_table} ({fts_table}) VALUES ('rebuild')")
+            conn.execute(f"DELETE FROM {FTS_DEFERRED_TABLE} WHERE name = ?", (fts_table,))
+    
+    @contextmanager
+    def deferred_fts(self, table="bobina"):
+        """
+        Suspende el mantenimiento fila a fila del índice FTS5 de una tabla.
+        
+        Para cargas masivas: los triggers del índice dejan de actuar y al
+        salir se reconstruye el índice una sola vez, en lugar de indexar cada
+        alta. Mientras dura, los filtros de este proceso no usan el índice.
+        Si la carga se interrumpe, el índice se reconstruye al abrir la base.
+        
+        Args:
+            table (str): Tabla cuyo índice se suspende (bobina o bobina_h)
+        """
+        fts_table = f"{table}_fts"
+        if fts_table not in self.fts_tables:
+            yield
+            return
+        with self.pool.writer() as conn:
+            conn.execute(
+                f"INSERT OR IGNORE INTO {FTS_DEFERRED_TABLE} (name) VALUES (?)", (fts_table,)
+            )
+        self._fts_deferred.add(fts_table)
+        try:
+            yield
+        finally:
+            self._rebuild_fts(fts_table)
+            self._fts_deferred.discard(fts_table)
     
     def add_bobina(self, bobina_data):
         """
@@ -65,62 +424,244 @@ class DatabaseManager:
             bool: True si se guardó correctamente, False en caso contrario
         """
         try:
-            # Conectar a la base de datos
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
             # Preparar la consulta SQL
             columns = ', '.join(bobina_data.keys())
             placeholders = ', '.join(['?' for _ in bobina_data])
             values = list(bobina_data.values())
             
-            # Ejecutar la consulta
-            cursor.execute(
-                f"INSERT INTO bobina ({columns}) VALUES ({placeholders})",
-                values
-            )
-            
-            # Confirmar la transacción
-            conn.commit()
-            
-            # Cerrar la conexión
-            conn.close()
+            # Ejecutar la consulta en la conexión de escritura
+            with self.pool.writer() as conn:
+                conn.execute(
+                    f"INSERT INTO bobina ({columns}) VALUES ({placeholders})",
+                    values
+                )
+            self._bump_generation()
             
             return True
         except Exception as e:
             print(f"Error al añadir bobina: {e}")
             return False
             
+    def add_bobinas_bulk(self, bobinas, batch_size=500, defer_fts=False):
+        """
+        Inserta muchos registros de bobina agrupando las confirmaciones.
+        
+        Cada lote de `batch_size` filas se valida completo y se inserta con una
+        única sentencia preparada (executemany) dentro de una transacción, de
+        modo que se hace un solo commit por lote en lugar de uno por fila.
+        
+        Args:
+            bobinas (iterable): Diccionarios con los datos de las bobinas
+            batch_size (int): Número de filas por transacción
+            defer_fts (bool): Reconstruir el índice FTS5 una vez al terminar
+                en lugar de indexar cada fila (ver deferred_fts); conviene
+                para importaciones grandes, no para lotes de la ingesta
+            
+        Returns:
+            list: IDs generados, en el mismo orden que las filas de entrada;
+            lista vacía si falla una inserción (se deshacen todos los lotes)
+            
+        Raises:
+            ValueError: Si alguna fila no supera la validación; los lotes
+            anteriores ya quedan guardados
+        """
+        columns = ', '.join(INSERT_COLUMNS)
+        placeholders = ', '.join(['?' for _ in INSERT_COLUMNS])
+        query = f"INSERT INTO bobina ({columns}) VALUES ({placeholders})"
+        
+        ids = []
+        batch = []
+        
+        def flush():
+            batch_ids = []
+            with self.pool.writer() as conn:
+                # El ID de cada fila sale de su propia inserción (lastrowid)
+                cursor = conn.cursor()
+                try:
+                    for values in batch:
+                        cursor.execute(query, values)
+                        batch_ids.append(cursor.lastrowid)
+                finally:
+                    cursor.close()
+            self._bump_generation()
+            ids.extend(batch_ids)
+            batch.clear()
+        
+        try:
+            with self.deferred_fts() if defer_fts else nullcontext():
+                for index, bobina_data in enumerate(bobinas):
+                    try:
+                        batch.append(validate_bobina(bobina_data))
+                    except ValueError as e:
+                        raise ValueError(f"Fila {index}: {e}") from None
+                    if len(batch) >= batch_size:
+                        flush()
+                if batch:
+                    flush()
+        except ValueError:
+            raise
+        except Exception as e:
+            # El lote que falló ya se revirtió; se quitan los lotes confirmados
+            print(f"Error al añadir bobinas en bloque: {e}")
+            if ids and not self.delete_bobinas(ids):
+                print(f"Error al deshacer {len(ids)} bobinas ya confirmadas")
+            return []
+        
+        return ids
+
+    def _last_bobina_id(self, conn):
+        """Devuelve el último ID asignado en la tabla bobina."""
+        row = conn.execute(
+            "SELECT seq FROM sqlite_sequence WHERE name = 'bobina'"
+        ).fetchone()
+        return row[0] if row else 0
+
     def get_all_bobinas(self):
         """
         Obtiene todos los registros de bobinas de la base de datos.
         
         Returns:
-            list: Lista de diccionarios con los datos de las bobinas
+            BobinaResultSet: Filas con los datos de las bobinas
         """
         try:
-            # Conectar a la base de datos
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row  # Para obtener los resultados como diccionarios
-            cursor = conn.cursor()
-            
-            # Ejecutar la consulta
-            cursor.execute("SELECT * FROM bobina ORDER BY id DESC")
-            
-            # Obtener los resultados
-            rows = cursor.fetchall()
-            
-            # Convertir los resultados a una lista de diccionarios
-            result = [dict(row) for row in rows]
-            
-            # Cerrar la conexión
-            conn.close()
-            
-            return result
+            # Ejecutar la consulta (o reutilizar el resultado en caché)
+            return self._cached_rows(
+                ("all",), f"SELECT {SELECT_COLUMNS} FROM bobina ORDER BY id DESC", []
+            )
         except Exception as e:
             print(f"Error al obtener bobinas: {e}")
-            return []
+            return BobinaResultSet()
+            
+    def _build_filter_conditions(self, filters, table="bobina"):
+        """
+        Construye el origen y las condiciones SQL para los filtros indicados.
+        
+        Las búsquedas por subcadena de al menos 3 caracteres sobre columnas
+        indexadas en FTS5 se resuelven con el índice trigram, que se une a la
+        tabla por rowid; el LIKE original se conserva como filtro residual para
+        que el resultado sea idéntico. En ese caso la clave de orden es el rowid
+        del índice, lo que permite a FTS5 devolver las filas ya ordenadas.
+        
+        Los filtros por rango (ver models.range_filters) se comparan con la
+        columna numérica o con la columna epoch de la fecha, de modo que se
+        resuelven con un recorrido por rango del índice correspondiente.
+        
+        Una subcadena de menos de 3 caracteres en codcal se busca primero
+        entre los valores distintos de su índice, y la búsqueda de un día en
+        fecha o created_at se acota con el índice de la columna; en ambos
+        casos el LIKE sigue decidiendo el resultado. El resto de los textos
+        de menos de 3 caracteres recorre la tabla.
+        
+        Args:
+            filters (dict): Diccionario con los criterios de filtrado
+            table (str): Tabla consultada (bobina, bobina_h o la bobina_h de
+                una partición adjunta)
+            
+        Returns:
+            tuple: Cláusula FROM, columna clave para ordenar y paginar,
+            lista de condiciones SQL y lista de valores a enlazar
+        """
+        conditions = []
+        values = []
+        fts_conditions = []
+        fts_values = []
+        fts_table = f"{table}_fts"
+        use_fts = fts_table in self.fts_tables and fts_table not in self._fts_deferred
+        
+        for column, value in (filters or {}).items():
+            # Rangos: mínimo/máximo de un número o desde/hasta de una fecha
+            range_key = split_range_key(column)
+            if range_key is not None:
+                bound = range_bound(*range_key, value)
+                if bound is not None:
+                    operator, limit = bound
+                    conditions.append(f"{self._range_column(table, range_key[0])} {operator} ?")
+                    values.append(limit)
+                # Si no es un valor válido, ignorar este filtro
+            # Para campos numéricos, buscar coincidencia exacta
+            elif column in ["ancho", "diametro", "gramaje", "peso"]:
+                try:
+                    num_value = float(value)
+                    conditions.append(f"{table}.{column} = ?")
+                    values.append(num_value)
+                except ValueError:
+                    # Si no es un número válido, ignorar este filtro
+                    pass
+            # Para el ID, buscar coincidencia exacta
+            elif column == "id":
+                try:
+                    id_value = int(value)
+                    conditions.append(f"{table}.id = ?")
+                    values.append(id_value)
+                except ValueError:
+                    # Si no es un número válido, ignorar este filtro
+                    pass
+            # Para el resto de campos, buscar coincidencia parcial
+            else:
+                pattern = f"%{value}%"
+                text = str(value)
+                if column in DATE_RANGE_COLUMNS and DATE_PREFIX_PATTERN.match(text):
+                    # Candidatas: las que empiezan por el valor y las fechas sin
+                    # formato AAAA-MM-DD (epoch nulo), donde podría estar en medio
+                    conditions.append(
+                        f"({table}.{column} >= ? AND {table}.{column} < ? "
+                        f"OR {self._range_column(table, column)} IS NULL)"
+                    )
+                    values += [text, text[:-1] + chr(ord(text[-1]) + 1)]
+                # Códigos cortos: candidatas por el índice de la columna (las
+                # particiones adjuntas no lo tienen)
+                if column in CODE_COLUMNS and len(text) < 3 and "." not in table:
+                    conditions.append(
+                        f"{table}.{column} IN ({_distinct_values_query(table, column)})"
+                    )
+                    values.append(pattern)
+                # El tokenizador trigram necesita al menos 3 caracteres
+                if use_fts and column in FTS_COLUMNS and len(str(value)) >= 3:
+                    fts_conditions.append(f"{fts_table}.{column} LIKE ?")
+                    fts_values.append(pattern)
+                conditions.append(f"LOWER({table}.{column}) LIKE ?")
+                values.append(pattern)
+        
+        if not fts_conditions:
+            return table, f"{table}.id", conditions, values
+        
+        # Recorrer primero los candidatos del índice FTS5
+        source = f"{fts_table} JOIN {table} ON {table}.id = {fts_table}.rowid"
+        return source, f"{fts_table}.rowid", fts_conditions + conditions, fts_values + values
+    
+    def _range_column(self, table, column):
+        """
+        Devuelve la expresión que se compara en un filtro por rango.
+        
+        Para las fechas es la columna epoch de la migración 6; las particiones
+        del histórico (tablas de bases adjuntas) no la tienen y calculan la
+        misma expresión, ya acotadas al mes por historic_chunks.
+        """
+        if column not in DATE_RANGE_COLUMNS:
+            return f"{table}.{column}"
+        if "." in table:
+            return EPOCH_EXPRESSION.format(column=f"{table}.{column}")
+        return f"{table}.{DATE_RANGE_COLUMNS[column]}"
+    
+    def _build_filter_query(self, filters):
+        """
+        Construye la consulta de filter_bobinas.
+        
+        Args:
+            filters (dict): Diccionario con los criterios de filtrado
             
+        Returns:
+            tuple: Consulta SQL y lista de valores, o (None, []) si no hay condiciones
+        """
+        source, key, conditions, values = self._build_filter_conditions(filters)
+        if not conditions:
+            return None, []
+        
+        query = f"SELECT {SELECT_COLUMNS} FROM {source} WHERE "
+        query += " AND ".join(conditions)
+        query += f" ORDER BY {key} DESC"
+        return query, values
+    
     def filter_bobinas(self, filters):
         """
         Filtra los registros de bobinas según los criterios especificados.
@@ -129,93 +670,312 @@ class DatabaseManager:
             filters (dict): Diccionario con los criterios de filtrado
             
         Returns:
-            list: Lista de diccionarios con los datos de las bobinas filtradas
+            BobinaResultSet: Filas con los datos de las bobinas filtradas
         """
         try:
-            # Conectar a la base de datos
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            
             # Construir la consulta SQL con los filtros
-            query = "SELECT * FROM bobina WHERE "
-            conditions = []
-            values = []
-            
-            for column, value in filters.items():
-                # Para campos numéricos, buscar coincidencia exacta
-                if column in ["ancho", "diametro", "gramaje", "peso"]:
-                    try:
-                        num_value = float(value)
-                        conditions.append(f"{column} = ?")
-                        values.append(num_value)
-                    except ValueError:
-                        # Si no es un número válido, ignorar este filtro
-                        pass
-                # Para el ID, buscar coincidencia exacta
-                elif column == "id":
-                    try:
-                        id_value = int(value)
-                        conditions.append("id = ?")
-                        values.append(id_value)
-                    except ValueError:
-                        # Si no es un número válido, ignorar este filtro
-                        pass
-                # Para el resto de campos, buscar coincidencia parcial
-                else:
-                    conditions.append(f"LOWER({column}) LIKE ?")
-                    values.append(f"%{value}%")
+            query, values = self._build_filter_query(filters)
             
             # Si no hay condiciones, devolver todos los registros
-            if not conditions:
+            if query is None:
                 return self.get_all_bobinas()
             
-            # Completar la consulta
-            query += " AND ".join(conditions)
-            query += " ORDER BY id DESC"
+            # Ejecutar la consulta (o reutilizar el resultado en caché)
+            key = ("filter", self._normalize_filters(filters))
+            return self._cached_rows(key, query, values)
+        except Exception as e:
+            print(f"Error al filtrar bobinas: {e}")
+            return BobinaResultSet()
+    
+    def explain_filter(self, filters):
+        """
+        Devuelve el plan de ejecución (EXPLAIN QUERY PLAN) de filter_bobinas.
+        
+        Args:
+            filters (dict): Diccionario con los criterios de filtrado
             
-            # Ejecutar la consulta
-            cursor.execute(query, values)
+        Returns:
+            list: Líneas de detalle del plan de consulta
+        """
+        query, values = self._build_filter_query(filters)
+        if query is None:
+            query, values = f"SELECT {SELECT_COLUMNS} FROM bobina ORDER BY id DESC", []
+        with self.pool.reader() as conn:
+            plan = conn.execute(f"EXPLAIN QUERY PLAN {query}", values).fetchall()
+        return [row["detail"] for row in plan]
+    
+    def get_bobinas_page(self, after_id=None, limit=200, filters=None, order="DESC",
+                         sort=None, after=None):
+        """
+        Obtiene una página de bobinas usando paginación por clave (keyset).
+        
+        En lugar de OFFSET se continúa a partir del último registro recibido,
+        de modo que el coste de cada página no depende de su posición en la tabla.
+        
+        Con `sort` la consulta se ordena por esas columnas y por ID para
+        desempatar (ORDER BY col1, col2, ..., id), lo que aprovecha el índice
+        de la columna cuando se ordena por una sola; la página siguiente se
+        pide con `after`, la última fila de la página anterior.
+        
+        Args:
+            after_id (int): ID del último registro de la página anterior, o None para la primera
+            limit (int): Número máximo de registros a devolver
+            filters (dict): Criterios de filtrado opcionales (mismo formato que filter_bobinas)
+            order (str): "DESC" (más recientes primero) o "ASC"; sin `sort`
+            sort (list): Pares (columna, ascendente) de BOBINA_COLUMNS, en orden de prioridad
+            after: Última fila de la página anterior (BobinaRow o diccionario), con `sort`
+            
+        Returns:
+            BobinaResultSet: Filas de la página; si tiene menos de `limit`
+            elementos no hay más páginas
+        """
+        try:
+            if sort:
+                return self._get_sorted_page(after, limit, filters, sort)
             
-            # Obtener los resultados
-            rows = cursor.fetchall()
+            order = "ASC" if str(order).upper() == "ASC" else "DESC"
+            source, key, conditions, values = self._build_filter_conditions(filters)
             
-            # Convertir los resultados a una lista de diccionarios
-            result = [dict(row) for row in rows]
+            # Continuar a partir del último ID visto
+            if after_id is not None:
+                conditions.append(f"{key} > ?" if order == "ASC" else f"{key} < ?")
+                values.append(int(after_id))
             
-            # Cerrar la conexión
-            conn.close()
+            query = f"SELECT {SELECT_COLUMNS} FROM {source}"
+            if conditions:
+                query += " WHERE " + " AND ".join(conditions)
+            query += f" ORDER BY {key} {order} LIMIT ?"
+            values.append(int(limit))
             
-            return result
+            key = ("page", self._normalize_filters(filters), after_id, int(limit), order)
+            return self._cached_rows(key, query, values)
         except Exception as e:
-            print(f"Error al filtrar bobinas: {e}")
+            print(f"Error al obtener página de bobinas: {e}")
+            return BobinaResultSet()
     
-    def delete_bobinas(self, ids):
+    def _get_sorted_page(self, after, limit, filters, sort):
+        """Página de get_bobinas_page ordenada por las columnas de `sort`."""
+        sort = normalize_sort(sort)
+        
+        source, _, conditions, values = self._build_filter_conditions(filters)
+        after_values = None
+        if after is not None:
+            after_values = tuple(after[column] for column, _ in sort)
+            condition, condition_values = _keyset_condition(sort, after_values)
+            conditions.append(condition)
+            values += condition_values
+        
+        query = f"SELECT {SELECT_COLUMNS} FROM {source}"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY " + ", ".join(
+            f"bobina.{column} {'ASC' if ascending else 'DESC'}" for column, ascending in sort
+        )
+        query += " LIMIT ?"
+        values.append(int(limit))
+        
+        key = ("sorted_page", self._normalize_filters(filters), tuple(sort), after_values, int(limit))
+        return self._cached_rows(key, query, values)
+    
+    def get_last_bobina_id(self):
         """
-        Elimina registros de bobinas por sus IDs.
+        Devuelve el último ID asignado en la tabla bobina.
+        
+        Returns:
+            int: Último ID (0 si la tabla nunca tuvo registros)
+        """
+        try:
+            with self.pool.reader() as conn:
+                return self._last_bobina_id(conn)
+        except Exception as e:
+            print(f"Error al obtener el último ID de bobina: {e}")
+            return 0
+    
+    def get_change_seq(self):
+        """
+        Devuelve el número de secuencia del último cambio registrado en bobina.
+        
+        Returns:
+            int: Última secuencia del registro de cambios (0 si no hubo cambios)
+        """
+        try:
+            with self.pool.reader() as conn:
+                row = conn.execute(
+                    "SELECT seq FROM sqlite_sequence WHERE name = 'bobina_changes'"
+                ).fetchone()
+            return row[0] if row else 0
+        except Exception as e:
+            print(f"Error al obtener la secuencia de cambios: {e}")
+            return 0
+    
+    def get_changes_since(self, since_seq, filters=None):
+        """
+        Obtiene los cambios de la tabla bobina posteriores a una secuencia.
         
         Args:
-            ids (list): Lista de IDs de las bobinas a eliminar
+            since_seq (int): Última secuencia ya aplicada por el llamador
+            filters (dict): Criterios de filtrado que deben cumplir las filas devueltas
             
         Returns:
-            bool: True si se eliminaron correctamente, False en caso contrario
+            dict: "seq" (nueva secuencia), "inserted" (filas nuevas que cumplen los
+            filtros, de la más reciente a la más antigua), "updated" (filas
+            modificadas que cumplen los filtros) y "deleted" (IDs eliminados o
+            que dejaron de cumplir los filtros), o None si los cambios ya se
+            purgaron y hay que recargar todo
         """
         try:
-            # Conectar a la base de datos
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            with self.pool.reader() as conn:
+                changes = conn.execute(
+                    "SELECT seq, bobina_id, op FROM bobina_changes WHERE seq > ? ORDER BY seq",
+                    (since_seq,)
+                ).fetchall()
+                
+                # Si falta la entrada siguiente a since_seq, el registro se purgó
+                if changes and changes[0]["seq"] != since_seq + 1:
+                    oldest = conn.execute("SELECT MIN(seq) FROM bobina_changes").fetchone()[0]
+                    if oldest > since_seq + 1:
+                        return None
+                
+                # Estado final de cada ID: la última operación prevalece; la
+                # primera indica si la fila es nueva en el intervalo
+                first_op = {}
+                last_op = {}
+                for change in changes:
+                    first_op.setdefault(change["bobina_id"], change["op"])
+                    last_op[change["bobina_id"]] = change["op"]
+                deleted = {bobina_id for bobina_id, op in last_op.items() if op == "D"}
+                changed_ids = [bobina_id for bobina_id, op in last_op.items() if op in ("I", "U")]
+                
+                inserted = []
+                updated = []
+                if changed_ids:
+                    source, key, conditions, values = self._build_filter_conditions(filters)
+                    staged = self._stage_ids(conn, changed_ids)
+                    conditions.append(f"bobina.id IN ({staged})")
+                    query = f"SELECT {SELECT_COLUMNS} FROM {source} WHERE " + " AND ".join(conditions)
+                    query += " ORDER BY bobina.id DESC"
+                    for row in self._query_result(conn, query, values):
+                        if first_op[row["id"]] == "I":
+                            inserted.append(row)
+                        else:
+                            updated.append(row)
+                    # Modificadas que ya no cumplen los filtros: se quitan
+                    matching = {row["id"] for row in updated}
+                    deleted.update(
+                        bobina_id for bobina_id in changed_ids
+                        if first_op[bobina_id] != "I" and bobina_id not in matching
+                    )
             
-            # Crear placeholders para la consulta SQL
-            placeholders = ', '.join(['?' for _ in ids])
+            new_seq = changes[-1]["seq"] if changes else since_seq
+            return {
+                "seq": new_seq, "inserted": inserted, "updated": updated,
+                "deleted": sorted(deleted),
+            }
+        except Exception as e:
+            print(f"Error al obtener cambios: {e}")
+            return None
+    
+    def get_production_summary(self, fecha=None, group_by=("turno", "of")):
+        """
+        Obtiene los kilos producidos en un día desde la tabla de resumen.
+        
+        La consulta recorre solo los grupos de bobina_rollup (actual más
+        histórico), no las filas de bobina, por lo que su costo no depende
+        del volumen de producción.
+        
+        Args:
+            fecha (str): Día en formato AAAA-MM-DD (por defecto, hoy)
+            group_by (iterable): Claves de ROLLUP_KEYS por las que agrupar
             
-            # Ejecutar la consulta
-            cursor.execute(f"DELETE FROM bobina WHERE id IN ({placeholders})", ids)
+        Returns:
+            list: Un diccionario por grupo con las claves, "cantidad" y "peso_total"
+        """
+        group_by = [column for column in group_by if column != "fecha"]
+        for column in group_by:
+            if column not in ROLLUP_KEYS:
+                raise ValueError(f"Clave de resumen no válida: {column}")
+        
+        try:
+            columns = ", ".join(group_by)
+            select = f"{columns}, " if group_by else ""
+            query = (
+                f"SELECT {select}SUM(cantidad) AS cantidad, SUM(peso_total) AS peso_total "
+                f"FROM bobina_rollup WHERE fecha = COALESCE(?, date('now', 'localtime'))"
+            )
+            if group_by:
+                query += f" GROUP BY {columns} ORDER BY {columns}"
             
-            # Confirmar la transacción
-            conn.commit()
+            with self.pool.reader() as conn:
+                return [
+                    dict(row) for row in conn.execute(query, (fecha,))
+                    if row["cantidad"]
+                ]
+        except Exception as e:
+            print(f"Error al obtener el resumen de producción: {e}")
+            return []
+    
+    def rebuild_rollup(self):
+        """
+        Recalcula la tabla de resumen bobina_rollup desde bobina y bobina_h.
+        
+        Los triggers la mantienen al día; la reconstrucción solo hace falta si
+        se modificaron las tablas con los triggers desactivados o para
+        corregir diferencias de redondeo acumuladas. Incluye los archivos
+        históricos mensuales.
+        
+        Returns:
+            bool: True si se recalculó correctamente, False en caso contrario
+        """
+        try:
+            # Totales de las particiones, leídos antes de abrir la transacción
+            # (no se puede adjuntar una base de datos dentro de ella)
+            archived = []
+            with self.pool.reader() as conn:
+                for tables, conditions, values in self.historic_chunks(conn):
+                    for table in tables[1:]:
+                        archived.extend(conn.execute(rollup_aggregate_query(table)).fetchall())
+            for desde, hasta, path in list_cold_files(self.archive_dir):
+                archived.extend(self._cold_rollup(ColdFile(path)))
             
-            # Cerrar la conexión
-            conn.close()
+            with self.pool.writer() as conn:
+                for statement in rollup_rebuild_statements():
+                    conn.execute(statement)
+                conn.executemany(ROLLUP_UPSERT, archived)
+            self._bump_generation()
+            
+            return True
+        except Exception as e:
+            print(f"Error al recalcular el resumen de producción: {e}")
+            return False
+    
+    def _cold_rollup(self, cold_file):
+        """Agrupa las filas de un archivo frío con las claves y totales del resumen."""
+        columns = cold_file.read_columns(["fecha", "turno", "of", "codcal", "peso"])
+        groups = {}
+        for fecha, turno, of, codcal, peso in zip(
+            columns["fecha"], columns["turno"], columns["of"], columns["codcal"], columns["peso"]
+        ):
+            key = (fecha[:10], turno, of, codcal or "")
+            count, total = groups.get(key, (0, 0.0))
+            groups[key] = (count + 1, total + peso)
+        return [key + totals for key, totals in groups.items()]
+    
+    def delete_bobinas(self, ids):
+        """
+        Elimina registros de bobinas por sus IDs.
+        
+        Args:
+            ids (list | Selection): IDs de las bobinas a eliminar, o una selección
+            
+        Returns:
+            bool: True si se eliminaron correctamente, False en caso contrario
+        """
+        try:
+            # Ejecutar la consulta sobre los IDs cargados en la tabla temporal
+            with self.pool.writer() as conn:
+                staged = self._stage_ids(conn, ids)
+                conn.execute(f"DELETE FROM bobina WHERE id IN ({staged})")
+            self._bump_generation()
             
             return True
         except Exception as e:
@@ -223,88 +983,509 @@ class DatabaseManager:
             return False
 
     def get_bobinas_by_ids(self, ids):
-            """
-            Obtiene los registros de bobinas por sus IDs.
+        """
+        Obtiene los registros de bobinas por sus IDs.
+        
+        Args:
+            ids (list): Lista de IDs de las bobinas a obtener
             
-            Args:
-                ids (list): Lista de IDs de las bobinas a obtener
-                
-            Returns:
-                list: Lista de diccionarios con los datos de las bobinas
-            """
-            try:
-                # Conectar a la base de datos
-                conn = sqlite3.connect(self.db_path)
-                conn.row_factory = sqlite3.Row
-                cursor = conn.cursor()
-                
-                # Crear placeholders para la consulta SQL
-                placeholders = ', '.join(['?' for _ in ids])
-                
-                # Ejecutar la consulta
-                cursor.execute(f"SELECT * FROM bobina WHERE id IN ({placeholders})", ids)
-                
-                # Obtener los resultados
-                rows = cursor.fetchall()
-                
-                # Convertir los resultados a una lista de diccionarios
-                result = [dict(row) for row in rows]
-                
-                # Cerrar la conexión
-                conn.close()
-                
-                return result
-            except Exception as e:
-                print(f"Error al obtener bobinas por IDs: {e}")
-                return []
+        Returns:
+            BobinaResultSet: Filas con los datos de las bobinas
+        """
+        try:
+            with self.pool.reader() as conn:
+                # Ejecutar la consulta sobre los IDs cargados en la tabla temporal
+                staged = self._stage_ids(conn, ids)
+                return self._query_result(
+                    conn, f"SELECT {SELECT_COLUMNS} FROM bobina WHERE id IN ({staged})", []
+                )
+        except Exception as e:
+            print(f"Error al obtener bobinas por IDs: {e}")
+            return BobinaResultSet()
 
-    def move_to_historic(self, ids):
-            """
-            Mueve los registros seleccionados a la tabla histórica y los elimina de la tabla principal.
+    def iter_bobinas(self, ids=None, filters=None, batch_size=500):
+        """
+        Recorre los registros de bobinas sin cargarlos todos en memoria.
+        
+        Las filas se leen por lotes con fetchmany y se entregan como tuplas en
+        el orden de BOBINA_COLUMNS, de modo que el consumo de memoria no
+        depende del número de registros.
+        
+        Args:
+            ids (iterable | Selection): IDs a recorrer, o una selección; si se
+                indica, se ignoran los filtros
+            filters (dict): Criterios de filtrado (mismo formato que filter_bobinas)
+            batch_size (int): Número de filas leídas por lote
             
-            Args:
-                ids (list): Lista de IDs de las bobinas a mover
-                
-            Returns:
-                bool: True si se movieron correctamente, False en caso contrario
-            """
+        Yields:
+            tuple: Valores de cada bobina en el orden de BOBINA_COLUMNS
+        """
+        columns = SELECT_COLUMNS
+        
+        with self.pool.reader() as conn:
+            if ids is not None:
+                staged = self._stage_ids(conn, ids)
+                query = f"SELECT {columns} FROM bobina WHERE id IN ({staged}) ORDER BY id DESC"
+                values = []
+            else:
+                source, key, conditions, values = self._build_filter_conditions(filters)
+                query = f"SELECT {columns} FROM {source}"
+                if conditions:
+                    query += " WHERE " + " AND ".join(conditions)
+                query += f" ORDER BY {key} DESC"
+            
+            cursor = conn.cursor()
+            cursor.row_factory = None  # Tuplas simples, sin sqlite3.Row
+            cursor.execute(query, values)
             try:
-                # Conectar a la base de datos
-                conn = sqlite3.connect(self.db_path)
-                conn.row_factory = sqlite3.Row
-                cursor = conn.cursor()
-                
-                # Crear placeholders para la consulta SQL
-                placeholders = ', '.join(['?' for _ in ids])
-                
-                # Obtener los registros a mover
-                cursor.execute(f"SELECT * FROM bobina WHERE id IN ({placeholders})", ids)
-                rows = cursor.fetchall()
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    yield from rows
+            finally:
+                cursor.close()
+    
+    def _stage_ids(self, conn, ids):
+        """
+        Carga los IDs en una tabla temporal de la conexión.
+        
+        Evita las listas IN (...) con un parámetro por ID, que fallan al
+        superar el límite de variables de SQLite en selecciones grandes.
+        Una Selection en modo "todas las que cumplen los filtros" se carga
+        con un INSERT ... SELECT sobre el predicado de los filtros, sin pasar
+        los IDs por Python.
+        
+        Args:
+            conn (sqlite3.Connection): Conexión donde se usará la tabla temporal
+            ids (iterable | Selection): IDs a cargar, o una selección
+            
+        Returns:
+            str: Subconsulta que devuelve los IDs cargados
+        """
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS staged_ids (id INTEGER PRIMARY KEY)")
+        conn.execute("DELETE FROM temp.staged_ids")
+        if isinstance(ids, Selection):
+            if ids.all_matching:
+                query, values = self._selection_query(conn, ids)
+                conn.execute(f"INSERT OR IGNORE INTO temp.staged_ids (id) {query}", values)
+                return "SELECT id FROM temp.staged_ids"
+            ids = ids.ids
+        conn.executemany(
+            "INSERT OR IGNORE INTO temp.staged_ids (id) VALUES (?)",
+            ((int(bobina_id),) for bobina_id in ids)
+        )
+        return "SELECT id FROM temp.staged_ids"
+    
+    def _selection_query(self, conn, selection):
+        """
+        Consulta de los IDs de una selección en modo "todas las que cumplen los filtros".
+        
+        Las excepciones se cargan en otra tabla temporal (excluded_ids).
+        
+        Args:
+            conn (sqlite3.Connection): Conexión donde se ejecutará la consulta
+            selection (Selection): Selección con all_matching activo
+            
+        Returns:
+            tuple: Consulta SQL (SELECT bobina.id ...) y lista de valores a enlazar
+        """
+        source, _, conditions, values = self._build_filter_conditions(selection.filters)
+        conditions.append("bobina.id <= ?")
+        values.append(int(selection.max_id))
+        if selection.excluded:
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS excluded_ids (id INTEGER PRIMARY KEY)")
+            conn.execute("DELETE FROM temp.excluded_ids")
+            conn.executemany(
+                "INSERT OR IGNORE INTO temp.excluded_ids (id) VALUES (?)",
+                ((int(bobina_id),) for bobina_id in selection.excluded)
+            )
+            conditions.append("bobina.id NOT IN (SELECT id FROM temp.excluded_ids)")
+        return f"SELECT bobina.id FROM {source} WHERE " + " AND ".join(conditions), values
+    
+    def count_selection(self, selection):
+        """
+        Cuenta las bobinas de una selección.
+        
+        Args:
+            selection (Selection): Selección a contar
+            
+        Returns:
+            int: Número de bobinas seleccionadas que existen en la tabla
+        """
+        try:
+            if not selection.all_matching:
+                return len(selection.ids)
+            with self.pool.reader() as conn:
+                query, values = self._selection_query(conn, selection)
+                return conn.execute(f"SELECT COUNT(*) FROM ({query})", values).fetchone()[0]
+        except Exception as e:
+            print(f"Error al contar la selección: {e}")
+            return 0
+    
+    def move_to_historic(self, ids):
+        """
+        Mueve los registros seleccionados al archivo histórico y los elimina de la tabla principal.
+        
+        Cada registro se copia al archivo de su mes de producción
+        (historico_AAAA_MM.db) con un INSERT ... SELECT sobre la partición
+        adjunta; después se eliminan de bobina en una única transacción. Los
+        registros cuya fecha no indica el mes se guardan en bobina_h.
+        
+        La copia conserva el ID de bobina y no sobrescribe filas existentes,
+        por lo que si el proceso se interrumpe antes del borrado puede
+        repetirse sin duplicar registros. Los totales de bobina_rollup se
+        conservan.
+        
+        Args:
+            ids (list | Selection): IDs de las bobinas a mover, o una selección
+                (en modo por filtros se resuelve en SQL sin listar los IDs)
+            
+        Returns:
+            bool: True si se movieron correctamente, False en caso contrario
+        """
+        columns = ', '.join(BOBINA_COLUMNS)
+        legacy_columns = ', '.join(INSERT_COLUMNS + ["created_at"])
+        month = PARTITION_MONTH_EXPRESSION.format(column="fecha")
+        
+        try:
+            # Meses de producción de los registros (None: fecha sin mes)
+            with self.pool.reader() as conn:
+                staged = self._stage_ids(conn, ids)
+                months = [
+                    row[0] for row in conn.execute(
+                        f"SELECT DISTINCT {month} FROM bobina WHERE id IN ({staged})"
+                    )
+                ]
+            
+            # Copiar cada mes a su partición (una transacción por archivo)
+            for partition in sorted(m for m in months if m is not None):
+                path = partition_path(self.archive_dir, partition)
+                with self.pool.writer(attach={"historico": path}) as conn:
+                    for statement in PARTITION_SCHEMA:
+                        conn.execute(statement.format(schema="historico"))
+                    staged = self._stage_ids(conn, ids)
+                    conn.execute(
+                        f"INSERT OR IGNORE INTO historico.bobina_h ({columns}) "
+                        f"SELECT {columns} FROM main.bobina "
+                        f"WHERE id IN ({staged}) AND {month} = ? ORDER BY id",
+                        (partition,)
+                    )
+            
+            with self.pool.writer() as conn:
+                staged = self._stage_ids(conn, ids)
+                if None in months:
+                    conn.execute(
+                        f"INSERT INTO bobina_h ({legacy_columns}) "
+                        f"SELECT {legacy_columns} FROM bobina "
+                        f"WHERE id IN ({staged}) AND {month} IS NULL ORDER BY id"
+                    )
                 
-                # Insertar los registros en la tabla histórica
-                for row in rows:
-                    row_dict = dict(row)
-                    # Eliminar el ID para que se genere uno nuevo en la tabla histórica
-                    bobina_id = row_dict.pop('id')
-                    
-                    # Crear placeholders y valores para la inserción
-                    columns = ', '.join(row_dict.keys())
-                    value_placeholders = ', '.join(['?' for _ in row_dict])
-                    values = list(row_dict.values())
-                    
-                    # Insertar en la tabla histórica
-                    cursor.execute(f"INSERT INTO bobina_h ({columns}) VALUES ({value_placeholders})", values)
+                # Las particiones no tienen triggers: sumar sus totales al resumen
+                # antes de que el borrado los descuente
+                if any(m is not None for m in months):
+                    conn.execute(rollup_add_statement(
+                        "bobina",
+                        f"t.id IN ({staged}) AND "
+                        + PARTITION_MONTH_EXPRESSION.format(column="t.fecha") + " IS NOT NULL"
+                    ))
                 
                 # Eliminar los registros de la tabla principal
-                cursor.execute(f"DELETE FROM bobina WHERE id IN ({placeholders})", ids)
-                
-                # Confirmar la transacción
-                conn.commit()
+                conn.execute(f"DELETE FROM bobina WHERE id IN ({staged})")
+            self._bump_generation()
+            
+            return True
+        except Exception as e:
+            print(f"Error al mover registros a histórico: {e}")
+            return False
+    
+    def historic_chunks(self, conn, fecha_desde=None, fecha_hasta=None, ascending=False):
+        """
+        Adjunta a una conexión las particiones históricas de un rango de días.
+        
+        Solo se adjuntan los archivos de los meses del rango. Si superan el
+        límite de bases adjuntas de SQLite se entregan por tandas, de la más
+        reciente a la más antigua (o al revés con `ascending`); cada tanda
+        incluye también la tabla bobina_h de produccion.db, acotada a los
+        meses de la tanda para que ninguna fila se repita.
+        
+        Args:
+            conn (sqlite3.Connection): Conexión del pool, sin transacción abierta
+            fecha_desde (str): Primer día del rango (AAAA-MM-DD), opcional
+            fecha_hasta (str): Último día del rango (AAAA-MM-DD), opcional
+            ascending (bool): Entregar las tandas de la más antigua a la más reciente
+            
+        Yields:
+            tuple: Tablas a consultar (la primera es bobina_h de produccion.db),
+            condiciones sobre la columna fecha y valores a enlazar; las
+            particiones quedan adjuntas hasta pedir la siguiente tanda
+        """
+        lower, upper = date_bounds(fecha_desde, fecha_hasta)
+        partitions = list_partitions(self.archive_dir, fecha_desde, fecha_hasta)
+        if ascending:
+            partitions.reverse()
+        limit = max(1, conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED))
+        chunks = [partitions[i:i + limit] for i in range(0, len(partitions), limit)] or [[]]
+        
+        for position, chunk in enumerate(chunks):
+            last = position == len(chunks) - 1
+            if ascending:
+                # Cada tanda termina donde empieza el primer mes de la siguiente
+                chunk_lower = lower
+                chunk_upper = upper if last else chunks[position + 1][0][0].replace("_", "-")
+            else:
+                # Cada tanda termina donde empieza el mes más antiguo que contiene
+                chunk_lower = lower if last else chunk[-1][0].replace("_", "-")
+                chunk_upper = upper
+            
+            conditions = []
+            values = []
+            if chunk_lower:
+                conditions.append("fecha >= ?")
+                values.append(chunk_lower)
+            if chunk_upper:
+                conditions.append("fecha < ?")
+                values.append(chunk_upper)
+            
+            aliases = {f"historico_{index}": path for index, (month, path) in enumerate(chunk)}
+            with self.pool.attached(conn, aliases):
+                tables = ["bobina_h"] + [f"{alias}.bobina_h" for alias in aliases]
+                yield tables, conditions, values
+            if ascending:
+                lower = chunk_upper
+            else:
+                upper = chunk_lower
+    
+    def iter_historic(self, fecha_desde=None, fecha_hasta=None, filters=None, batch_size=500):
+        """
+        Recorre los registros históricos de un rango de días.
+        
+        Une (UNION ALL) la tabla bobina_h y las particiones mensuales del
+        rango, sin abrir los archivos de los demás meses, y combina el
+        resultado con los archivos fríos del rango, que se recorren con los
+        filtros aplicados bloque por bloque.
+        
+        Args:
+            fecha_desde (str): Primer día del rango (AAAA-MM-DD), opcional
+            fecha_hasta (str): Último día del rango (AAAA-MM-DD), opcional
+            filters (dict): Criterios de filtrado (mismo formato que filter_bobinas)
+            batch_size (int): Número de filas leídas por lote
+            
+        Yields:
+            tuple: Valores de cada bobina en el orden de BOBINA_COLUMNS, de la
+            fecha más reciente a la más antigua
+        """
+        lower, upper = date_bounds(fecha_desde, fecha_hasta)
+        sources = [self._iter_historic_sql(fecha_desde, fecha_hasta, filters, batch_size)]
+        for desde, hasta, path in list_cold_files(self.archive_dir, fecha_desde, fecha_hasta):
+            # Cada archivo está ordenado de forma ascendente por (fecha, id)
+            rows = list(ColdFile(path).scan(filters, lower, upper))
+            rows.reverse()
+            sources.append(rows)
+        
+        if len(sources) == 1:
+            yield from sources[0]
+            return
+        
+        fecha = BOBINA_COLUMNS.index("fecha")
+        yield from heapq.merge(*sources, key=lambda row: (row[fecha], row[0]), reverse=True)
+    
+    def _iter_historic_sql(self, fecha_desde, fecha_hasta, filters, batch_size=500):
+        """Recorre bobina_h y las particiones mensuales (ver iter_historic)."""
+        with self.pool.reader() as conn:
+            for tables, date_conditions, date_values in self.historic_chunks(
+                conn, fecha_desde, fecha_hasta
+            ):
+                selects = []
+                values = []
+                for table in tables:
+                    source, key, conditions, filter_values = self._build_filter_conditions(
+                        filters, table
+                    )
+                    conditions += [f"{table}.{condition}" for condition in date_conditions]
+                    select = ", ".join(
+                        f"{table}.{column} AS {column}" for column in BOBINA_COLUMNS
+                    )
+                    query = f"SELECT {select} FROM {source}"
+                    if conditions:
+                        query += " WHERE " + " AND ".join(conditions)
+                    selects.append(query)
+                    values += filter_values + date_values
+                query = " UNION ALL ".join(selects) + " ORDER BY fecha DESC, id DESC"
                 
-                # Cerrar la conexión
-                conn.close()
+                cursor = conn.cursor()
+                cursor.row_factory = None  # Tuplas simples, sin sqlite3.Row
+                cursor.execute(query, values)
+                try:
+                    while True:
+                        rows = cursor.fetchmany(batch_size)
+                        if not rows:
+                            break
+                        yield from rows
+                finally:
+                    cursor.close()
+    
+    def get_historic(self, fecha_desde=None, fecha_hasta=None, filters=None):
+        """
+        Obtiene los registros históricos de un rango de días.
+        
+        Args:
+            fecha_desde (str): Primer día del rango (AAAA-MM-DD), opcional
+            fecha_hasta (str): Último día del rango (AAAA-MM-DD), opcional
+            filters (dict): Criterios de filtrado (mismo formato que filter_bobinas)
+            
+        Returns:
+            BobinaResultSet: Filas históricas, de la fecha más reciente a la más antigua
+        """
+        try:
+            return BobinaResultSet(self.iter_historic(fecha_desde, fecha_hasta, filters))
+        except Exception as e:
+            print(f"Error al obtener registros históricos: {e}")
+            return BobinaResultSet()
+    
+    def freeze_historic(self, fecha_desde, fecha_hasta, codec="lzma"):
+        """
+        Congela un rango del histórico en un archivo frío columnar comprimido.
+        
+        Las bobinas del rango (bobina_h y particiones mensuales) se escriben
+        en historico_frio_<desde>_<hasta>.bcol y después se eliminan de sus
+        tablas de origen por ID, de modo que solo se borra lo que quedó
+        escrito; las particiones que quedan vacías se borran. Los
+        totales de bobina_rollup no cambian.
+        
+        Las filas se leen y se escriben de a un bloque, sin cargar el rango
+        completo en memoria; solo se guardan sus IDs.
+        
+        Args:
+            fecha_desde (str): Primer día del rango (AAAA-MM-DD)
+            fecha_hasta (str): Último día del rango (AAAA-MM-DD)
+            codec (str): Compresor de las columnas ("lzma" o "zlib")
+            
+        Returns:
+            int: Número de registros congelados
+            
+        Raises:
+            ValueError: Si el rango no es válido o se superpone con otro archivo frío
+        """
+        if not fecha_desde or not fecha_hasta or fecha_desde > fecha_hasta:
+            raise ValueError("Debe indicarse un rango de fechas válido")
+        lower, upper = date_bounds(fecha_desde, fecha_hasta)
+        if list_cold_files(self.archive_dir, lower, fecha_hasta):
+            raise ValueError("El rango se superpone con un archivo frío existente")
+        
+        # IDs escritos en el archivo frío, por origen (None es bobina_h de
+        # produccion.db): bobina_h puede tener IDs propios que coinciden con
+        # los de las particiones, así que cada origen borra solo los suyos
+        frozen = {}
+        
+        def tagged(cursor, source):
+            ids = frozen.setdefault(source, array("q"))
+            for row in cursor:
+                ids.append(row[0])
+                yield row
+        
+        def frozen_rows(conn):
+            """Filas del rango en orden ascendente por (fecha, id), de a una tanda."""
+            select = ", ".join(BOBINA_COLUMNS)
+            fecha = BOBINA_COLUMNS.index("fecha")
+            for tables, conditions, values in self.historic_chunks(
+                conn, lower, fecha_hasta, ascending=True
+            ):
+                files = {row[1]: row[2] for row in conn.execute("PRAGMA database_list")}
+                sources = []
+                for table in tables:
+                    cursor = conn.cursor()
+                    cursor.row_factory = None
+                    cursor.execute(
+                        f"SELECT {select} FROM {table} WHERE {' AND '.join(conditions)} "
+                        f"ORDER BY fecha, id",
+                        values
+                    )
+                    source = files[table.split(".")[0]] if "." in table else None
+                    sources.append(tagged(cursor, source))
+                yield from heapq.merge(*sources, key=lambda row: (row[fecha], row[0]))
+        
+        try:
+            with self.pool.reader() as conn:
+                rows = frozen_rows(conn)
+                try:
+                    first = next(rows, None)
+                    if first is None:
+                        return 0
+                    total = write_cold_file(
+                        cold_path(self.archive_dir, lower, fecha_hasta[:10]),
+                        chain([first], rows), codec
+                    )
+                finally:
+                    # Separar las particiones antes de devolver la conexión
+                    rows.close()
+            
+            # Se eliminan solo los IDs escritos en el archivo frío: una bobina
+            # archivada en el rango después de la lectura sigue en el histórico
+            for source, ids in frozen.items():
+                if source is None:
+                    # bobina_h de produccion.db, conservando sus totales en el resumen
+                    with self.pool.writer() as conn:
+                        staged = self._stage_ids(conn, ids)
+                        condition = f"t.id IN ({staged}) AND t.fecha >= ? AND t.fecha < ?"
+                        conn.execute(rollup_add_statement("bobina_h", condition), (lower, upper))
+                        conn.execute(
+                            f"DELETE FROM bobina_h WHERE id IN ({staged}) "
+                            f"AND fecha >= ? AND fecha < ?",
+                            (lower, upper)
+                        )
+                    continue
                 
-                return True
-            except Exception as e:
-                print(f"Error al mover registros a histórico: {e}")
-                return False
\ No newline at end of file
+                # Partición mensual del rango
+                with self.pool.writer(attach={"historico": source}) as conn:
+                    staged = self._stage_ids(conn, ids)
+                    conn.execute(
+                        f"DELETE FROM historico.bobina_h "
+                        f"WHERE id IN ({staged}) AND fecha >= ? AND fecha < ?",
+                        (lower, upper)
+                    )
+                    remaining = conn.execute(
+                        "SELECT COUNT(*) FROM historico.bobina_h"
+                    ).fetchone()[0]
+                if not remaining:
+                    try:
+                        os.remove(source)
+                    except OSError:
+                        pass  # En uso por otro proceso: queda vacía
+            self._bump_generation()
+            
+            return total
+        except Exception as e:
+            print(f"Error al congelar el histórico: {e}")
+            return 0
+    
+    def backup(self, backup_dir=None, pages=256, sleep=0.05, keep=7, progress=None):
+        """
+        Crea una copia de seguridad en línea de la base de datos y del histórico.
+        
+        La copia incluye las particiones mensuales y los archivos fríos de
+        archive_dir. Avanza por tramos de `pages` páginas con una pausa de
+        `sleep` segundos entre tramos, sin bloquear al escritor (ver models.backup).
+        
+        Args:
+            backup_dir (str): Directorio de las copias (por defecto, backups
+                junto a la base de datos)
+            pages (int): Páginas copiadas en cada tramo
+            sleep (float): Segundos de pausa entre tramos
+            keep (int): Copias que se conservan (0 conserva todas)
+            progress (callable): Función que recibe (páginas copiadas, páginas totales)
+            
+        Returns:
+            str: Directorio de la copia creada, o None si falló
+        """
+        if backup_dir is None:
+            backup_dir = os.path.join(os.path.dirname(os.path.abspath(self.db_path)), "backups")
+        try:
+            return backup_database(
+                self.db_path, backup_dir, pages=pages, sleep=sleep, keep=keep,
+                progress=progress, busy_timeout=self.pool.busy_timeout,
+                archive_dir=self.archive_dir
+            )
+        except Exception as e:
+            print(f"Error al crear la copia de seguridad: {e}")
+            return None
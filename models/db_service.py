@@ -0,0 +1,206 @@
+import asyncio
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from models.selection import Selection
+
+
+class DatabaseService:
+    """
+    Servicio asíncrono de acceso a la base de datos para las vistas.
+
+    Las escrituras se encolan y las ejecuta, en orden de llegada, un único
+    hilo escritor; las lecturas se reparten en un pool de hilos acotado al
+    número de conexiones de lectura. Los métodos son corrutinas pensadas
+    para el bucle de eventos de Flet (page.run_task), de modo que la interfaz
+    solo se modifica desde ese bucle.
+    """
+
+    def __init__(self, db_manager, max_pending_writes=64):
+        """
+        Inicializa el servicio y arranca el hilo escritor.
+
+        Args:
+            db_manager (DatabaseManager): Gestor de base de datos
+            max_pending_writes (int): Escrituras encoladas como máximo; al
+                alcanzarlo, quien escribe espera a que se libere lugar
+        """
+        self.db_manager = db_manager
+        self._writes = queue.Queue()
+        self._write_slots = asyncio.Semaphore(max_pending_writes)
+        self._readers = ThreadPoolExecutor(
+            max_workers=db_manager.pool.max_readers, thread_name_prefix="db-reader"
+        )
+        self._latest_reads = {}
+        # Lectura con clave -> estado compartido con el hilo que la ejecuta
+        self._read_tasks = {}
+        self._read_tasks_lock = threading.Lock()
+        self._writer = threading.Thread(target=self._writer_loop, name="db-writer", daemon=True)
+        self._writer.start()
+
+    def _writer_loop(self):
+        """Ejecuta las escrituras encoladas, una por vez y en orden."""
+        while True:
+            item = self._writes.get()
+            if item is None:
+                break
+            future, function, args, kwargs = item
+            # Escritura cancelada antes de empezar: se descarta
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(function(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+
+    async def write(self, function, *args, **kwargs):
+        """
+        Encola una escritura y espera su resultado.
+
+        Args:
+            function (callable): Método de escritura del DatabaseManager
+
+        Returns:
+            Resultado de `function`
+        """
+        async with self._write_slots:
+            future = Future()
+            self._writes.put((future, function, args, kwargs))
+            return await asyncio.wrap_future(future)
+
+    async def read(self, function, *args, key=None, **kwargs):
+        """
+        Ejecuta una lectura en el pool de lectores.
+
+        Args:
+            function (callable): Método de lectura del DatabaseManager
+            key (str): Si se indica, una lectura posterior con la misma clave
+                deja obsoleta a esta: si aún no empezó no se ejecuta, si está
+                en curso se aborta su consulta (Connection.interrupt) y, si ya
+                terminó, su resultado se descarta (se cancela la corrutina)
+
+        Returns:
+            Resultado de `function`
+        """
+        if key is None:
+            future = self._readers.submit(function, *args, **kwargs)
+        else:
+            task = {"thread": None}
+            future = self._readers.submit(self._run_read, task, function, args, kwargs)
+            self._read_tasks[future] = task
+            previous = self._latest_reads.get(key)
+            if previous is not None and not previous.cancel():
+                self._interrupt_read(previous)
+            self._latest_reads[key] = future
+        try:
+            result = await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            if not future.cancel():
+                self._interrupt_read(future)
+            raise
+        finally:
+            stale = key is not None and self._latest_reads.get(key) is not future
+            if key is not None and not stale:
+                del self._latest_reads[key]
+            self._read_tasks.pop(future, None)
+        if stale:
+            raise asyncio.CancelledError()
+        return result
+
+    def _run_read(self, task, function, args, kwargs):
+        """Ejecuta una lectura con clave anotando el hilo, para poder interrumpirla."""
+        with self._read_tasks_lock:
+            task["thread"] = threading.get_ident()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            with self._read_tasks_lock:
+                task["thread"] = None
+
+    def _interrupt_read(self, future):
+        """Aborta la consulta en curso de una lectura que quedó obsoleta."""
+        task = self._read_tasks.get(future)
+        if task is None:
+            return
+        # Con el candado tomado el hilo no puede terminar la lectura y pasar
+        # a otra: la interrupción solo alcanza a la consulta obsoleta
+        with self._read_tasks_lock:
+            if task["thread"] is not None:
+                self.db_manager.pool.interrupt_reader(task["thread"])
+
+    # Lecturas
+
+    async def get_bobinas_page(self, after_id=None, limit=200, filters=None, key="page",
+                               sort=None, after=None):
+        """Versión asíncrona de DatabaseManager.get_bobinas_page."""
+        return await self.read(
+            self.db_manager.get_bobinas_page, after_id, limit, filters,
+            sort=sort, after=after, key=key
+        )
+
+    async def get_change_seq(self):
+        """Versión asíncrona de DatabaseManager.get_change_seq."""
+        return await self.read(self.db_manager.get_change_seq)
+
+    async def get_changes_since(self, since_seq, filters=None):
+        """Versión asíncrona de DatabaseManager.get_changes_since."""
+        return await self.read(
+            self.db_manager.get_changes_since, since_seq, filters, key="changes"
+        )
+
+    async def get_last_bobina_id(self):
+        """Versión asíncrona de DatabaseManager.get_last_bobina_id."""
+        return await self.read(self.db_manager.get_last_bobina_id)
+
+    async def count_selection(self, selection):
+        """Versión asíncrona de DatabaseManager.count_selection."""
+        return await self.read(self.db_manager.count_selection, selection.copy())
+
+    async def get_production_summary(self, fecha=None, group_by=("turno", "of")):
+        """Versión asíncrona de DatabaseManager.get_production_summary."""
+        return await self.read(
+            self.db_manager.get_production_summary, fecha, group_by, key="summary"
+        )
+
+    # Escrituras
+
+    async def add_bobina(self, bobina_data):
+        """Versión asíncrona de DatabaseManager.add_bobina."""
+        return await self.write(self.db_manager.add_bobina, bobina_data)
+
+    async def delete_bobinas(self, ids):
+        """Versión asíncrona de DatabaseManager.delete_bobinas."""
+        return await self.write(self.db_manager.delete_bobinas, _snapshot(ids))
+
+    async def move_to_historic(self, ids):
+        """Versión asíncrona de DatabaseManager.move_to_historic."""
+        return await self.write(self.db_manager.move_to_historic, _snapshot(ids))
+
+    async def rebuild_rollup(self):
+        """Versión asíncrona de DatabaseManager.rebuild_rollup."""
+        return await self.write(self.db_manager.rebuild_rollup)
+
+    # Copias de seguridad
+
+    async def backup(self, progress=None):
+        """
+        Versión asíncrona de DatabaseManager.backup.
+
+        La copia puede durar varios minutos: se ejecuta en un hilo propio,
+        sin ocupar el hilo escritor ni los lectores.
+        """
+        return await asyncio.to_thread(self.db_manager.backup, progress=progress)
+
+    def close(self):
+        """Termina el hilo escritor (tras las escrituras pendientes) y los lectores."""
+        self._writes.put(None)
+        self._writer.join()
+        self._readers.shutdown(wait=True, cancel_futures=True)
+
+
+def _snapshot(ids):
+    """Copia de una lista de IDs o de una selección: puede cambiar mientras se escribe."""
+    if isinstance(ids, Selection):
+        return ids.copy()
+    return list(ids)
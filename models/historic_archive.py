@@ -0,0 +1,126 @@
+"""
+Archivo histórico particionado por mes.
+
+Los registros que se mueven al histórico se guardan en un archivo SQLite por
+mes de producción (data/historico_AAAA_MM.db), de modo que produccion.db solo
+contiene la producción en curso. Las consultas históricas adjuntan (ATTACH)
+únicamente los archivos de los meses del rango pedido.
+"""
+import datetime
+import glob
+import os
+import re
+
+# Nombre del archivo de cada partición (month en formato AAAA_MM)
+PARTITION_FILENAME = "historico_{month}.db"
+
+# Fecha de producción que se puede asignar a un mes (AAAA-MM...)
+_MONTH_PATTERN = re.compile(r"^(\d{4})-(\d{2})")
+_FILENAME_PATTERN = re.compile(r"^historico_(\d{4}_\d{2})\.db$")
+
+# Esquema de cada partición; {schema} es el alias con el que se adjunta.
+# El ID es el de la tabla bobina, así un movimiento interrumpido se puede repetir.
+PARTITION_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS {schema}.bobina_h (
+        id INTEGER PRIMARY KEY,
+        turno TEXT NOT NULL,
+        ancho REAL NOT NULL,
+        diametro REAL NOT NULL,
+        gramaje REAL NOT NULL,
+        peso REAL NOT NULL,
+        bobina_num TEXT NOT NULL,
+        sec TEXT,
+        of TEXT NOT NULL,
+        fecha TEXT NOT NULL,
+        codcal TEXT,
+        desccal TEXT,
+        created_at TEXT,
+        fecha_insercion TEXT DEFAULT CURRENT_TIMESTAMP
+    )
+    ''',
+    "CREATE INDEX IF NOT EXISTS {schema}.idx_bobina_h_fecha ON bobina_h (fecha)",
+    "CREATE INDEX IF NOT EXISTS {schema}.idx_bobina_h_of ON bobina_h (of)",
+]
+
+
+# Expresión SQL equivalente a partition_month; {column} es la columna fecha
+PARTITION_MONTH_EXPRESSION = (
+    "CASE WHEN {column} GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]*' "
+    "THEN substr({column}, 1, 4) || '_' || substr({column}, 6, 2) END"
+)
+
+
+def partition_month(fecha):
+    """
+    Devuelve el mes de la partición de una fecha de producción.
+
+    Args:
+        fecha (str): Fecha de la bobina (AAAA-MM-DD HH:MM)
+
+    Returns:
+        str: Mes en formato AAAA_MM, o None si la fecha no tiene ese formato
+    """
+    match = _MONTH_PATTERN.match(fecha or "")
+    if not match:
+        return None
+    return f"{match.group(1)}_{match.group(2)}"
+
+
+def partition_path(directory, month):
+    """Devuelve la ruta del archivo de la partición de un mes (AAAA_MM)."""
+    return os.path.join(directory, PARTITION_FILENAME.format(month=month))
+
+
+def date_bounds(fecha_desde=None, fecha_hasta=None):
+    """
+    Convierte un rango de días en límites para comparar con la columna fecha.
+
+    Args:
+        fecha_desde (str): Primer día incluido (AAAA-MM-DD)
+        fecha_hasta (str): Último día incluido (AAAA-MM-DD)
+
+    Returns:
+        tuple: Límite inferior inclusivo y superior exclusivo (None si no hay)
+
+    Raises:
+        ValueError: Si alguna de las fechas no tiene el formato AAAA-MM-DD
+    """
+    lower = upper = None
+    try:
+        if fecha_desde:
+            lower = datetime.date.fromisoformat(fecha_desde[:10]).isoformat()
+        if fecha_hasta:
+            last_day = datetime.date.fromisoformat(fecha_hasta[:10])
+            upper = (last_day + datetime.timedelta(days=1)).isoformat()
+    except ValueError:
+        raise ValueError("Las fechas deben tener el formato AAAA-MM-DD") from None
+    return lower, upper
+
+
+def list_partitions(directory, fecha_desde=None, fecha_hasta=None):
+    """
+    Lista las particiones existentes que cubren un rango de días.
+
+    Args:
+        directory (str): Directorio de los archivos históricos
+        fecha_desde (str): Primer día del rango (AAAA-MM-DD), opcional
+        fecha_hasta (str): Último día del rango (AAAA-MM-DD), opcional
+
+    Returns:
+        list: Tuplas (mes, ruta), de la más reciente a la más antigua
+    """
+    first = fecha_desde[:7].replace("-", "_") if fecha_desde else None
+    last = fecha_hasta[:7].replace("-", "_") if fecha_hasta else None
+
+    partitions = []
+    for path in glob.glob(os.path.join(directory, "historico_*.db")):
+        match = _FILENAME_PATTERN.match(os.path.basename(path))
+        if not match:
+            continue
+        month = match.group(1)
+        if (first and month < first) or (last and month > last):
+            continue
+        partitions.append((month, path))
+    partitions.sort(reverse=True)
+    return partitions
@@ -0,0 +1,187 @@
+"""
+Servicio de ingesta de bobinas desde balanzas, lectores y PLC de las líneas.
+
+Escucha en un socket local (TCP o Unix) registros de bobina en JSON, uno
+por línea, con los mismos campos que el formulario de alta. Cada registro
+se valida con validate_bobina y se acumula; cada `flush_interval` segundos
+(o al juntar `batch_size` registros) el lote se confirma con una única
+transacción mediante add_bobinas_bulk.
+
+Por cada línea recibida se responde, en el mismo orden, una línea JSON:
+{"ok": true, "id": <id>} una vez confirmado el registro, o
+{"ok": false, "error": "<motivo>"} si fue rechazado.
+"""
+import asyncio
+import json
+
+from models.database_manager import validate_bobina
+
+
+class IngestionServer:
+    """Servidor asíncrono de ingesta con confirmación agrupada (group commit)."""
+
+    def __init__(self, db_manager, host="127.0.0.1", port=8765, unix_path=None,
+                 flush_interval=0.2, batch_size=500, max_pending=5000):
+        """
+        Inicializa el servidor.
+
+        Args:
+            db_manager (DatabaseManager): Gestor de base de datos
+            host (str): Dirección TCP de escucha
+            port (int): Puerto TCP de escucha
+            unix_path (str): Ruta del socket Unix; si se indica, se usa en lugar de TCP
+            flush_interval (float): Segundos máximos que un registro espera su commit
+            batch_size (int): Registros que fuerzan un commit sin esperar el intervalo
+            max_pending (int): Registros sin confirmar admitidos; al alcanzarlo se
+                deja de leer de los clientes hasta el siguiente commit
+        """
+        self.db_manager = db_manager
+        self.host = host
+        self.port = port
+        self.unix_path = unix_path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+
+        self._pending = []
+        self._slots = asyncio.Semaphore(max_pending)
+        self._batch_ready = asyncio.Event()
+        self._server = None
+        self._flusher = None
+        self._closing = False
+
+        # Contadores de actividad
+        self.received = 0
+        self.committed = 0
+        self.rejected = 0
+        self.batches = 0
+
+    async def start(self):
+        """Abre el socket de escucha y arranca la tarea de commits."""
+        if self.unix_path:
+            self._server = await asyncio.start_unix_server(self._handle_client, path=self.unix_path)
+        else:
+            self._server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def serve_forever(self):
+        """Atiende conexiones hasta que se cancele la tarea."""
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        """Deja de aceptar conexiones y confirma los registros pendientes."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        # Dejar que la tarea de commits termine el lote en curso
+        self._closing = True
+        self._batch_ready.set()
+        if self._flusher is not None:
+            await self._flusher
+        await self._flush()
+
+    def stats(self):
+        """Devuelve los contadores de registros recibidos, confirmados y rechazados."""
+        return {
+            "received": self.received,
+            "committed": self.committed,
+            "rejected": self.rejected,
+            "batches": self.batches,
+            "pending": len(self._pending),
+        }
+
+    async def _handle_client(self, reader, writer):
+        """Lee los registros de una conexión y responde en el mismo orden."""
+        responses = asyncio.Queue(maxsize=1000)
+        responder = asyncio.create_task(self._respond(writer, responses))
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                await responses.put(await self._submit(line))
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError) as e:
+            print(f"Error en la conexión de ingesta: {e}")
+        finally:
+            await responses.put(None)
+            await responder
+            writer.close()
+
+    async def _respond(self, writer, responses):
+        """Escribe las respuestas a medida que se confirman los registros."""
+        while True:
+            response = await responses.get()
+            if response is None:
+                break
+            if isinstance(response, asyncio.Future):
+                response = await response
+            try:
+                writer.write(json.dumps(response).encode("utf-8") + b"\n")
+                await writer.drain()
+            except ConnectionError:
+                pass  # El cliente se desconectó; los registros ya están guardados
+
+    async def _submit(self, line):
+        """
+        Valida una línea y la agrega al lote pendiente.
+
+        Returns:
+            Respuesta de rechazo (dict) o futuro que se resuelve al confirmar
+        """
+        self.received += 1
+        try:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                raise ValueError("La línea no es un JSON válido") from None
+            if not isinstance(record, dict):
+                raise ValueError("Se esperaba un objeto JSON")
+            validate_bobina(record)
+        except ValueError as e:
+            self.rejected += 1
+            return {"ok": False, "error": str(e)}
+
+        await self._slots.acquire()
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((record, future))
+        if len(self._pending) >= self.batch_size:
+            self._batch_ready.set()
+        return future
+
+    async def _flush_loop(self):
+        """Confirma el lote pendiente cada flush_interval o al completarse."""
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._batch_ready.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._batch_ready.clear()
+            await self._flush()
+
+    async def _flush(self):
+        """Inserta el lote pendiente con add_bobinas_bulk y resuelve sus futuros."""
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        records = [record for record, _ in batch]
+        try:
+            ids = await asyncio.to_thread(
+                self.db_manager.add_bobinas_bulk, records, len(records)
+            )
+        except ValueError as e:
+            ids = []
+            print(f"Error al confirmar lote de ingesta: {e}")
+
+        self.batches += 1
+        self.committed += len(ids)
+        for index, (record, future) in enumerate(batch):
+            if index < len(ids):
+                future.set_result({"ok": True, "id": ids[index]})
+            else:
+                self.rejected += 1
+                future.set_result({"ok": False, "error": "Error al guardar el registro"})
+            self._slots.release()
@@ -0,0 +1,409 @@
+"""
+Migraciones versionadas del esquema de produccion.db.
+
+Cada migración tiene un número correlativo y se aplica una sola vez; la
+versión aplicada se guarda en `PRAGMA user_version`. Para modificar el
+esquema se agrega una nueva entrada al final de MIGRATIONS, nunca se edita
+una migración ya publicada. Cada paso es una sentencia SQL o una función
+que recibe la conexión, para los pasos que dependen de la versión de SQLite.
+"""
+import sqlite3
+
+from models.range_filters import DATE_RANGE_COLUMNS
+
+# Columnas indexadas en ambas tablas (filtros de MainScreen y ordenamiento)
+INDEXED_COLUMNS = [
+    "of", "fecha", "codcal", "bobina_num", "created_at",
+    "ancho", "diametro", "gramaje", "peso",
+]
+
+
+def _index_statements(table):
+    """Genera los índices simples y compuestos de una tabla de bobinas."""
+    statements = [
+        f"CREATE INDEX IF NOT EXISTS idx_{table}_{column} ON {table} ({column})"
+        for column in INDEXED_COLUMNS
+    ]
+    # Combinación habitual: misma OF y fecha del día
+    statements.append(
+        f"CREATE INDEX IF NOT EXISTS idx_{table}_of_fecha ON {table} (of, fecha)"
+    )
+    return statements
+
+
+# Entradas del registro de cambios que se conservan (las más antiguas se purgan)
+CHANGE_LOG_RETENTION = 10000
+
+# Columnas de texto cubiertas por el índice FTS5 de subcadenas. Las fechas no
+# se indexan: sus trigramas se repiten en casi todas las filas y encarecen cada
+# alta; las búsquedas por fecha usan los índices de fecha y de epoch.
+FTS_COLUMNS = ["of", "codcal", "desccal", "bobina_num"]
+# Columnas del índice creado por la migración 3 (reemplazado en la 7)
+_FTS_COLUMNS_V3 = ["of", "fecha", "codcal", "desccal", "bobina_num", "created_at"]
+# Tabla de índices FTS5 con la carga masiva en curso (ver DatabaseManager.add_bobinas_bulk)
+FTS_DEFERRED_TABLE = "fts_deferred"
+
+
+def fts_available(conn):
+    """Indica si el SQLite enlazado soporta FTS5 con el tokenizador trigram."""
+    try:
+        conn.execute(
+            "CREATE VIRTUAL TABLE temp._fts_probe USING fts5(x, tokenize='trigram')"
+        )
+        conn.execute("DROP TABLE temp._fts_probe")
+        return True
+    except sqlite3.Error:
+        return False
+
+
+def _create_fts_index(table, key, fts_columns=FTS_COLUMNS, deferrable=False):
+    """
+    Devuelve el paso que crea el índice FTS5 `<table>_fts` sobre `fts_columns`.
+
+    El índice es de contenido externo (no duplica los datos) y se mantiene
+    sincronizado con triggers de inserción, borrado y actualización. Con
+    `deferrable`, los triggers no actúan mientras el índice figura en
+    FTS_DEFERRED_TABLE: una carga masiva lo reconstruye una sola vez al final.
+    """
+    columns = ", ".join(fts_columns)
+    new_values = ", ".join(f"new.{column}" for column in fts_columns)
+    old_values = ", ".join(f"old.{column}" for column in fts_columns)
+    fts = f"{table}_fts"
+    when = (
+        f" WHEN NOT EXISTS (SELECT 1 FROM {FTS_DEFERRED_TABLE} WHERE name = '{fts}')"
+        if deferrable else ""
+    )
+
+    def step(conn):
+        if not fts_available(conn):
+            print(f"FTS5/trigram no disponible: se omite el índice {fts}")
+            return
+        conn.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+            f"{columns}, content='{table}', content_rowid='{key}', tokenize='trigram')"
+        )
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table}{when} BEGIN
+                INSERT INTO {fts} (rowid, {columns}) VALUES (new.{key}, {new_values});
+            END
+        ''')
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table}{when} BEGIN
+                INSERT INTO {fts} ({fts}, rowid, {columns}) VALUES ('delete', old.{key}, {old_values});
+            END
+        ''')
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE ON {table}{when} BEGIN
+                INSERT INTO {fts} ({fts}, rowid, {columns}) VALUES ('delete', old.{key}, {old_values});
+                INSERT INTO {fts} (rowid, {columns}) VALUES (new.{key}, {new_values});
+            END
+        ''')
+        # Indexar las filas existentes
+        conn.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
+
+    return step
+
+
+def _drop_fts_index(table):
+    """Devuelve el paso que elimina el índice FTS5 `<table>_fts` y sus triggers."""
+    fts = f"{table}_fts"
+
+    def step(conn):
+        for suffix in ["ai", "ad", "au"]:
+            conn.execute(f"DROP TRIGGER IF EXISTS {fts}_{suffix}")
+        conn.execute(f"DROP TABLE IF EXISTS {fts}")
+
+    return step
+
+
+# Claves del resumen de producción: día, turno, OF y calidad
+ROLLUP_KEYS = ["fecha", "turno", "of", "codcal"]
+
+# Expresión de cada clave del resumen a partir de una fila de bobina
+# (los nulos se guardan como "" para que formen parte de la clave primaria)
+_ROLLUP_EXPRESSIONS = {
+    "fecha": "substr({row}.fecha, 1, 10)",
+    "turno": "{row}.turno",
+    "of": "{row}.of",
+    "codcal": "COALESCE({row}.codcal, '')",
+}
+
+
+def _rollup_condition(row):
+    """Condición que localiza la fila del resumen que corresponde a `row`."""
+    return " AND ".join(
+        f"{key} = {_ROLLUP_EXPRESSIONS[key].format(row=row)}" for key in ROLLUP_KEYS
+    )
+
+
+def _rollup_triggers(table):
+    """
+    Genera los triggers que mantienen bobina_rollup al día con `table`.
+
+    Un alta suma la fila a su grupo y una baja la resta (borrando el grupo
+    cuando queda vacío); una modificación resta los valores anteriores y
+    suma los nuevos. Como bobina y bobina_h tienen sus propios triggers, al
+    mover registros al histórico los totales se conservan.
+    """
+    keys = ", ".join(ROLLUP_KEYS)
+    new_keys = ", ".join(_ROLLUP_EXPRESSIONS[key].format(row="new") for key in ROLLUP_KEYS)
+    add = f'''
+                INSERT INTO bobina_rollup ({keys}, cantidad, peso_total)
+                VALUES ({new_keys}, 1, new.peso)
+                ON CONFLICT ({keys}) DO UPDATE SET
+                    cantidad = cantidad + 1,
+                    peso_total = peso_total + excluded.peso_total;'''
+    subtract = f'''
+                UPDATE bobina_rollup
+                SET cantidad = cantidad - 1, peso_total = peso_total - old.peso
+                WHERE {_rollup_condition("old")};
+                DELETE FROM bobina_rollup WHERE {_rollup_condition("old")} AND cantidad <= 0;'''
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS {table}_rollup_ai AFTER INSERT ON {table} BEGIN{add}\n            END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_rollup_ad AFTER DELETE ON {table} BEGIN{subtract}\n            END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_rollup_au "
+        f"AFTER UPDATE OF fecha, turno, of, codcal, peso ON {table} BEGIN{subtract}{add}\n            END",
+    ]
+
+
+def rollup_aggregate_query(source, condition="1"):
+    """Consulta que agrupa las filas de `source` con las claves y totales del resumen."""
+    row_keys = ", ".join(_ROLLUP_EXPRESSIONS[key].format(row="t") for key in ROLLUP_KEYS)
+    return (
+        f"SELECT {row_keys}, COUNT(*), SUM(t.peso) FROM {source} AS t "
+        f"WHERE {condition} GROUP BY 1, 2, 3, 4"
+    )
+
+
+# Suma totales ya agrupados (claves, cantidad, peso_total) a bobina_rollup
+ROLLUP_UPSERT = (
+    f"INSERT INTO bobina_rollup ({', '.join(ROLLUP_KEYS)}, cantidad, peso_total) "
+    f"VALUES (?, ?, ?, ?, ?, ?) "
+    f"ON CONFLICT ({', '.join(ROLLUP_KEYS)}) DO UPDATE SET "
+    f"cantidad = cantidad + excluded.cantidad, peso_total = peso_total + excluded.peso_total"
+)
+
+
+def rollup_add_statement(source, condition="1"):
+    """Sentencia que suma a bobina_rollup las filas de `source` que cumplen `condition`."""
+    return (
+        f"INSERT INTO bobina_rollup ({', '.join(ROLLUP_KEYS)}, cantidad, peso_total) "
+        f"{rollup_aggregate_query(source, condition)} "
+        f"ON CONFLICT ({', '.join(ROLLUP_KEYS)}) DO UPDATE SET "
+        f"cantidad = cantidad + excluded.cantidad, peso_total = peso_total + excluded.peso_total"
+    )
+
+
+def rollup_rebuild_statements():
+    """Sentencias que recalculan bobina_rollup desde bobina y bobina_h."""
+    keys = ", ".join(ROLLUP_KEYS)
+    row_keys = ", ".join(
+        f"{_ROLLUP_EXPRESSIONS[key].format(row='t')} AS {key}" for key in ROLLUP_KEYS
+    )
+    return [
+        "DELETE FROM bobina_rollup",
+        f'''
+        INSERT INTO bobina_rollup ({keys}, cantidad, peso_total)
+        SELECT {keys}, COUNT(*), SUM(peso)
+        FROM (
+            SELECT {row_keys}, t.peso FROM bobina AS t
+            UNION ALL
+            SELECT {row_keys}, t.peso FROM bobina_h AS t
+        )
+        GROUP BY {keys}
+        ''',
+    ]
+
+
+# Fecha de texto (AAAA-MM-DD[ HH:MM[:SS]]) como segundos desde 1970, sin zona
+# horaria; NULL si el texto no tiene ese formato
+EPOCH_EXPRESSION = "CAST(strftime('%s', {column}) AS INTEGER)"
+
+
+def _epoch_columns(table):
+    """
+    Genera las columnas epoch de las fechas de una tabla y sus índices.
+
+    Son columnas generadas virtuales (SQLite 3.31 o posterior): no ocupan
+    espacio en la tabla, se calculan al insertar o modificar la fecha y
+    solo se guardan en el índice, que permite filtrar por rango.
+    """
+    statements = []
+    for column, epoch_column in DATE_RANGE_COLUMNS.items():
+        expression = EPOCH_EXPRESSION.format(column=column)
+        statements.append(
+            f"ALTER TABLE {table} ADD COLUMN {epoch_column} INTEGER "
+            f"GENERATED ALWAYS AS ({expression}) VIRTUAL"
+        )
+        statements.append(
+            f"CREATE INDEX IF NOT EXISTS idx_{table}_{epoch_column} ON {table} ({epoch_column})"
+        )
+    return statements
+
+
+MIGRATIONS = [
+    (
+        1,
+        "Tablas bobina y bobina_h",
+        [
+            '''
+            CREATE TABLE IF NOT EXISTS bobina (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                turno TEXT NOT NULL,
+                ancho REAL NOT NULL,
+                diametro REAL NOT NULL,
+                gramaje REAL NOT NULL,
+                peso REAL NOT NULL,
+                bobina_num TEXT NOT NULL,
+                sec TEXT,
+                of TEXT NOT NULL,
+                fecha TEXT NOT NULL,
+                codcal TEXT,
+                desccal TEXT,
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP
+            )
+            ''',
+            '''
+            CREATE TABLE IF NOT EXISTS bobina_h (
+                id INTEGER PRIMARY KEY,
+                turno TEXT NOT NULL,
+                ancho REAL NOT NULL,
+                diametro REAL NOT NULL,
+                gramaje REAL NOT NULL,
+                peso REAL NOT NULL,
+                bobina_num TEXT NOT NULL,
+                sec TEXT,
+                of TEXT NOT NULL,
+                fecha TEXT NOT NULL,
+                codcal TEXT,
+                desccal TEXT,
+                created_at TEXT,
+                fecha_insercion TEXT DEFAULT CURRENT_TIMESTAMP
+            )
+            ''',
+        ],
+    ),
+    (
+        2,
+        "Índices de filtrado y ordenamiento",
+        _index_statements("bobina") + _index_statements("bobina_h") + ["ANALYZE"],
+    ),
+    (
+        3,
+        "Índices FTS5 trigram para búsquedas por subcadena",
+        [
+            _create_fts_index("bobina", "id", _FTS_COLUMNS_V3),
+            _create_fts_index("bobina_h", "id", _FTS_COLUMNS_V3),
+        ],
+    ),
+    (
+        4,
+        "Registro de cambios de bobina para refresco incremental",
+        [
+            '''
+            CREATE TABLE IF NOT EXISTS bobina_changes (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                bobina_id INTEGER NOT NULL,
+                op TEXT NOT NULL
+            )
+            ''',
+            '''
+            CREATE TRIGGER IF NOT EXISTS bobina_changes_ai AFTER INSERT ON bobina BEGIN
+                INSERT INTO bobina_changes (bobina_id, op) VALUES (new.id, 'I');
+            END
+            ''',
+            '''
+            CREATE TRIGGER IF NOT EXISTS bobina_changes_ad AFTER DELETE ON bobina BEGIN
+                INSERT INTO bobina_changes (bobina_id, op) VALUES (old.id, 'D');
+            END
+            ''',
+            '''
+            CREATE TRIGGER IF NOT EXISTS bobina_changes_au AFTER UPDATE ON bobina BEGIN
+                INSERT INTO bobina_changes (bobina_id, op) VALUES (new.id, 'U');
+            END
+            ''',
+            # Purga automática: solo se conservan las últimas entradas
+            f'''
+            CREATE TRIGGER IF NOT EXISTS bobina_changes_prune AFTER INSERT ON bobina_changes
+            WHEN new.seq % 1000 = 0 BEGIN
+                DELETE FROM bobina_changes WHERE seq <= new.seq - {CHANGE_LOG_RETENTION};
+            END
+            ''',
+        ],
+    ),
+    (
+        5,
+        "Resumen de producción por día, turno, OF y calidad",
+        [
+            '''
+            CREATE TABLE IF NOT EXISTS bobina_rollup (
+                fecha TEXT NOT NULL,
+                turno TEXT NOT NULL,
+                of TEXT NOT NULL,
+                codcal TEXT NOT NULL,
+                cantidad INTEGER NOT NULL,
+                peso_total REAL NOT NULL,
+                PRIMARY KEY (fecha, turno, of, codcal)
+            ) WITHOUT ROWID
+            ''',
+        ]
+        + _rollup_triggers("bobina")
+        + _rollup_triggers("bobina_h")
+        + rollup_rebuild_statements(),
+    ),
+    (
+        6,
+        "Fechas normalizadas (epoch) para filtros por rango",
+        _epoch_columns("bobina") + _epoch_columns("bobina_h") + ["ANALYZE"],
+    ),
+    (
+        7,
+        "Índices FTS5 sin fechas y con carga masiva diferida",
+        [
+            f"CREATE TABLE IF NOT EXISTS {FTS_DEFERRED_TABLE} (name TEXT PRIMARY KEY)",
+            _drop_fts_index("bobina"),
+            _drop_fts_index("bobina_h"),
+            _create_fts_index("bobina", "id", deferrable=True),
+            _create_fts_index("bobina_h", "id", deferrable=True),
+        ],
+    ),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn):
+    """Devuelve la versión de esquema guardada en la base de datos."""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def apply_migrations(pool):
+    """
+    Aplica las migraciones pendientes, cada una en su propia transacción.
+
+    Args:
+        pool (ConnectionPool): Pool de conexiones de la base de datos
+
+    Returns:
+        list: Números de las migraciones aplicadas (vacía si el esquema está al día)
+    """
+    applied = []
+    with pool.reader() as conn:
+        current = get_schema_version(conn)
+    if current >= LATEST_VERSION:
+        return applied
+
+    for version, description, statements in MIGRATIONS:
+        if version <= current:
+            continue
+        with pool.writer() as conn:
+            for statement in statements:
+                if callable(statement):
+                    statement(conn)
+                else:
+                    conn.execute(statement)
+            # user_version forma parte de la misma transacción
+            conn.execute(f"PRAGMA user_version = {int(version)}")
+        print(f"Migración {version} aplicada: {description}")
+        applied.append(version)
+    return applied
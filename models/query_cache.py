@@ -0,0 +1,95 @@
+import threading
+from collections import OrderedDict
+
+
+class QueryCache:
+    """
+    Caché LRU acotada para resultados de consultas.
+
+    Cada consulta se guarda junto con un token de versión de los datos; cuando
+    el token cambia (hubo una escritura) toda la caché se descarta.
+    """
+
+    def __init__(self, maxsize=32):
+        """
+        Inicializa la caché.
+
+        Args:
+            maxsize (int): Número máximo de resultados guardados
+        """
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._token = None
+        self._lock = threading.Lock()
+
+        # Contadores para dimensionar la caché
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key, token):
+        """
+        Busca un resultado en la caché.
+
+        Args:
+            key (tuple): Clave normalizada de la consulta
+            token (tuple): Versión actual de los datos
+
+        Returns:
+            tuple: (True, resultado) si está en caché, (False, None) si no
+        """
+        with self._lock:
+            self._check_token(token)
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, self._entries[key]
+            self.misses += 1
+            return False, None
+
+    def put(self, key, token, value):
+        """
+        Guarda un resultado obtenido con la versión de datos `token`.
+
+        Args:
+            key (tuple): Clave normalizada de la consulta
+            token (tuple): Versión de los datos leída antes de ejecutar la consulta
+            value: Resultado a guardar
+        """
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            # Si hubo una escritura mientras se consultaba, el resultado ya no vale
+            if token != self._token:
+                return
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Descarta todos los resultados guardados."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Devuelve los contadores de uso de la caché."""
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def _check_token(self, token):
+        """Vacía la caché si la versión de los datos cambió."""
+        if token != self._token:
+            if self._entries:
+                self.invalidations += 1
+                self._entries.clear()
+            self._token = token
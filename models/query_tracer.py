@@ -0,0 +1,244 @@
+"""
+Trazado de consultas y registro de consultas lentas.
+
+QueryTracer envuelve los métodos públicos de un DatabaseManager para medir
+su duración y las filas que devuelven, y usa sqlite3.set_trace_callback
+para saber qué sentencias SQL ejecutó cada llamada. Las llamadas que
+superan el umbral se escriben en un archivo de registro rotativo, una línea
+JSON por llamada.
+
+Los métodos se envuelven solo mientras el trazado está activo: al
+desactivarlo se restauran los originales y se quitan los callbacks, de
+modo que sin trazado no hay ningún coste adicional.
+"""
+import functools
+import inspect
+import json
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+# Sentencias guardadas por llamada en el registro de consultas lentas
+MAX_LOGGED_STATEMENTS = 20
+MAX_STATEMENT_LENGTH = 500
+
+
+class _MethodStats:
+    """Duraciones recientes y totales de un método."""
+
+    def __init__(self, window):
+        self.latencies = deque(maxlen=window)
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.max_ms = 0.0
+
+    def add(self, elapsed_ms, rows, failed):
+        self.latencies.append(elapsed_ms)
+        self.calls += 1
+        self.rows += rows or 0
+        self.errors += failed
+        self.max_ms = max(self.max_ms, elapsed_ms)
+
+
+class QueryTracer:
+    """Mide los métodos de un DatabaseManager y registra las llamadas lentas."""
+
+    def __init__(self, slow_threshold_ms=200.0, log_path=None, max_bytes=1024 * 1024,
+                 backup_count=3, window=1000):
+        """
+        Inicializa el trazador.
+
+        Args:
+            slow_threshold_ms (float): Duración a partir de la cual una llamada
+                se escribe en el registro de consultas lentas
+            log_path (str): Archivo del registro; si es None no se escribe
+            max_bytes (int): Tamaño a partir del cual se rota el archivo
+            backup_count (int): Archivos rotados que se conservan
+            window (int): Duraciones recientes por método usadas para los percentiles
+        """
+        self.slow_threshold_ms = slow_threshold_ms
+        self.log_path = log_path
+        self.window = window
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+        self._local = threading.local()
+        self._originals = {}
+        self.slow_calls = 0
+
+        self._logger = None
+        if log_path:
+            self._logger = logging.Logger("slow_queries")
+            handler = RotatingFileHandler(
+                log_path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+            )
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self._logger.addHandler(handler)
+
+    # Callback de SQLite
+
+    def trace_statement(self, statement):
+        """Callback de set_trace_callback: anota la sentencia en la llamada en curso."""
+        calls = getattr(self._local, "calls", None)
+        if calls:
+            calls[-1]["statements"].append(statement)
+
+    # Instrumentación
+
+    def instrument(self, target, names):
+        """
+        Reemplaza métodos de un objeto por versiones medidas.
+
+        Args:
+            target (object): Instancia cuyos métodos se miden
+            names (iterable): Nombres de los métodos
+        """
+        for name in names:
+            method = getattr(target, name)
+            self._originals[name] = method
+            setattr(target, name, self._wrap(name, method))
+
+    def restore(self, target):
+        """Devuelve a un objeto sus métodos originales."""
+        for name in self._originals:
+            # Los envoltorios son atributos de la instancia: al quitarlos
+            # vuelven a verse los métodos de la clase
+            target.__dict__.pop(name, None)
+        self._originals = {}
+
+    def _wrap(self, name, method):
+        """Crea el envoltorio medido de un método."""
+        if inspect.isgeneratorfunction(method):
+            @functools.wraps(method)
+            def traced_generator(*args, **kwargs):
+                call = self._begin()
+                rows = 0
+                failed = False
+                try:
+                    for row in method(*args, **kwargs):
+                        rows += 1
+                        yield row
+                except BaseException:
+                    failed = True
+                    raise
+                finally:
+                    self._end(name, call, rows, failed)
+            return traced_generator
+
+        @functools.wraps(method)
+        def traced(*args, **kwargs):
+            call = self._begin()
+            result = None
+            failed = False
+            try:
+                result = method(*args, **kwargs)
+                return result
+            except BaseException:
+                failed = True
+                raise
+            finally:
+                self._end(name, call, _row_count(result), failed)
+        return traced
+
+    def _begin(self):
+        """Abre el registro de una llamada en el hilo actual."""
+        calls = getattr(self._local, "calls", None)
+        if calls is None:
+            calls = self._local.calls = []
+        call = {"start": time.perf_counter(), "statements": []}
+        calls.append(call)
+        return call
+
+    def _end(self, name, call, rows, failed):
+        """Cierra el registro de una llamada y actualiza las estadísticas."""
+        elapsed_ms = (time.perf_counter() - call["start"]) * 1000
+        calls = self._local.calls
+        calls.remove(call)
+        # Las sentencias de una llamada anidada también son de la exterior
+        if calls:
+            calls[-1]["statements"].extend(call["statements"])
+
+        with self._stats_lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = self._stats[name] = _MethodStats(self.window)
+            stats.add(elapsed_ms, rows, failed)
+
+        if elapsed_ms >= self.slow_threshold_ms:
+            self.slow_calls += 1
+            if self._logger is not None:
+                self._log_slow(name, elapsed_ms, rows, failed, call["statements"])
+
+    def _log_slow(self, name, elapsed_ms, rows, failed, statements):
+        """Escribe una llamada lenta en el registro rotativo."""
+        entry = {
+            "time": datetime.now().isoformat(timespec="milliseconds"),
+            "method": name,
+            "ms": round(elapsed_ms, 3),
+            "rows": rows,
+            "error": failed,
+            "thread": threading.current_thread().name,
+            "statements": [
+                statement[:MAX_STATEMENT_LENGTH]
+                for statement in statements[:MAX_LOGGED_STATEMENTS]
+            ],
+            "statement_count": len(statements),
+        }
+        self._logger.warning(json.dumps(entry, ensure_ascii=False))
+
+    # Resultados
+
+    def stats(self):
+        """
+        Devuelve las estadísticas por método.
+
+        Returns:
+            dict: Por método: llamadas, errores, filas devueltas y duraciones
+            (p50, p95, p99 de las llamadas recientes y máxima) en milisegundos
+        """
+        result = {}
+        with self._stats_lock:
+            for name, stats in self._stats.items():
+                latencies = sorted(stats.latencies)
+                result[name] = {
+                    "calls": stats.calls,
+                    "errors": stats.errors,
+                    "rows": stats.rows,
+                    "p50_ms": _percentile(latencies, 50),
+                    "p95_ms": _percentile(latencies, 95),
+                    "p99_ms": _percentile(latencies, 99),
+                    "max_ms": round(stats.max_ms, 3),
+                }
+        return result
+
+    def reset(self):
+        """Descarta las estadísticas acumuladas."""
+        with self._stats_lock:
+            self._stats = {}
+        self.slow_calls = 0
+
+    def close(self):
+        """Cierra el archivo del registro de consultas lentas."""
+        if self._logger is not None:
+            for handler in list(self._logger.handlers):
+                handler.close()
+                self._logger.removeHandler(handler)
+
+
+def _row_count(result):
+    """Filas devueltas por un método: longitud del resultado, o None si no aplica."""
+    try:
+        return len(result)
+    except TypeError:
+        return None
+
+
+def _percentile(sorted_values, p):
+    """Percentil (por rango más cercano) de una lista ordenada, en milisegundos."""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(p / 100 * len(sorted_values)) - 1))
+    return round(sorted_values[index], 3)
@@ -0,0 +1,111 @@
+"""
+Filtros por rango sobre columnas numéricas y fechas.
+
+Además de los criterios por columna, los filtros admiten claves con sufijo:
+
+- <columna>_min / <columna>_max para ancho, diametro, gramaje y peso
+  (ambos límites incluidos);
+- <columna>_desde / <columna>_hasta para fecha y created_at, con una fecha
+  (AAAA-MM-DD) o fecha y hora (AAAA-MM-DD HH:MM[:SS]). El límite "hasta"
+  incluye el día (o el minuto o segundo) indicado completo.
+
+Las fechas se comparan como segundos desde 1970 sin zona horaria, igual
+que `strftime('%s', fecha)` de SQLite, sobre las columnas fecha_ts y
+created_ts que agrega la migración 6. Los valores de fecha que no siguen
+el formato AAAA-MM-DD no tienen equivalente y no cumplen ningún rango.
+"""
+import calendar
+from datetime import datetime, timedelta
+
+# Columnas numéricas con filtro por rango
+NUMERIC_RANGE_COLUMNS = ["ancho", "diametro", "gramaje", "peso"]
+
+# Columnas de fecha con filtro por rango y su columna normalizada (epoch)
+DATE_RANGE_COLUMNS = {"fecha": "fecha_ts", "created_at": "created_ts"}
+
+# Sufijo de la clave de filtro -> operador SQL
+RANGE_SUFFIXES = {"_min": ">=", "_max": "<=", "_desde": ">=", "_hasta": "<"}
+
+
+def split_range_key(key):
+    """
+    Separa una clave de filtro por rango en columna y sufijo.
+
+    Args:
+        key (str): Clave del diccionario de filtros (por ejemplo "peso_min")
+
+    Returns:
+        tuple: (columna, sufijo), o None si la clave no es de rango
+    """
+    for suffix in RANGE_SUFFIXES:
+        if key.endswith(suffix):
+            column = key[:-len(suffix)]
+            numeric = suffix in ("_min", "_max") and column in NUMERIC_RANGE_COLUMNS
+            date = suffix in ("_desde", "_hasta") and column in DATE_RANGE_COLUMNS
+            if numeric or date:
+                return column, suffix
+    return None
+
+
+def parse_datetime(value):
+    """
+    Interpreta una fecha o fecha y hora en formato AAAA-MM-DD[ HH:MM[:SS]].
+
+    Returns:
+        tuple: (datetime, duración del período indicado: día, minuto o
+        segundo), o None si el valor no tiene ese formato
+    """
+    text = str(value).strip().replace("T", " ")
+    for pattern, period in (
+        ("%Y-%m-%d %H:%M:%S.%f", timedelta(seconds=1)),
+        ("%Y-%m-%d %H:%M:%S", timedelta(seconds=1)),
+        ("%Y-%m-%d %H:%M", timedelta(minutes=1)),
+        ("%Y-%m-%d", timedelta(days=1)),
+    ):
+        try:
+            return datetime.strptime(text, pattern), period
+        except ValueError:
+            continue
+    return None
+
+
+def to_epoch(moment):
+    """Segundos desde 1970 de una fecha sin zona horaria (como strftime('%s'))."""
+    return calendar.timegm(moment.timetuple())
+
+
+def range_bound(column, suffix, value):
+    """
+    Convierte el valor de un filtro por rango en un límite comparable.
+
+    Args:
+        column (str): Columna filtrada
+        suffix (str): Sufijo de la clave (_min, _max, _desde o _hasta)
+        value: Valor ingresado
+
+    Returns:
+        tuple: (operador SQL, límite), con el límite en la unidad de la
+        columna (número o epoch), o None si el valor no es válido
+    """
+    if column in NUMERIC_RANGE_COLUMNS:
+        try:
+            return RANGE_SUFFIXES[suffix], float(value)
+        except (TypeError, ValueError):
+            return None
+
+    parsed = parse_datetime(value)
+    if parsed is None:
+        return None
+    moment, period = parsed
+    if suffix == "_hasta":
+        # Límite superior exclusivo: el período indicado entra completo
+        moment += period
+    return RANGE_SUFFIXES[suffix], to_epoch(moment)
+
+
+def epoch_of(text):
+    """Epoch de un valor de fecha guardado, o None si no tiene formato AAAA-MM-DD."""
+    parsed = parse_datetime(text) if text else None
+    if parsed is None:
+        return None
+    return to_epoch(parsed[0])
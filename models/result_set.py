@@ -0,0 +1,153 @@
+from array import array
+
+# Columnas de bobina en el orden en que se leen de la base de datos
+RESULT_COLUMNS = [
+    "id", "turno", "ancho", "diametro", "gramaje", "peso", "bobina_num",
+    "sec", "of", "fecha", "codcal", "desccal", "created_at",
+]
+
+# Tipo de cada columna numérica en su array compacto
+ARRAY_COLUMNS = {
+    "id": "q",
+    "ancho": "d",
+    "diametro": "d",
+    "gramaje": "d",
+    "peso": "d",
+}
+
+# Columnas de texto con muchos valores repetidos: se guarda una sola copia de cada valor
+SHARED_COLUMNS = ["turno", "sec", "of", "fecha", "codcal", "desccal"]
+
+
+class BobinaRow:
+    """
+    Vista de una fila de un BobinaResultSet.
+
+    Se usa como un diccionario de solo lectura (row["peso"], row.get("sec"),
+    dict(row)) sin copiar los valores de las columnas.
+    """
+
+    __slots__ = ("_result", "_index")
+
+    def __init__(self, result, index):
+        self._result = result
+        self._index = index
+
+    def __getitem__(self, column):
+        return self._result._columns[column][self._index]
+
+    def get(self, column, default=None):
+        """Devuelve el valor de la columna, o `default` si no existe."""
+        if column not in self._result._columns:
+            return default
+        return self[column]
+
+    def keys(self):
+        """Devuelve los nombres de las columnas."""
+        return list(RESULT_COLUMNS)
+
+    def text(self, column):
+        """Devuelve el valor de la columna como texto para mostrar ("" si es nulo)."""
+        value = self[column]
+        return "" if value is None else str(value)
+
+    def to_dict(self):
+        """Devuelve una copia de la fila como diccionario."""
+        return {column: self[column] for column in RESULT_COLUMNS}
+
+    def __repr__(self):
+        return f"BobinaRow({self.to_dict()!r})"
+
+
+class BobinaResultSet:
+    """
+    Resultado de una consulta de bobinas almacenado por columnas.
+
+    Los IDs y las columnas numéricas se guardan en arrays de tipo fijo y los
+    textos repetidos (turno, OF, fecha, calidad...) se comparten entre filas,
+    en lugar de crear un diccionario con 13 claves por fila. El resultado es de
+    solo lectura; se recorre como una lista de filas (BobinaRow).
+    """
+
+    __slots__ = ("_columns", "_shared", "_length")
+
+    def __init__(self, rows=()):
+        """
+        Inicializa el resultado.
+
+        Args:
+            rows (iterable): Tuplas con los valores en el orden de RESULT_COLUMNS
+        """
+        self._columns = {
+            column: array(ARRAY_COLUMNS[column]) if column in ARRAY_COLUMNS else []
+            for column in RESULT_COLUMNS
+        }
+        self._shared = {}
+        self._length = 0
+        self.extend(rows)
+
+    @classmethod
+    def from_cursor(cls, cursor, batch_size=1000):
+        """
+        Construye el resultado leyendo un cursor por lotes.
+
+        Args:
+            cursor (sqlite3.Cursor): Cursor ejecutado con las columnas de RESULT_COLUMNS
+            batch_size (int): Número de filas leídas por lote
+        """
+        result = cls()
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            result.extend(rows)
+        return result
+
+    def extend(self, rows):
+        """Agrega filas (tuplas en el orden de RESULT_COLUMNS) al final del resultado."""
+        rows = list(rows)
+        if not rows:
+            return
+        shared = self._shared
+        # Transponer el lote y agregar columna por columna
+        for column, values in zip(RESULT_COLUMNS, zip(*rows)):
+            if column in SHARED_COLUMNS:
+                values = [shared.setdefault(value, value) for value in values]
+            try:
+                self._columns[column].extend(values)
+            except TypeError:
+                # Valor nulo en una columna numérica: pasar la columna a lista,
+                # descartando lo que el array alcanzó a agregar de este lote
+                self._columns[column] = list(self._columns[column][:self._length])
+                self._columns[column].extend(values)
+        self._length += len(rows)
+
+    def column(self, name):
+        """Devuelve todos los valores de una columna (array o lista)."""
+        return self._columns[name]
+
+    def to_dicts(self):
+        """Devuelve el resultado como lista de diccionarios."""
+        return [row.to_dict() for row in self]
+
+    def __len__(self):
+        return self._length
+
+    def __bool__(self):
+        return self._length > 0
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [BobinaRow(self, i) for i in range(*index.indices(self._length))]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("índice fuera de rango")
+        return BobinaRow(self, index)
+
+    def __iter__(self):
+        for index in range(self._length):
+            yield BobinaRow(self, index)
+
+    def __repr__(self):
+        return f"BobinaResultSet({self._length} filas)"
@@ -0,0 +1,93 @@
+"""
+Selección de bobinas de la tabla principal.
+
+Una selección es un conjunto de IDs marcados a mano o bien "todas las
+bobinas que cumplen los filtros, salvo estas". En el segundo modo la
+selección no enumera los IDs: DatabaseManager la traduce al predicado SQL
+de los filtros (ver DatabaseManager._stage_ids), de modo que exportar,
+eliminar o archivar 200 000 registros no requiere cargarlos ni dibujar sus
+casillas.
+
+Para que las bobinas que lleguen después de "seleccionar todo" no queden
+seleccionadas sin que el usuario las vea, el modo guarda también el
+último ID existente en ese momento.
+"""
+
+
+class Selection:
+    """Selección por IDs o por filtros con excepciones, con consulta de pertenencia O(1)."""
+
+    def __init__(self):
+        """Inicializa una selección vacía."""
+        self.ids = set()
+        self.all_matching = False
+        self.filters = {}
+        self.excluded = set()
+        self.max_id = None
+
+    def is_selected(self, bobina_id):
+        """Indica si la bobina con el ID dado está seleccionada."""
+        if self.all_matching:
+            return bobina_id <= self.max_id and bobina_id not in self.excluded
+        return bobina_id in self.ids
+
+    def set(self, bobina_id, selected):
+        """
+        Marca o desmarca una bobina.
+
+        Args:
+            bobina_id (int): ID de la bobina
+            selected (bool): True para seleccionarla, False para quitarla
+        """
+        if self.all_matching:
+            if selected:
+                self.excluded.discard(bobina_id)
+            else:
+                self.excluded.add(bobina_id)
+        elif selected:
+            self.ids.add(bobina_id)
+        else:
+            self.ids.discard(bobina_id)
+
+    def discard(self, bobina_ids):
+        """Quita de la selección bobinas que ya no existen (por ejemplo, eliminadas)."""
+        self.ids.difference_update(bobina_ids)
+        self.excluded.difference_update(bobina_ids)
+
+    def select_all(self, filters, max_id):
+        """
+        Selecciona todas las bobinas que cumplen los filtros.
+
+        Args:
+            filters (dict): Filtros de la tabla (mismo formato que filter_bobinas)
+            max_id (int): Último ID de bobina existente; las posteriores no
+                quedan seleccionadas
+        """
+        self.ids = set()
+        self.all_matching = True
+        self.filters = dict(filters or {})
+        self.excluded = set()
+        self.max_id = max_id
+
+    def clear(self):
+        """Vacía la selección."""
+        self.__init__()
+
+    def is_empty(self):
+        """
+        Indica si no hay nada seleccionado.
+
+        En el modo por filtros la selección no se considera vacía aunque no
+        haya coincidencias: contarlas requiere una consulta (count_selection).
+        """
+        return not self.all_matching and not self.ids
+
+    def copy(self):
+        """Devuelve una copia independiente (para operaciones en segundo plano)."""
+        selection = Selection()
+        selection.ids = set(self.ids)
+        selection.all_matching = self.all_matching
+        selection.filters = dict(self.filters)
+        selection.excluded = set(self.excluded)
+        selection.max_id = self.max_id
+        return selection
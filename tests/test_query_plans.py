@@ -0,0 +1,124 @@
+"""
+Planes de ejecución de filter_bobinas para cada forma de filtro.
+
+Cada forma de filtro de MainScreen (y de filter_bobinas en general) debe
+resolverse con un índice o figurar en KNOWN_SCANS con el motivo por el que
+recorre la tabla. Si una consulta deja de usar su índice, o un recorrido
+conocido pasa a usar uno, la prueba falla y hay que revisar la lista.
+
+Se ejecuta desde la raíz del proyecto:
+
+    python -m unittest discover -s tests -t .
+"""
+import os
+import tempfile
+import unittest
+
+from benchmarks.generator import populate
+
+# Filas de la base de prueba (las estadísticas de ANALYZE guían al planificador)
+ROWS = 20000
+
+# Formas de filtro que se resuelven con un índice: filtros -> índice esperado
+INDEXED_SHAPES = {
+    "id": ({"id": "100"}, "INTEGER PRIMARY KEY"),
+    "of (3+ caracteres)": ({"of": "85510"}, "bobina_fts"),
+    "codcal (2 caracteres)": ({"codcal": "02"}, "idx_bobina_codcal"),
+    "codcal (3+ caracteres)": ({"codcal": "02x"}, "bobina_fts"),
+    "desccal (3+ caracteres)": ({"desccal": "cov"}, "bobina_fts"),
+    "bobina_num (3+ caracteres)": ({"bobina_num": "10000"}, "bobina_fts"),
+    "fecha (día)": ({"fecha": "2025-01-03"}, "idx_bobina_fecha"),
+    "fecha (día y hora)": ({"fecha": "2025-01-03 10"}, "idx_bobina_fecha"),
+    "created_at (día)": ({"created_at": "2025-01-03"}, "idx_bobina_created_at"),
+    "ancho": ({"ancho": "125"}, "idx_bobina_ancho"),
+    "diametro": ({"diametro": "110"}, "idx_bobina_diametro"),
+    "gramaje": ({"gramaje": "140"}, "idx_bobina_gramaje"),
+    "peso": ({"peso": "300"}, "idx_bobina_peso"),
+    "peso_min y peso_max": ({"peso_min": "300", "peso_max": "320"}, "idx_bobina_peso"),
+    "fecha_desde y fecha_hasta": (
+        {"fecha_desde": "2025-01-03", "fecha_hasta": "2025-01-03"}, "idx_bobina_fecha_ts"
+    ),
+    "of y fecha_desde": ({"of": "85510", "fecha_desde": "2025-01-03"}, "bobina_fts"),
+}
+
+# Formas de filtro que recorren la tabla, y por qué
+KNOWN_SCANS = {
+    # Sin filtros: se recorre por id para devolver las filas ya ordenadas
+    "sin filtros": {},
+    # Subcadenas de menos de 3 caracteres: el tokenizador trigram no las
+    # indexa y un índice B-tree no sirve para buscar en medio del texto
+    "of (2 caracteres)": {"of": "85"},
+    "desccal (2 caracteres)": {"desccal": "co"},
+    "bobina_num (2 caracteres)": {"bobina_num": "12"},
+    "fecha (2 caracteres)": {"fecha": "03"},
+    # Texto en medio de la fecha (hora, día sin año)
+    "fecha (hora)": {"fecha": "10:3"},
+    # Un año o un mes cubren demasiadas filas: ordenarlas por id cuesta más
+    # que recorrer la tabla hasta completar la página
+    "fecha (mes)": {"fecha": "2025-01"},
+    # turno no tiene índice: cuatro equipos, cada uno con una cuarta parte
+    # de las filas, y el recorrido por id completa la página enseguida
+    "turno": {"turno": "a"},
+    # sec toma pocos valores y no se filtra desde la interfaz
+    "sec": {"sec": "1"},
+    # Rangos abiertos: cubren buena parte de la tabla y el planificador
+    # prefiere recorrerla en el orden de id que pide la consulta
+    "peso_min": {"peso_min": "500"},
+    "fecha_desde": {"fecha_desde": "2025-01-20"},
+    "created_at_hasta": {"created_at_hasta": "2025-01-02"},
+}
+
+# Valores de 1 y 2 caracteres de codcal y turno (códigos completos, partes de
+# un código y valores sin coincidencias)
+SHORT_VALUES = {
+    "codcal": ["0", "2", "3", "6", "02", "06", "20", "a"],
+    "turno": ["a", "B", "d", "ab", "0"],
+}
+
+
+class QueryPlanTest(unittest.TestCase):
+    """Comprueba el plan de ejecución de cada forma de filtro."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Crea una base de datos temporal con filas generadas."""
+        cls.temp_dir = tempfile.TemporaryDirectory()
+        cls.db_manager = populate(os.path.join(cls.temp_dir.name, "plans.db"), ROWS)
+
+    @classmethod
+    def tearDownClass(cls):
+        """Cierra la base de datos y borra el directorio temporal."""
+        cls.db_manager.close()
+        cls.temp_dir.cleanup()
+
+    def test_indexed_shapes(self):
+        """Las formas indexadas usan su índice y no recorren la tabla."""
+        for name, (filters, index) in INDEXED_SHAPES.items():
+            with self.subTest(name):
+                plan = self.db_manager.explain_filter(filters)
+                self.assertTrue(any(index in detail for detail in plan), plan)
+                self.assertNotIn("SCAN bobina", plan)
+
+    def test_known_scans(self):
+        """Las formas de KNOWN_SCANS recorren la tabla."""
+        for name, filters in KNOWN_SCANS.items():
+            with self.subTest(name):
+                self.assertIn("SCAN bobina", self.db_manager.explain_filter(filters))
+
+    def test_short_values_keep_like_semantics(self):
+        """Los valores cortos de codcal y turno dan lo mismo que LOWER(col) LIKE '%v%'."""
+        for column, values in SHORT_VALUES.items():
+            for value in values:
+                with self.subTest(column=column, value=value):
+                    with self.db_manager.pool.reader() as conn:
+                        expected = conn.execute(
+                            f"SELECT COUNT(*) FROM bobina WHERE LOWER({column}) LIKE ?",
+                            (f"%{value}%",)
+                        ).fetchone()[0]
+                    self.assertEqual(
+                        len(self.db_manager.filter_bobinas({column: value})), expected
+                    )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,30 @@
+"""
+Crea una copia de seguridad en línea de produccion.db y del archivo histórico
+(particiones mensuales y archivos fríos) en data/backups.
+
+Pensado para ejecutarse desde el programador de tareas del sistema; la
+aplicación puede seguir escribiendo durante la copia.
+
+Uso: python -m utils.backup_database [ruta/a/produccion.db] [copias a conservar]
+"""
+import sys
+
+from models.database_manager import DatabaseManager
+
+db_manager = DatabaseManager(sys.argv[1] if len(sys.argv) > 1 else None)
+keep = int(sys.argv[2]) if len(sys.argv) > 2 else 7
+
+
+def show_progress(copied, total):
+    print(f"\rCopiando: {copied}/{total} páginas", end="", flush=True)
+
+
+try:
+    path = db_manager.backup(keep=keep, progress=show_progress)
+    print()
+    if path:
+        print(f"Copia de seguridad creada: {path}")
+    else:
+        sys.exit(1)
+finally:
+    db_manager.close()
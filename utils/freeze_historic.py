@@ -0,0 +1,24 @@
+"""
+Congela un rango del histórico en un archivo frío columnar comprimido.
+
+Uso: python -m utils.freeze_historic AAAA-MM-DD AAAA-MM-DD [lzma|zlib] [ruta/a/produccion.db]
+"""
+import sys
+
+from models.database_manager import DatabaseManager
+
+if len(sys.argv) < 3:
+    print(__doc__.strip())
+    sys.exit(2)
+
+fecha_desde, fecha_hasta = sys.argv[1], sys.argv[2]
+codec = sys.argv[3] if len(sys.argv) > 3 else "lzma"
+db_manager = DatabaseManager(sys.argv[4] if len(sys.argv) > 4 else None)
+try:
+    count = db_manager.freeze_historic(fecha_desde, fecha_hasta, codec)
+    print(f"Registros congelados: {count}")
+except ValueError as e:
+    print(f"Error: {e}")
+    sys.exit(1)
+finally:
+    db_manager.close()
@@ -0,0 +1,55 @@
+"""
+Servicio de ingesta de bobinas (sin interfaz).
+
+Uso:
+    python -m utils.ingest_daemon [--host 127.0.0.1] [--port 8765] [--unix RUTA]
+                                  [--flush-interval 0.2] [--batch-size 500] [--db RUTA]
+"""
+import argparse
+import asyncio
+import signal
+
+from models.database_manager import DatabaseManager
+from models.ingestion import IngestionServer
+
+
+async def run(args):
+    db_manager = DatabaseManager(args.db)
+    server = IngestionServer(
+        db_manager,
+        host=args.host,
+        port=args.port,
+        unix_path=args.unix,
+        flush_interval=args.flush_interval,
+        batch_size=args.batch_size,
+    )
+    # Detener de forma ordenada también con SIGTERM (no disponible en Windows)
+    try:
+        asyncio.get_running_loop().add_signal_handler(
+            signal.SIGTERM, asyncio.current_task().cancel
+        )
+    except (NotImplementedError, AttributeError):
+        pass
+
+    try:
+        await server.start()
+        print(f"Ingesta escuchando en {args.unix or f'{args.host}:{args.port}'}")
+        await server.serve_forever()
+    finally:
+        await server.close()
+        db_manager.close()
+        print(f"Ingesta detenida: {server.stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servicio de ingesta de bobinas")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", help="Ruta de un socket Unix (en lugar de TCP)")
+    parser.add_argument("--flush-interval", type=float, default=0.2)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--db", help="Ruta de la base de datos (por defecto data/produccion.db)")
+    try:
+        asyncio.run(run(parser.parse_args()))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
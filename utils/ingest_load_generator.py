@@ -0,0 +1,90 @@
+"""
+Generador de carga para el servicio de ingesta.
+
+Simula varias líneas de producción que envían registros de bobina en
+paralelo y mide el caudal y la latencia hasta la confirmación.
+
+Uso:
+    python -m utils.ingest_load_generator [--lines 4] [--records 2000] [--rate 0]
+                                          [--host 127.0.0.1] [--port 8765] [--unix RUTA]
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import datetime
+
+
+def make_record(line, number):
+    """Genera un registro de bobina verosímil para una línea."""
+    return {
+        "turno": random.choice("ABCD"),
+        "ancho": random.choice([100, 125, 150, 180]),
+        "diametro": random.choice([100, 120]),
+        "gramaje": random.choice([110, 130, 150]),
+        "peso": round(random.uniform(200, 900), 1),
+        "bobina_num": f"L{line}-{number}",
+        "sec": str(number % 10 + 1),
+        "of": str(85500 + line),
+        "fecha": datetime.now().strftime("%Y-%m-%d %H:%M"),
+        "codcal": random.choice(["01", "02", "03"]),
+        "desccal": "L.BLANCO",
+    }
+
+
+async def run_line(args, line, latencies):
+    """Envía los registros de una línea y espera cada confirmación."""
+    if args.unix:
+        reader, writer = await asyncio.open_unix_connection(args.unix)
+    else:
+        reader, writer = await asyncio.open_connection(args.host, args.port)
+
+    sent = {}
+    errors = 0
+
+    async def receive():
+        nonlocal errors
+        for number in range(args.records):
+            response = json.loads(await reader.readline())
+            latencies.append(time.perf_counter() - sent.pop(number))
+            if not response.get("ok"):
+                errors += 1
+
+    receiver = asyncio.create_task(receive())
+    for number in range(args.records):
+        sent[number] = time.perf_counter()
+        writer.write(json.dumps(make_record(line, number)).encode("utf-8") + b"\n")
+        await writer.drain()
+        if args.rate:
+            await asyncio.sleep(1 / args.rate)
+    await receiver
+    writer.close()
+    return errors
+
+
+async def main(args):
+    latencies = []
+    start = time.perf_counter()
+    errors = await asyncio.gather(*(run_line(args, line, latencies) for line in range(args.lines)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    total = len(latencies)
+    print(f"Registros: {total} en {elapsed:.2f}s ({total / elapsed:.0f} registros/s), errores: {sum(errors)}")
+    if total:
+        print(
+            f"Latencia hasta confirmación: p50 {latencies[total // 2] * 1000:.1f} ms, "
+            f"p99 {latencies[min(total - 1, int(total * 0.99))] * 1000:.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generador de carga de ingesta")
+    parser.add_argument("--lines", type=int, default=4, help="Líneas que envían en paralelo")
+    parser.add_argument("--records", type=int, default=2000, help="Registros por línea")
+    parser.add_argument("--rate", type=float, default=0, help="Registros por segundo y línea (0: sin límite)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", help="Ruta de un socket Unix (en lugar de TCP)")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,17 @@
+"""
+Recalcula la tabla de resumen de producción (bobina_rollup).
+
+Uso: python -m utils.rebuild_rollup [ruta/a/produccion.db]
+"""
+import sys
+
+from models.database_manager import DatabaseManager
+
+db_manager = DatabaseManager(sys.argv[1] if len(sys.argv) > 1 else None)
+try:
+    if db_manager.rebuild_rollup():
+        print("Resumen de producción recalculado correctamente")
+    else:
+        sys.exit(1)
+finally:
+    db_manager.close()
@@ -1,8 +1,37 @@
+import asyncio
+from datetime import date, timedelta
 import flet as ft
-import threading
-from models.database_manager import DatabaseManager
+from models.database_manager import BOBINA_COLUMNS, DatabaseManager, normalize_sort
+from models.db_service import DatabaseService
+from models.selection import Selection
+from views.virtual_grid import VirtualGrid
 from utils.constants import COLOR_PRIMARY, COLOR_SECONDARY, save_theme_preference
 
+# Columnas de la tabla: (columna, título, ancho en píxeles)
+GRID_COLUMNS = [
+    ("id", "ID", 110),
+    ("turno", "Turno", 70),
+    ("ancho", "Ancho", 80),
+    ("diametro", "Diámetro", 90),
+    ("gramaje", "Gramaje", 90),
+    ("peso", "Peso", 80),
+    ("bobina_num", "Bobina Num", 110),
+    ("sec", "Sec", 60),
+    ("of", "OF", 90),
+    ("fecha", "Fecha", 150),
+    ("codcal", "CodCal", 80),
+    ("desccal", "DescCal", 120),
+    ("created_at", "Created At", 170),
+]
+
+def _sqlite_sort_key(value):
+    """Clave de orden de un valor con el criterio de SQLite: nulos, números y luego texto."""
+    if value is None:
+        return (0, 0)
+    if isinstance(value, (int, float)):
+        return (1, value)
+    return (2, str(value))
+
 class MainScreen(ft.Container):  # Changed from ft.UserControl to ft.Container
     """
     Clase para la pantalla principal de la aplicación.
@@ -18,46 +47,60 @@ class MainScreen(ft.Container):  # Changed from ft.UserControl to ft.Container
             from models.database_manager import DatabaseManager
             self.db_manager = DatabaseManager()
         
+        # Servicio asíncrono: un hilo escritor y un pool acotado de lectores.
+        # Las tareas se lanzan con page.run_task, así la interfaz solo se
+        # modifica desde el bucle de eventos de Flet
+        self.db = DatabaseService(self.db_manager)
+        
         # Configure page properties for centered window
         if self.page:
             self.page.window_center = True
             self.page.theme_mode = ft.ThemeMode.LIGHT
             self.page.title = "Sistema Manager de Producción"
         
-        # Lista para almacenar los IDs seleccionados
-        self.selected_ids = []
-        
-        # Variables para el ordenamiento
-        self.sort_column_index = None
-        self.sort_ascending = True
-        
-        # Definición de la tabla
-        self.table = ft.DataTable(
-            columns=[
-                ft.DataColumn(
-                    ft.Row([
-                        ft.Checkbox(on_change=self.select_all_changed),
-                        ft.Text("ID")
-                    ]),
-                    on_sort=lambda e: self.sort_data(0, e.ascending)
-                ),
-                ft.DataColumn(ft.Text("Turno"), on_sort=lambda e: self.sort_data(1, e.ascending)),
-                ft.DataColumn(ft.Text("Ancho"), on_sort=lambda e: self.sort_data(2, e.ascending)),
-                ft.DataColumn(ft.Text("Diámetro"), on_sort=lambda e: self.sort_data(3, e.ascending)),
-                ft.DataColumn(ft.Text("Gramaje"), on_sort=lambda e: self.sort_data(4, e.ascending)),
-                ft.DataColumn(ft.Text("Peso"), on_sort=lambda e: self.sort_data(5, e.ascending)),
-                ft.DataColumn(ft.Text("Bobina Num"), on_sort=lambda e: self.sort_data(6, e.ascending)),
-                ft.DataColumn(ft.Text("Sec"), on_sort=lambda e: self.sort_data(7, e.ascending)),
-                ft.DataColumn(ft.Text("OF"), on_sort=lambda e: self.sort_data(8, e.ascending)),
-                ft.DataColumn(ft.Text("Fecha"), on_sort=lambda e: self.sort_data(9, e.ascending)),
-                ft.DataColumn(ft.Text("CodCal"), on_sort=lambda e: self.sort_data(10, e.ascending)),
-                ft.DataColumn(ft.Text("DescCal"), on_sort=lambda e: self.sort_data(11, e.ascending)),
-                ft.DataColumn(ft.Text("Created At"), on_sort=lambda e: self.sort_data(12, e.ascending)),
-            ],
-            rows=[],
-            sort_column_index=self.sort_column_index,
-            sort_ascending=self.sort_ascending,
-            expand=True,  # Add expand property to the table
+        # Selección: IDs marcados o "todas las que cumplen el filtro, salvo estas"
+        self.selection = Selection()
+        
+        # Orden de la tabla: pares (columna, ascendente); vacío es por ID descendente
+        self.sort_order = []
+        
+        # Búsqueda: espera tras la última tecla y demora hasta mostrar el
+        # diálogo de espera (en segundos). Cada carga de la primera página
+        # (búsqueda, orden o recarga) aumenta la generación y solo se aplica
+        # el resultado de la última
+        self.filter_debounce = 0.3
+        self.filter_dialog_delay = 1.0
+        self.query_generation = 0
+        
+        # Variables para la paginación por clave (keyset): última fila cargada
+        self.page_size = 200
+        self.page_cursor = None
+        self.has_more_rows = False
+        self.current_filters = {}
+        # Filtros escritos en los campos, aunque su búsqueda todavía no haya
+        # terminado: ordenar, recargar y seleccionar todo usan estos
+        self.pending_filters = {}
+        self.loading_page = False
+        
+        # Última secuencia del registro de cambios aplicada a la tabla
+        self.last_change_seq = 0
+        
+        # Segundos entre consultas de cambios hechos por otros procesos
+        # (por ejemplo, el servicio de ingesta de las líneas)
+        self.change_poll_interval = 2.0
+        
+        # Segundos entre copias de seguridad automáticas (0 las desactiva)
+        self.backup_interval = 6 * 3600
+        self.backup_running = False
+        
+        # Tabla virtualizada: solo se construyen las filas visibles
+        self.grid = VirtualGrid(
+            columns=GRID_COLUMNS,
+            on_row_select=self.checkbox_changed,
+            on_select_all=self.select_all_changed,
+            on_sort=self.sort_data,
+            on_end_reached=self.load_more,
+            is_selected=self.selection.is_selected,
         )
         
         # Elementos de búsqueda/filtro
@@ -73,6 +116,44 @@ class MainScreen(ft.Container):  # Changed from ft.UserControl to ft.Container
                 on_change=self.apply_filters
             )
         
+        # Filtros por rango: se resuelven con recorridos por rango de los índices
+        for column, hint, width in [
+            ("peso_min", "Peso mín.", 100),
+            ("peso_max", "Peso máx.", 100),
+            ("fecha_desde", "Fecha desde (AAAA-MM-DD)", 200),
+            ("fecha_hasta", "Fecha hasta (AAAA-MM-DD)", 200),
+        ]:
+            self.search_fields[column] = ft.TextField(
+                hint_text=hint,
+                width=width,
+                border=ft.InputBorder.UNDERLINE,
+                height=40,
+                text_size=14,
+                content_padding=ft.padding.only(left=10, right=10, top=0, bottom=0),
+                on_change=self.apply_filters
+            )
+        
+        # Indicadores de búsqueda en curso: uno discreto junto a los filtros y
+        # un diálogo si la consulta supera filter_dialog_delay
+        self.filter_progress = ft.ProgressRing(width=16, height=16, stroke_width=2, visible=False)
+        self.filter_dialog = ft.AlertDialog(
+            modal=True,
+            content=ft.Column(
+                controls=[
+                    ft.ProgressRing(),
+                    ft.Text("Filtrando datos...")
+                ],
+                horizontal_alignment=ft.CrossAxisAlignment.CENTER
+            )
+        )
+        
+        # Atajo: producción de los últimos 7 días
+        self.last_week_button = ft.TextButton(
+            text="Últimos 7 días",
+            icon=ft.icons.DATE_RANGE,
+            on_click=self.filter_last_week,
+        )
+        
         # Botón para generar archivo
         self.generate_button = ft.ElevatedButton(
             text="Generar Archivo",
@@ -93,6 +174,14 @@ class MainScreen(ft.Container):  # Changed from ft.UserControl to ft.Container
             disabled=True
         )
         
+        # Botón para cargar la siguiente página de registros
+        self.load_more_button = ft.TextButton(
+            text="Cargar más registros",
+            icon=ft.icons.EXPAND_MORE,
+            on_click=self.load_more,
+            visible=False
+        )
+        
         # Botón para añadir nuevo registro (opcional)
         self.add_button = ft.ElevatedButton(
             text="Añadir Registro",
@@ -102,6 +191,16 @@ class MainScreen(ft.Container):  # Changed from ft.UserControl to ft.Container
             on_click=self.show_add_form,
         )
         
+        # Panel con los kilos producidos hoy por turno y OF (leído de bobina_rollup)
+        self.summary_total = ft.Text("Producción de hoy: -", weight=ft.FontWeight.BOLD)
+        self.summary_groups = ft.Row(spacing=20, scroll=ft.ScrollMode.AUTO)
+        self.summary_panel = ft.Container(
+            content=ft.Row([self.summary_total, self.summary_groups], spacing=20),
+            border=ft.border.all(1, ft.colors.BLACK12),
+            border_radius=5,
+            padding=ft.padding.symmetric(horizontal=10, vertical=5),
+        )
+        
         # Create AppBar with menu
         self.create_app_bar()
         
@@ -114,6 +213,14 @@ class MainScreen(ft.Container):  # Changed from ft.UserControl to ft.Container
             ],
             scroll=ft.ScrollMode.AUTO
         )
+        range_row = ft.Row(
+            controls=[
+                self.search_fields[col] for col in [
+                    "peso_min", "peso_max", "fecha_desde", "fecha_hasta"
+                ]
+            ] + [self.last_week_button, self.filter_progress],
+            scroll=ft.ScrollMode.AUTO
+        )
         
         # Create main content
         content = ft.Column(
@@ -121,10 +228,13 @@ class MainScreen(ft.Container):  # Changed from ft.UserControl to ft.Container
                 self.app_bar,  # Add the AppBar at the top
                 ft.Divider(),
                 filter_row,
+                range_row,
+                self.summary_panel,
                 ft.Container(
                     content=ft.Column([
-                        self.table,
-                    ], expand=True, scroll=ft.ScrollMode.AUTO),
+                        self.grid,
+                        self.load_more_button,
+                    ], expand=True),
                     expand=True,
                     border=ft.border.all(1, ft.colors.BLACK12),
                     border_radius=5,
@@ -133,7 +243,6 @@ class MainScreen(ft.Container):  # Changed from ft.UserControl to ft.Container
             ],
             spacing=10,
             expand=True,
-            scroll=ft.ScrollMode.ALWAYS,
         )
         
         # Initialize container
@@ -151,13 +260,13 @@ class MainScreen(ft.Container):  # Changed from ft.UserControl to ft.Container
         # self.load_data()  # Comment out or remove this line
     
     def load_data(self):
-        """Carga los datos de la base de datos y actualiza la tabla."""
+        """Carga la primera página con los filtros de los campos y actualiza la tabla."""
         # Check if page is available
         if not self.page:
             return
             
         # Mostrar spinner de carga
-        self.page.dialog = ft.AlertDialog(
+        loading_dialog = ft.AlertDialog(
             modal=True,
             content=ft.Column(
                 controls=[
@@ -167,132 +276,363 @@ class MainScreen(ft.Container):  # Changed from ft.UserControl to ft.Container
                 horizontal_alignment=ft.CrossAxisAlignment.CENTER
             )
         )
-        self.page.dialog.open = True
+        self.page.dialog = loading_dialog
+        loading_dialog.open = True
         self.page.update()
         
-        def load_process():
-            # Obtener datos de la base de datos
-            data = self.db_manager.get_all_bobinas()
+        self.query_generation += 1
+        generation = self.query_generation
+        filters = dict(self.pending_filters)
+        
+        async def load_process():
+            data = None
+            try:
+                # Obtener la primera página de la base de datos
+                change_seq = await self.db.get_change_seq()
+                data = await self.fetch_page(filters=filters)
+            except asyncio.CancelledError:
+                pass  # Una búsqueda posterior reemplazó la lectura
+            finally:
+                loading_dialog.open = False
             
-            # Actualizar UI en el hilo principal
-            if self.page:
-                self.page.dialog.open = False
+            # Actualizar UI
+            if self.page and data is not None and generation == self.query_generation:
+                self.hide_filter_progress()
+                self.current_filters = filters
+                self.last_change_seq = change_seq
                 self.update_table(data)
                 self.page.update()
+                await self.update_summary()
+                self.update()
+            elif self.page:
+                self.page.update()
         
-        threading.Thread(target=load_process).start()
+        self.page.run_task(load_process)
     
-    def update_table(self, data):
-        """Actualiza la tabla con los datos proporcionados."""
-        # Limpiar filas actuales
-        self.table.rows.clear()
+    def update_table(self, data, reset_scroll=False):
+        """
+        Actualiza la tabla con los datos proporcionados.
+        
+        Las filas se concilian por ID con las que ya se muestran: solo se
+        envían al cliente los controles de las filas que cambiaron.
+        
+        Args:
+            data (list): Primera página de filas
+            reset_scroll (bool): Volver al principio de la tabla (al cambiar el
+                orden casi todas las filas se mueven y no hay nada que conservar)
+        """
+        # "Seleccionar todo" vale para el filtro con el que se eligió
+        if self.selection.all_matching and self.selection.filters != self.current_filters:
+            self.selection.clear()
+            self.update_selection_buttons()
+        
+        if reset_scroll:
+            self.grid.set_rows(data)
+        else:
+            self.grid.reconcile(data)
+            self.grid.refresh_selection()
+        
+        # Reiniciar el cursor de paginación
+        self.page_cursor = data[-1] if data else None
+        self.has_more_rows = len(data) >= self.page_size
+        self.load_more_button.visible = self.has_more_rows
         
-        # Agregar nuevas filas
-        for row in data:
-            checkbox = ft.Checkbox(
-                value=False, 
-                data=row["id"],
-                on_change=self.checkbox_changed
+        self.update()
+    
+    def append_rows(self, data):
+        """Agrega una página de datos al final de la tabla."""
+        self.grid.append_rows(data)
+        
+        # Actualizar el cursor de paginación
+        if data:
+            self.page_cursor = data[-1]
+        self.has_more_rows = len(data) >= self.page_size
+        self.load_more_button.visible = self.has_more_rows
+        
+        self.update()
+    
+    def refresh_changes(self):
+        """
+        Aplica a la tabla solo los registros insertados, modificados o
+        eliminados desde la última sincronización, sin volver a leer toda la
+        tabla.
+        """
+        if not self.page:
+            return
+        
+        async def refresh_process():
+            changes = await self.db.get_changes_since(
+                self.last_change_seq, self.current_filters
             )
+            if not self.page:
+                return
+            if changes is None:
+                # El registro de cambios ya no cubre el intervalo: recargar
+                # la primera página con el orden y los filtros de los campos
+                self.load_data()
+                return
+            self.apply_changes(changes)
+            await self.update_summary()
+            self.update()
+        
+        self.page.run_task(refresh_process)
+    
+    def apply_changes(self, changes):
+        """Modifica las filas de la tabla según el resultado de get_changes_since."""
+        deleted = set(changes["deleted"])
+        if deleted:
+            self.grid.remove_keys(deleted)
+            self.selection.discard(deleted)
+        
+        present = set(self.grid.keys())
+        inserted = [row for row in changes["inserted"] if row["id"] not in present]
+        if not self.sort_order:
+            # Las filas nuevas tienen IDs mayores: van al principio de la tabla
+            self.grid.prepend_rows(inserted)
+        else:
+            # Con orden por columnas cada fila va en su posición
+            for row in inserted:
+                position = self._sort_position(row)
+                if position is not None:
+                    self.grid.insert_row(position, row)
+        
+        for row in changes["updated"]:
+            # Con el orden por ID una fila modificada no cambia de lugar
+            if not self.sort_order and self.grid.replace_row(row):
+                continue
+            # Con orden por columnas (o si no estaba cargada) va en su posición
+            self.grid.remove_keys([row["id"]])
+            position = self._sort_position(row)
+            if position is not None:
+                self.grid.insert_row(position, row)
+        
+        self.last_change_seq = changes["seq"]
+        
+        # Actualizar estado de los botones
+        self.update_selection_buttons()
+        self.update()
+    
+    async def update_summary(self):
+        """
+        Actualiza el panel de producción del día (sin refrescar la página).
+        
+        Si otra lectura del resumen deja obsoleta a esta (por ejemplo, el
+        sondeo de cambios), el panel lo actualiza esa lectura y aquí no se
+        hace nada.
+        """
+        try:
+            groups = await self.db.get_production_summary(group_by=("turno", "of"))
+        except asyncio.CancelledError:
+            return
+        total_count = sum(group["cantidad"] for group in groups)
+        total_weight = sum(group["peso_total"] for group in groups)
+        
+        self.summary_total.value = (
+            f"Producción de hoy: {total_count} bobinas, {total_weight:,.1f} kg"
+        )
+        self.summary_groups.controls = [
+            ft.Text(
+                f"Turno {group['turno']} / OF {group['of']}: "
+                f"{group['cantidad']} bob., {group['peso_total']:,.1f} kg",
+                size=12,
+            )
+            for group in groups
+        ]
+    
+    def rebuild_summary(self, e=None):
+        """Recalcula la tabla de resumen de producción y actualiza el panel."""
+        if not self.page:
+            return
+        
+        async def rebuild_process():
+            if not await self.db.rebuild_rollup():
+                self.show_error_dialog("No se pudo recalcular el resumen de producción.")
+                return
+            await self.update_summary()
+            self.update()
+        
+        self.page.run_task(rebuild_process)
+    
+    async def fetch_page(self, after=None, filters=None):
+        """
+        Lee una página con los filtros y el orden actuales.
+        
+        Args:
+            after: Última fila cargada, o None para la primera página
+            filters (dict): Filtros de la página (por defecto, los de la tabla)
             
-            self.table.rows.append(
-                ft.DataRow(
-                    cells=[
-                        ft.DataCell(ft.Row([checkbox, ft.Text(str(row["id"]))])),
-                        ft.DataCell(ft.Text(row["turno"])),
-                        ft.DataCell(ft.Text(str(row["ancho"]))),
-                        ft.DataCell(ft.Text(str(row["diametro"]))),
-                        ft.DataCell(ft.Text(str(row["gramaje"]))),
-                        ft.DataCell(ft.Text(str(row["peso"]))),
-                        ft.DataCell(ft.Text(row["bobina_num"])),
-                        ft.DataCell(ft.Text(row["sec"] if row["sec"] else "")),
-                        ft.DataCell(ft.Text(row["of"])),
-                        ft.DataCell(ft.Text(row["fecha"])),
-                        ft.DataCell(ft.Text(row["codcal"] if row["codcal"] else "")),
-                        ft.DataCell(ft.Text(row["desccal"] if row["desccal"] else "")),
-                        ft.DataCell(ft.Text(row["created_at"])),
-                    ]
-                )
+        Returns:
+            BobinaResultSet: Filas de la página
+        """
+        if filters is None:
+            filters = self.current_filters
+        # Una primera página deja obsoleta a la anterior (y aborta su consulta);
+        # las páginas siguientes no compiten con ella
+        key = "first_page" if after is None else "next_page"
+        if self.sort_order:
+            return await self.db.get_bobinas_page(
+                None, self.page_size, filters, key=key,
+                sort=self.sort_order, after=after
             )
+        after_id = after["id"] if after is not None else None
+        return await self.db.get_bobinas_page(
+            after_id, self.page_size, filters, key=key
+        )
+    
+    def load_more(self, e=None):
+        """Carga la siguiente página de registros a continuación de la última."""
+        if not self.page or not self.has_more_rows or self.loading_page:
+            return
         
+        self.loading_page = True
+        self.load_more_button.disabled = True
         self.update()
+        
+        generation = self.query_generation
+        
+        async def load_more_process():
+            try:
+                data = await self.fetch_page(self.page_cursor)
+                # Descartar la página si entretanto se recargó la tabla
+                if self.page and generation == self.query_generation:
+                    self.append_rows(data)
+            finally:
+                self.loading_page = False
+                self.load_more_button.disabled = False
+                if self.page:
+                    self.update()
+        
+        self.page.run_task(load_more_process)
     
     def checkbox_changed(self, e):
         """Maneja el cambio de estado de los checkboxes de selección."""
-        if e.control.value:
-            if e.control.data not in self.selected_ids:
-                self.selected_ids.append(e.control.data)
-        else:
-            if e.control.data in self.selected_ids:
-                self.selected_ids.remove(e.control.data)
+        self.selection.set(e.control.data, e.control.value)
         
         # Actualizar estado de los botones
-        has_selections = len(self.selected_ids) > 0
-        self.generate_button.disabled = not has_selections
-        self.delete_button.disabled = not has_selections  # Add this line
+        self.update_selection_buttons()
         self.update()
     
     def select_all_changed(self, e):
-        """Maneja el evento de seleccionar/deseleccionar todos."""
-        select_all = e.control.value
+        """
+        Maneja el evento de seleccionar/deseleccionar todos.
+        
+        Seleccionar todo marca todas las bobinas que cumplen el filtro
+        actual, estén cargadas o no, sin leer sus IDs: la selección guarda
+        el filtro y se resuelve en SQL al exportar o eliminar.
+        """
+        if not e.control.value:
+            self.selection.clear()
+            self.grid.refresh_selection()
+            self.update_selection_buttons()
+            self.update()
+            return
         
-        self.selected_ids.clear()
+        # Los filtros escritos, aunque su resultado todavía no se muestre
+        filters = dict(self.pending_filters)
         
-        for row in self.table.rows:
-            # El checkbox está en la primera celda dentro de un Row
-            checkbox = row.cells[0].content.controls[0]
-            checkbox.value = select_all
-            
-            if select_all:
-                self.selected_ids.append(checkbox.data)
+        async def select_all_process():
+            max_id = await self.db.get_last_bobina_id()
+            self.selection.select_all(filters, max_id)
+            # Actualizar solo las casillas de las filas construidas
+            self.grid.refresh_selection()
+            self.update_selection_buttons()
+            self.update()
         
-        # Actualizar estado de los botones
-        has_selections = len(self.selected_ids) > 0
+        self.page.run_task(select_all_process)
+    
+    def update_selection_buttons(self):
+        """Habilita los botones que operan sobre la selección si hay algo seleccionado."""
+        has_selections = not self.selection.is_empty()
         self.generate_button.disabled = not has_selections
-        self.delete_button.disabled = not has_selections  # Add this line
-        self.update()
+        self.delete_button.disabled = not has_selections
+        self.grid.select_all_checkbox.value = self.selection.all_matching
     
-    def apply_filters(self, e):
-        """Aplica los filtros de búsqueda a los datos."""
-        # Recoger todos los valores de filtro
+    def apply_filters(self, e=None):
+        """
+        Programa la búsqueda con los valores actuales de los filtros.
+        
+        Se llama en cada tecla: la consulta se lanza cuando se deja de escribir
+        durante `filter_debounce` segundos. Cada búsqueda lleva un número de
+        generación; una búsqueda nueva aborta la consulta de la anterior
+        (Connection.interrupt) y solo se aplica el resultado de la última.
+        """
+        if not self.page:
+            return
         filters = {}
         for column, field in self.search_fields.items():
             if field.value:
                 filters[column] = field.value.lower()
+        self.pending_filters = filters
         
-        # Si no hay filtros, cargar todos los datos
-        if not filters:
-            self.load_data()
+        self.query_generation += 1
+        self.page.run_task(self.filter_process, self.query_generation, filters)
+    
+    async def filter_process(self, generation, filters):
+        """
+        Ejecuta una búsqueda programada por apply_filters si sigue vigente.
+        
+        Args:
+            generation (int): Número de generación de la búsqueda
+            filters (dict): Filtros a aplicar
+        """
+        await asyncio.sleep(self.filter_debounce)
+        if generation != self.query_generation:
             return
         
-        # Mostrar spinner de carga
-        self.page.dialog = ft.AlertDialog(
-            modal=True,
-            content=ft.Column(
-                controls=[
-                    ft.ProgressRing(),
-                    ft.Text("Filtrando datos...")
-                ],
-                horizontal_alignment=ft.CrossAxisAlignment.CENTER
-            )
-        )
-        self.page.dialog.open = True
-        self.page.update()
+        self.filter_progress.visible = True
+        self.update()
+        try:
+            change_seq = await self.db.get_change_seq()
+            # Primera página; la lectura de una búsqueda posterior cancela esta
+            query = asyncio.ensure_future(self.fetch_page(filters=filters))
+            done, _ = await asyncio.wait({query}, timeout=self.filter_dialog_delay)
+            if not done and generation == self.query_generation:
+                # La consulta tarda: mostrar el diálogo de espera
+                self.page.dialog = self.filter_dialog
+                self.filter_dialog.open = True
+                self.page.update()
+            filtered_data = await query
+        except asyncio.CancelledError:
+            return
+        finally:
+            # Solo la búsqueda vigente cierra los indicadores de espera (si la
+            # reemplazó un orden o una recarga, los cierra esa consulta)
+            if generation == self.query_generation and self.page:
+                self.hide_filter_progress()
+        if generation != self.query_generation or not self.page:
+            return
         
-        def filter_process():
-            # Filtrar datos
-            filtered_data = self.db_manager.filter_bobinas(filters)
-            
-            # Actualizar UI en el hilo principal
-            self.page.dialog.open = False
-            self.update_table(filtered_data)
-            self.page.update()
+        # Los filtros pasan a ser los de la tabla solo cuando se muestra su resultado
+        self.current_filters = filters
+        self.last_change_seq = change_seq
         
-        threading.Thread(target=filter_process).start()
+        # Actualizar UI
+        self.update_table(filtered_data)
+        self.page.update()
+    
+    def hide_filter_progress(self):
+        """Oculta el indicador y el diálogo de espera de la búsqueda."""
+        self.filter_progress.visible = False
+        if self.filter_dialog.open:
+            self.filter_dialog.open = False
+            self.page.update()
+    
+    def filter_last_week(self, e=None):
+        """Filtra la producción de los últimos 7 días (incluido hoy)."""
+        today = date.today()
+        self.search_fields["fecha_desde"].value = (today - timedelta(days=6)).isoformat()
+        self.search_fields["fecha_hasta"].value = today.isoformat()
+        self.apply_filters(e)
     
     def confirm_export(self, e):
         """Muestra un diálogo de confirmación para la exportación."""
-        if not self.selected_ids:
+        self.page.run_task(self.confirm_export_process)
+    
+    async def confirm_export_process(self):
+        """Cuenta la selección (en SQL si es por filtro) y pide confirmación para exportarla."""
+        selection = self.selection.copy()
+        count = 0 if selection.is_empty() else await self.db.count_selection(selection)
+        if not count:
             confirm_dialog = ft.AlertDialog(
                 title=ft.Text("Atención"),
                 content=ft.Text("No hay registros seleccionados para exportar."),
@@ -309,12 +649,12 @@ class MainScreen(ft.Container):  # Changed from ft.UserControl to ft.Container
         confirm_dialog = ft.AlertDialog(
             title=ft.Text("Confirmar acción"),
             content=ft.Text(
-                f"Se exportarán y moverán {len(self.selected_ids)} registros al archivo histórico. "
+                f"Se exportarán y moverán {count} registros al archivo histórico. "
                 "Esta acción no se puede deshacer. ¿Desea continuar?"
             ),
             actions=[
                 ft.TextButton("Cancelar", on_click=lambda _: self.close_dialog()),
-                ft.TextButton("Continuar", on_click=self.export_data),
+                ft.TextButton("Continuar", on_click=lambda e: self.export_data(e, selection)),
             ],
         )
         # Add the dialog to the page overlay
@@ -334,8 +674,17 @@ class MainScreen(ft.Container):  # Changed from ft.UserControl to ft.Container
                     dialog.open = False
             self.page.update()
     
-    def export_data(self, e):
-        """Exporta los datos seleccionados y los mueve a la tabla histórica."""
+    def export_data(self, e, selection=None):
+        """
+        Exporta los datos seleccionados y los mueve a la tabla histórica.
+        
+        Args:
+            selection (Selection): Selección confirmada (por defecto, una copia
+                de la actual)
+        """
+        if selection is None:
+            selection = self.selection.copy()
+        
         # Cerrar el diálogo de confirmación
         self.close_dialog()
         
@@ -355,12 +704,9 @@ class MainScreen(ft.Container):  # Changed from ft.UserControl to ft.Container
         loading_dialog.open = True
         self.page.update()
         
-        # Exportar en un hilo separado para no bloquear la UI
-        def export_process():
+        # Exportar en segundo plano para no bloquear la UI
+        async def export_process():
             try:
-                # Obtener los datos de los registros seleccionados
-                selected_data = self.db_manager.get_bobinas_by_ids(self.selected_ids)
-                
                 # Exportar a un archivo CSV
                 import csv
                 import os
@@ -383,27 +729,28 @@ class MainScreen(ft.Container):  # Changed from ft.UserControl to ft.Container
                 timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
                 filename = os.path.join(export_dir, f"export_{timestamp}.csv")
                 
-                # Escribir datos al archivo CSV
-                with open(filename, 'w', newline='') as csvfile:
-                    fieldnames = ['id', 'turno', 'ancho', 'diametro', 'gramaje', 'peso', 
-                                 'bobina_num', 'sec', 'of', 'fecha', 'codcal', 'desccal', 'created_at']
-                    writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                    
-                    writer.writeheader()
-                    for row in selected_data:
-                        writer.writerow(row)
+                def write_file():
+                    # Escribir los registros seleccionados al archivo CSV a medida que se leen
+                    with open(filename, 'w', newline='') as csvfile:
+                        writer = csv.writer(csvfile)
+                        
+                        writer.writerow(BOBINA_COLUMNS)
+                        writer.writerows(self.db_manager.iter_bobinas(ids=selection))
+                
+                await self.db.read(write_file)
                 
                 # Mover registros a histórico
-                success = self.db_manager.move_to_historic(self.selected_ids)
+                success = await self.db.move_to_historic(selection)
                 
-                # Actualizar UI en el hilo principal
+                # Actualizar UI
                 if self.page:
                     # Close the loading dialog
                     self.close_dialog()
                     
                     if success:
                         # Limpiar selección
-                        self.selected_ids.clear()
+                        self.selection.clear()
+                        self.grid.refresh_selection()
                         
                         # Mostrar mensaje de éxito
                         success_dialog = ft.AlertDialog(
@@ -428,15 +775,15 @@ class MainScreen(ft.Container):  # Changed from ft.UserControl to ft.Container
                     self.show_error_dialog(f"Error: {str(e)}")
                     self.page.update()
         
-        threading.Thread(target=export_process).start()
+        self.page.run_task(export_process)
     
     def reload_after_export(self):
         """Recarga los datos después de exportar registros."""
         # Cerrar el diálogo de éxito
         self.close_dialog()
         
-        # Recargar los datos
-        self.load_data()
+        # Aplicar solo los cambios desde la última sincronización
+        self.refresh_changes()
         
         # Actualizar estado de los botones
         self.generate_button.disabled = True
@@ -447,10 +794,110 @@ class MainScreen(ft.Container):  # Changed from ft.UserControl to ft.Container
         """Called when the component is mounted to the page"""
         # Now it's safe to load data
         self.load_data()
+        
+        # Incorporar los registros que llegan por el servicio de ingesta
+        self.page.run_task(self.watch_changes)
+        
+        # Copias de seguridad periódicas
+        if self.backup_interval:
+            self.page.run_task(self.watch_backups)
+    
+    async def watch_changes(self):
+        """Aplica periódicamente los cambios registrados por otros procesos."""
+        while self.page:
+            await asyncio.sleep(self.change_poll_interval)
+            if self.loading_page:
+                continue
+            if await self.db.get_change_seq() > self.last_change_seq:
+                self.refresh_changes()
 
+    async def watch_backups(self):
+        """Crea una copia de seguridad cada backup_interval segundos."""
+        while self.page:
+            await asyncio.sleep(self.backup_interval)
+            if not self.backup_running:
+                await self.create_backup()
+    
+    async def create_backup(self, on_progress=None):
+        """
+        Crea una copia de seguridad sin bloquear la interfaz ni las escrituras.
+        
+        Args:
+            on_progress (callable): Función que recibe (páginas copiadas, páginas
+                totales); se llama desde el bucle de eventos
+            
+        Returns:
+            str: Ruta de la copia creada, o None si falló
+        """
+        loop = asyncio.get_running_loop()
+        
+        def progress(copied, total):
+            # La copia avanza en otro hilo: actualizar la interfaz desde el bucle
+            if on_progress is not None:
+                loop.call_soon_threadsafe(on_progress, copied, total)
+        
+        self.backup_running = True
+        try:
+            return await self.db.backup(progress=progress)
+        finally:
+            self.backup_running = False
+    
+    def run_backup(self, e=None):
+        """Crea una copia de seguridad mostrando su progreso."""
+        if not self.page:
+            return
+        if self.backup_running:
+            self.show_error_dialog("Ya hay una copia de seguridad en curso.")
+            return
+        
+        progress_bar = ft.ProgressBar(width=300, value=0)
+        progress_text = ft.Text("Preparando copia de seguridad...")
+        progress_dialog = ft.AlertDialog(
+            modal=True,
+            title=ft.Text("Copia de seguridad"),
+            content=ft.Column(
+                controls=[progress_bar, progress_text],
+                tight=True,
+                horizontal_alignment=ft.CrossAxisAlignment.CENTER
+            )
+        )
+        self.page.overlay.append(progress_dialog)
+        progress_dialog.open = True
+        self.page.update()
+        
+        def show_progress(copied, total):
+            progress_bar.value = copied / total if total else 1
+            progress_text.value = f"Copiadas {copied} de {total} páginas"
+            self.page.update()
+        
+        async def backup_process():
+            path = await self.create_backup(show_progress)
+            self.close_dialog()
+            if not path:
+                self.show_error_dialog("No se pudo crear la copia de seguridad.")
+                return
+            success_dialog = ft.AlertDialog(
+                title=ft.Text("Éxito"),
+                content=ft.Text(f"Copia de seguridad creada en:\n{path}"),
+                actions=[
+                    ft.TextButton("Aceptar", on_click=lambda _: self.close_dialog()),
+                ],
+            )
+            self.page.overlay.append(success_dialog)
+            success_dialog.open = True
+            self.page.update()
+        
+        self.page.run_task(backup_process)
+    
     def confirm_delete(self, e):
         """Muestra un diálogo de confirmación para eliminar registros."""
-        if not self.selected_ids:
+        self.page.run_task(self.confirm_delete_process)
+    
+    async def confirm_delete_process(self):
+        """Cuenta la selección (en SQL si es por filtro) y pide confirmación para eliminarla."""
+        selection = self.selection.copy()
+        count = 0 if selection.is_empty() else await self.db.count_selection(selection)
+        if not count:
             confirm_dialog = ft.AlertDialog(
                 title=ft.Text("Atención"),
                 content=ft.Text("No hay registros seleccionados para eliminar."),
@@ -467,12 +914,12 @@ class MainScreen(ft.Container):  # Changed from ft.UserControl to ft.Container
         confirm_dialog = ft.AlertDialog(
             title=ft.Text("Confirmar eliminación"),
             content=ft.Text(
-                f"¿Está seguro de que desea eliminar {len(self.selected_ids)} registro(s)? "
+                f"¿Está seguro de que desea eliminar {count} registro(s)? "
                 "Esta acción no se puede deshacer."
             ),
             actions=[
                 ft.TextButton("Cancelar", on_click=lambda _: self.close_dialog()),
-                ft.TextButton("Eliminar", on_click=self.delete_records),
+                ft.TextButton("Eliminar", on_click=lambda e: self.delete_records(e, selection)),
             ],
         )
         # Add the dialog to the page overlay
@@ -480,8 +927,17 @@ class MainScreen(ft.Container):  # Changed from ft.UserControl to ft.Container
         confirm_dialog.open = True
         self.page.update()
     
-    def delete_records(self, e):
-        """Elimina los registros seleccionados de la base de datos."""
+    def delete_records(self, e, selection=None):
+        """
+        Elimina los registros seleccionados de la base de datos.
+        
+        Args:
+            selection (Selection): Selección confirmada (por defecto, una copia
+                de la actual)
+        """
+        if selection is None:
+            selection = self.selection.copy()
+        
         # Cerrar el diálogo de confirmación
         self.close_dialog()
         
@@ -501,20 +957,21 @@ class MainScreen(ft.Container):  # Changed from ft.UserControl to ft.Container
         loading_dialog.open = True
         self.page.update()
         
-        # Eliminar en un hilo separado para no bloquear la UI
-        def delete_process():
+        # Eliminar en segundo plano para no bloquear la UI
+        async def delete_process():
             try:
                 # Eliminar registros de la base de datos
-                success = self.db_manager.delete_bobinas(self.selected_ids)
+                success = await self.db.delete_bobinas(selection)
                 
-                # Actualizar UI en el hilo principal
+                # Actualizar UI
                 if self.page:
                     # Close the loading dialog
                     self.close_dialog()
                     
                     if success:
                         # Limpiar selección
-                        self.selected_ids.clear()
+                        self.selection.clear()
+                        self.grid.refresh_selection()
                         
                         # Mostrar mensaje de éxito
                         success_dialog = ft.AlertDialog(
@@ -539,15 +996,15 @@ class MainScreen(ft.Container):  # Changed from ft.UserControl to ft.Container
                     self.show_error_dialog(f"Error: {str(e)}")
                     self.page.update()
         
-        threading.Thread(target=delete_process).start()
+        self.page.run_task(delete_process)
     
     def reload_after_delete(self):
         """Recarga los datos después de eliminar registros."""
         # Cerrar el diálogo de éxito
         self.close_dialog()
         
-        # Recargar los datos
-        self.load_data()
+        # Aplicar solo los cambios desde la última sincronización
+        self.refresh_changes()
 
     def show_add_form(self, e):
         """Muestra el formulario para añadir un nuevo registro."""
@@ -735,8 +1192,8 @@ class MainScreen(ft.Container):  # Changed from ft.UserControl to ft.Container
         loading_dialog.open = True
         self.page.update()
         
-        # Guardar en un hilo separado para no bloquear la UI
-        def save_process():
+        # Guardar en segundo plano para no bloquear la UI
+        async def save_process():
             try:
                 # Crear diccionario con los datos
                 new_record = {
@@ -754,9 +1211,9 @@ class MainScreen(ft.Container):  # Changed from ft.UserControl to ft.Container
                 }
                 
                 # Guardar en la base de datos
-                success = self.db_manager.add_bobina(new_record)
+                success = await self.db.add_bobina(new_record)
                 
-                # Actualizar UI en el hilo principal
+                # Actualizar UI
                 if self.page:
                     self.close_dialog()
                     
@@ -783,7 +1240,7 @@ class MainScreen(ft.Container):  # Changed from ft.UserControl to ft.Container
                     self.show_error_dialog(f"Error: {str(e)}")
                     self.page.update()
         
-        threading.Thread(target=save_process).start()
+        self.page.run_task(save_process)
     
     def show_error_dialog(self, message):
         """Muestra un diálogo de error con el mensaje especificado."""
@@ -803,90 +1260,71 @@ class MainScreen(ft.Container):  # Changed from ft.UserControl to ft.Container
         # Cerrar el diálogo de éxito
         self.close_dialog()
         
-        # Recargar los datos
-        self.load_data()
+        # Aplicar solo los cambios desde la última sincronización
+        self.refresh_changes()
 
-    def sort_data(self, column_index, ascending):
-        """Ordena los datos según la columna seleccionada."""
-        self.sort_column_index = column_index
-        self.sort_ascending = ascending
-        self.table.sort_column_index = column_index
-        self.table.sort_ascending = ascending
-        
-        # Obtener los datos actuales
-        current_data = []
-        for row in self.table.rows:
-            row_data = {}
-            # Extraer el ID del checkbox
-            checkbox = row.cells[0].content.controls[0]
-            row_data["id"] = checkbox.data
-            
-            # Extraer los valores de las celdas
-            for i, cell in enumerate(row.cells):
-                if i == 0:  # Para la columna ID
-                    row_data["id_text"] = cell.content.controls[1].value
-                else:
-                    # Usar índices para los demás campos
-                    row_data[f"column_{i}"] = cell.content.value
-            
-            current_data.append(row_data)
+    def sort_data(self, sort_order):
+        """
+        Ordena la tabla en la base de datos y vuelve a cargar la primera página.
         
-        # Definir la clave de ordenamiento
-        if column_index == 0:
-            sort_key = "id"
-        else:
-            sort_key = f"column_{column_index}"
+        Las filas seleccionadas siguen seleccionadas aunque ahora estén en
+        otra página. Usa los filtros escritos en los campos: si había una
+        búsqueda pendiente, esta consulta la reemplaza y aplica sus filtros.
         
-        # Ordenar los datos
-        sorted_data = sorted(
-            current_data, 
-            key=lambda x: self._get_sort_value(x.get(sort_key, "")), 
-            reverse=not ascending
-        )
+        Args:
+            sort_order (list): Pares (columna, ascendente) en orden de prioridad
+        """
+        if not self.page:
+            return
+        self.sort_order = list(sort_order)
+        self.query_generation += 1
+        generation = self.query_generation
+        filters = dict(self.pending_filters)
         
-        # Actualizar la tabla con los datos ordenados
-        self.table.rows.clear()
-        for item in sorted_data:
-            checkbox = ft.Checkbox(
-                value=item["id"] in self.selected_ids, 
-                data=item["id"],
-                on_change=self.checkbox_changed
-            )
-            
-            self.table.rows.append(
-                ft.DataRow(
-                    cells=[
-                        ft.DataCell(ft.Row([checkbox, ft.Text(str(item["id_text"]))])),
-                        ft.DataCell(ft.Text(item.get("column_1", ""))),
-                        ft.DataCell(ft.Text(item.get("column_2", ""))),
-                        ft.DataCell(ft.Text(item.get("column_3", ""))),
-                        ft.DataCell(ft.Text(item.get("column_4", ""))),
-                        ft.DataCell(ft.Text(item.get("column_5", ""))),
-                        ft.DataCell(ft.Text(item.get("column_6", ""))),
-                        ft.DataCell(ft.Text(item.get("column_7", ""))),
-                        ft.DataCell(ft.Text(item.get("column_8", ""))),
-                        ft.DataCell(ft.Text(item.get("column_9", ""))),
-                        ft.DataCell(ft.Text(item.get("column_10", ""))),
-                        ft.DataCell(ft.Text(item.get("column_11", ""))),
-                        ft.DataCell(ft.Text(item.get("column_12", ""))),
-                    ]
-                )
-            )
+        async def sort_process():
+            try:
+                change_seq = await self.db.get_change_seq()
+                data = await self.fetch_page(filters=filters)
+            except asyncio.CancelledError:
+                return  # Una búsqueda posterior reemplazó la lectura
+            if self.page and generation == self.query_generation:
+                self.hide_filter_progress()
+                self.current_filters = filters
+                self.last_change_seq = change_seq
+                self.update_table(data, reset_scroll=True)
+                self.page.update()
         
-        self.update()
+        self.page.run_task(sort_process)
+    
+    def _sort_position(self, row):
+        """
+        Posición de una fila nueva o modificada en la tabla según el orden actual.
+        
+        Returns:
+            int: Índice donde insertarla, o None si queda después de la última
+            fila cargada y todavía hay más páginas (llegará con load_more)
+        """
+        sort = normalize_sort(self.sort_order) if self.sort_order else [("id", False)]
+        
+        def comes_before(a, b):
+            for column, ascending in sort:
+                key_a, key_b = _sqlite_sort_key(a[column]), _sqlite_sort_key(b[column])
+                if key_a != key_b:
+                    return (key_a < key_b) == ascending
+            return False
+        
+        rows = self.grid.rows
+        low, high = 0, len(rows)
+        while low < high:
+            middle = (low + high) // 2
+            if comes_before(rows[middle], row):
+                low = middle + 1
+            else:
+                high = middle
+        if low == len(rows) and self.has_more_rows:
+            return None
+        return low
     
-    def _get_sort_value(self, value):
-        """Obtiene el valor para ordenamiento, convirtiendo a número si es posible."""
-        if value is None:
-            return ""
-        
-        # Intentar convertir a número para ordenamiento numérico
-        try:
-            return float(value)
-        except (ValueError, TypeError):
-            # Si no es un número, devolver como string para ordenamiento alfabético
-            return str(value).lower()
-
     def on_page_resize(self, e):
         """Handle window resize events"""
         # Update the container to fill the new window size
@@ -901,6 +1339,8 @@ class MainScreen(ft.Container):  # Changed from ft.UserControl to ft.Container
             ft.PopupMenuItem(text="Exportar seleccionados", icon=ft.icons.FILE_DOWNLOAD, on_click=self.confirm_export),
             ft.PopupMenuItem(text="Eliminar seleccionados", icon=ft.icons.DELETE, on_click=self.confirm_delete),
             ft.PopupMenuItem(text="Añadir nuevo registro", icon=ft.icons.ADD, on_click=self.show_add_form),
+            ft.PopupMenuItem(text="Recalcular resumen", icon=ft.icons.REFRESH, on_click=self.rebuild_summary),
+            ft.PopupMenuItem(text="Copia de seguridad", icon=ft.icons.BACKUP, on_click=self.run_backup),
             ft.PopupMenuItem(),  # Divider
             ft.PopupMenuItem(text="Acerca de", icon=ft.icons.INFO, on_click=self.show_about),
         ]
@@ -0,0 +1,336 @@
+import bisect
+import math
+
+import flet as ft
+
+
+class VirtualGrid(ft.Row):
+    """
+    Tabla virtualizada sobre ft.ListView.
+
+    Guarda todas las filas cargadas pero solo construye controles para las
+    que se ven en pantalla más un margen (overscan) arriba y abajo. El resto
+    de la altura la ocupan dos espaciadores, de modo que la barra de
+    desplazamiento refleja el total de filas. Todas las filas tienen la
+    misma altura, así la fila visible se calcula a partir de la posición de
+    desplazamiento sin medir controles.
+    """
+
+    def __init__(self, columns, row_height=36, overscan=10, on_row_select=None,
+                 on_select_all=None, on_sort=None, on_end_reached=None, is_selected=None):
+        """
+        Inicializa la tabla.
+
+        Args:
+            columns (list): Tuplas (columna, título, ancho en píxeles); la primera
+                columna es la clave de cada fila y lleva la casilla de selección
+            row_height (int): Altura fija de cada fila en píxeles
+            overscan (int): Filas construidas por encima y por debajo de las visibles
+            on_row_select (callable): Manejador on_change de la casilla de cada
+                fila; el control tiene la clave de la fila en `data`
+            on_select_all (callable): Manejador on_change de la casilla del encabezado
+            on_sort (callable): Recibe la lista de pares (columna, ascendente) al
+                cambiar el orden desde los títulos
+            on_end_reached (callable): Se llama al acercarse al final de las filas cargadas
+            is_selected (callable): Indica si la fila con una clave está seleccionada
+        """
+        self.columns = columns
+        self.key_column = columns[0][0]
+        self.row_height = row_height
+        self.overscan = overscan
+        self.on_row_select = on_row_select
+        self.on_sort = on_sort
+        self.on_end_reached = on_end_reached
+        self.is_selected = is_selected or (lambda key: False)
+
+        self.rows = []
+        # Orden activo: pares (columna, ascendente) en orden de prioridad
+        self.sort_order = []
+
+        # Ventana de filas construidas [start, end) y filas que entran en pantalla
+        self.first_visible = 0
+        self.visible_rows = 25
+        self.start = 0
+        self.end = 0
+        self._row_controls = {}
+
+        self.select_all_checkbox = ft.Checkbox(on_change=on_select_all)
+        self._sort_labels = []
+        header_cells = []
+        for index, (column, title, width) in enumerate(columns):
+            label = ft.Text(title, weight=ft.FontWeight.BOLD, no_wrap=True)
+            self._sort_labels.append(label)
+            # Clic: ordenar solo por esta columna. Clic derecho o pulsación
+            # larga: agregarla como criterio siguiente (orden por varias columnas)
+            cell = ft.Container(
+                content=label,
+                width=width,
+                on_click=lambda e, index=index: self._header_clicked(index),
+                on_long_press=lambda e, index=index: self._header_clicked(index, add=True),
+            )
+            if index == 0:
+                cell.content = ft.Row([self.select_all_checkbox, label], spacing=0)
+            header_cells.append(ft.GestureDetector(
+                content=cell,
+                on_secondary_tap=lambda e, index=index: self._header_clicked(index, add=True),
+            ))
+        self.header = ft.Container(
+            content=ft.Row(header_cells, spacing=0),
+            height=row_height + 8,
+            border=ft.border.only(bottom=ft.border.BorderSide(1, ft.colors.BLACK26)),
+        )
+
+        self._top_spacer = ft.Container(height=0)
+        self._bottom_spacer = ft.Container(height=0)
+        self.list_view = ft.ListView(
+            controls=[self._top_spacer, self._bottom_spacer],
+            expand=True,
+            spacing=0,
+            on_scroll=self._on_scroll,
+            on_scroll_interval=50,
+        )
+
+        # El ancho de la tabla es fijo: se desplaza horizontalmente si no entra
+        super().__init__(
+            controls=[
+                ft.Column(
+                    [self.header, self.list_view],
+                    width=sum(width for _, _, width in columns),
+                    spacing=0,
+                )
+            ],
+            scroll=ft.ScrollMode.AUTO,
+            vertical_alignment=ft.CrossAxisAlignment.STRETCH,
+            expand=True,
+        )
+
+    # Filas
+
+    def set_rows(self, rows):
+        """Reemplaza todas las filas y vuelve al principio de la tabla."""
+        self.rows = list(rows)
+        self._row_controls.clear()
+        self.first_visible = 0
+        self._render()
+        if self.page:
+            self.list_view.scroll_to(offset=0)
+
+    def reconcile(self, rows):
+        """
+        Reemplaza las filas conservando los controles de las que no cambiaron.
+
+        Compara por clave las filas actuales con las nuevas. Las filas con los
+        mismos valores mantienen su control, de modo que al actualizar Flet
+        solo envía al cliente las filas insertadas, quitadas, movidas o
+        modificadas dentro de la ventana construida. Se mantiene la posición
+        de desplazamiento.
+
+        Args:
+            rows (list): Filas nuevas, en el orden en que se muestran
+
+        Returns:
+            dict: Cantidad de filas insertadas, quitadas y movidas, y de filas
+            construidas cuyos valores cambiaron
+        """
+        rows = list(rows)
+        old_rows = {row[self.key_column]: row for row in self.rows}
+        old_positions = {key: position for position, key in enumerate(old_rows)}
+        new_keys = [row[self.key_column] for row in rows]
+        new_key_set = set(new_keys)
+
+        inserted = sum(1 for key in new_keys if key not in old_rows)
+        removed = sum(1 for key in old_rows if key not in new_key_set)
+        kept = [old_positions[key] for key in new_keys if key in old_positions]
+        moved = len(kept) - _longest_increasing_run(kept)
+
+        # Una fila construida cuyos valores cambiaron necesita un control
+        # nuevo; las que no están construidas se construyen con los datos nuevos
+        columns = [column for column, _, _ in self.columns]
+        new_rows = {key: row for key, row in zip(new_keys, rows)}
+        modified = 0
+        for key in list(self._row_controls):
+            row = new_rows.get(key)
+            if row is not None and any(old_rows[key][c] != row[c] for c in columns):
+                modified += 1
+                del self._row_controls[key]
+
+        self.rows = rows
+        self.first_visible = min(self.first_visible, max(0, len(rows) - 1))
+        self._render()
+        return {"inserted": inserted, "removed": removed, "moved": moved, "modified": modified}
+
+    def append_rows(self, rows):
+        """Agrega filas al final (siguiente página)."""
+        self.rows.extend(rows)
+        self._render()
+
+    def prepend_rows(self, rows):
+        """Agrega filas al principio (registros nuevos)."""
+        rows = list(rows)
+        if not rows:
+            return
+        self.rows[0:0] = rows
+        # Mantener a la vista las mismas filas que antes
+        if self.first_visible:
+            self.first_visible += len(rows)
+        self._render()
+
+    def insert_row(self, index, row):
+        """Inserta una fila en la posición indicada (registro nuevo con orden por columnas)."""
+        self.rows.insert(index, row)
+        # Mantener a la vista las mismas filas que antes
+        if index < self.first_visible:
+            self.first_visible += 1
+        self._render()
+
+    def replace_row(self, row):
+        """
+        Reemplaza en su lugar la fila con la misma clave (registro modificado).
+
+        Returns:
+            bool: False si la fila no está cargada
+        """
+        key = row[self.key_column]
+        for index, current in enumerate(self.rows):
+            if current[self.key_column] == key:
+                self.rows[index] = row
+                self._row_controls.pop(key, None)
+                self._render()
+                return True
+        return False
+
+    def remove_keys(self, keys):
+        """Quita las filas con las claves indicadas."""
+        keys = set(keys)
+        if not keys:
+            return
+        self.rows = [row for row in self.rows if row[self.key_column] not in keys]
+        for key in keys:
+            self._row_controls.pop(key, None)
+        self.first_visible = min(self.first_visible, max(0, len(self.rows) - 1))
+        self._render()
+
+    def keys(self):
+        """Devuelve las claves de todas las filas cargadas, en orden."""
+        return [row[self.key_column] for row in self.rows]
+
+    def refresh_selection(self):
+        """Actualiza las casillas de las filas construidas según is_selected."""
+        for key, control in self._row_controls.items():
+            control.content.controls[0].value = self.is_selected(key)
+
+    def control_count(self):
+        """Número de controles que forman la tabla (para medir su coste)."""
+        def count(control):
+            return 1 + sum(count(child) for child in control._get_children())
+        return count(self)
+
+    # Ventana visible
+
+    def _render(self):
+        """Construye los controles de la ventana visible más el overscan."""
+        total = len(self.rows)
+        self.start = max(0, self.first_visible - self.overscan)
+        self.end = min(total, self.first_visible + self.visible_rows + self.overscan)
+
+        controls = {}
+        window = []
+        for row in self.rows[self.start:self.end]:
+            key = row[self.key_column]
+            control = self._row_controls.get(key) or self._build_row(row)
+            controls[key] = control
+            window.append(control)
+        # Los controles que salen de la ventana se descartan
+        self._row_controls = controls
+
+        self._top_spacer.height = self.start * self.row_height
+        self._bottom_spacer.height = (total - self.end) * self.row_height
+        self.list_view.controls = [self._top_spacer] + window + [self._bottom_spacer]
+
+    def _build_row(self, row):
+        """Construye el control de una fila: casilla de selección y un texto por columna."""
+        key = row[self.key_column]
+        cells = [ft.Checkbox(value=self.is_selected(key), data=key, on_change=self.on_row_select)]
+        for index, (column, _, width) in enumerate(self.columns):
+            value = row[column]
+            text = "" if value is None else str(value)
+            # La primera columna comparte su ancho con la casilla
+            if index == 0:
+                width = max(width - 40, 20)
+            cells.append(ft.Text(text, width=width, no_wrap=True, max_lines=1))
+        return ft.Container(
+            content=ft.Row(cells, spacing=0),
+            height=self.row_height,
+            data=key,
+        )
+
+    def _on_scroll(self, e):
+        """Desplaza la ventana de filas construidas cuando se acerca a su borde."""
+        if e.viewport_dimension:
+            self.visible_rows = math.ceil(e.viewport_dimension / self.row_height) + 1
+        self.first_visible = max(0, int(e.pixels // self.row_height))
+
+        margin = self.overscan // 2
+        near_top = self.start > 0 and self.first_visible < self.start + margin
+        near_bottom = (
+            self.end < len(self.rows)
+            and self.first_visible + self.visible_rows > self.end - margin
+        )
+        if near_top or near_bottom:
+            self._render()
+            self.update()
+
+        if (self.on_end_reached
+                and self.first_visible + self.visible_rows >= len(self.rows) - self.overscan):
+            self.on_end_reached()
+
+    def _header_clicked(self, index, add=False):
+        """
+        Cambia el orden al pulsar el título de una columna y avisa a on_sort.
+
+        Args:
+            index (int): Columna pulsada
+            add (bool): Si es True la columna se agrega al orden actual (o se
+                invierte si ya estaba); si es False pasa a ser la única
+        """
+        column = self.columns[index][0]
+        current = dict(self.sort_order)
+        if add:
+            if column in current:
+                self.sort_order = [
+                    (name, not ascending if name == column else ascending)
+                    for name, ascending in self.sort_order
+                ]
+            else:
+                self.sort_order = self.sort_order + [(column, True)]
+        elif list(current) == [column]:
+            self.sort_order = [(column, not current[column])]
+        else:
+            self.sort_order = [(column, True)]
+        self.set_sort_order(self.sort_order)
+        if self.on_sort:
+            self.on_sort(list(self.sort_order))
+
+    def set_sort_order(self, sort_order):
+        """Muestra en los títulos el orden indicado (flecha y prioridad si hay varias columnas)."""
+        self.sort_order = list(sort_order)
+        positions = {column: position for position, (column, _) in enumerate(self.sort_order)}
+        directions = dict(self.sort_order)
+        for (column, title, _), label in zip(self.columns, self._sort_labels):
+            if column in positions:
+                title += " ▲" if directions[column] else " ▼"
+                if len(self.sort_order) > 1:
+                    title += str(positions[column] + 1)
+            label.value = title
+
+
+def _longest_increasing_run(positions):
+    """Longitud de la subsecuencia creciente más larga (filas que no necesitan moverse)."""
+    tails = []
+    for position in positions:
+        index = bisect.bisect_left(tails, position)
+        if index == len(tails):
+            tails.append(position)
+        else:
+            tails[index] = position
+    return len(tails)